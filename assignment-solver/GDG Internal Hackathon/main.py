@@ -1,22 +1,25 @@
 #!/usr/bin/env python3
 import os
-import io
 import re
+import sys
+import json
+import time
+import hashlib
+import sqlite3
 import argparse
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 # Google APIs
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
 # LLM + utils
 from dotenv import load_dotenv
-from pypdf import PdfReader
 from langchain.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -24,6 +27,16 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
+# Helpers shared with the web backend's solver
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend" / "services"))
+from resumableDownload import download_to_file, download_to_memory
+from boilerplate import BoilerplateFilter
+from pdfBackends import PdfExtraction, backend_order
+from courseIndex import CourseIndex
+from csvDigest import digest_csv
+from questionSegmenter import segment_text
+from usageLedger import UsageLedger, usage_of
+
 # --------------------------
 # Constants & folders
 # --------------------------
@@ -39,6 +52,9 @@ DATA_DIR = ROOT / "data"
 DOWNLOADS_DIR = DATA_DIR / "downloads"
 OUTPUT_SOLUTIONS_DIR = DATA_DIR / "output" / "solutions"
 OUTPUT_SUMMARIES_DIR = DATA_DIR / "output" / "summaries"
+NOTES_CACHE_DIR = DATA_DIR / "cache" / "notes"
+INDEX_DIR = DATA_DIR / "index"
+USAGE_LEDGER_PATH = DATA_DIR / "usage.sqlite"
 TOKEN_PATH = ROOT / "token.json"
 CLIENT_SECRET_PATH = ROOT / "client_secret.json"
 
@@ -49,6 +65,8 @@ def ensure_dirs():
     DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_SOLUTIONS_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
+    NOTES_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
 def load_env():
     # optional .env
@@ -86,52 +104,48 @@ def auth_services():
     drive = build("drive", "v3", credentials=creds, cache_discovery=False)
     return classroom, drive
 
-def read_txt(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore")
-
-def read_pdf(path: Path) -> str:
-    reader = PdfReader(str(path))
-    parts = []
-    for page in reader.pages:
-        try:
-            parts.append(page.extract_text() or "")
-        except Exception:
-            pass
-    return "\n".join(parts).strip()
+class MaterialFile:
+    """A downloaded attachment: its bytes in memory, plus the copy on disk when downloads are kept"""
+    __slots__ = ("name", "data", "path", "file_id", "revision")
+
+    def __init__(self, name: str, data: bytes, path: Optional[Path] = None,
+                 file_id: Optional[str] = None, revision: Optional[str] = None):
+        self.name = name
+        self.data = data
+        self.path = path
+        self.file_id = file_id
+        self.revision = revision
+
+    @property
+    def stem(self) -> str:
+        return Path(self.name).stem
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.name).suffix
+
+def decode_text(data: bytes) -> str:
+    # Drive exports use CRLF line endings and sometimes a byte order mark
+    return data.decode("utf-8-sig", errors="ignore").replace("\r\n", "\n")
+
+def pdf_pages_from_bytes(data: bytes) -> List[str]:
+    # Fastest installed backend first (pypdfium2, pypdf, pdfminer), switching if it fails on this file
+    return list(PdfExtraction(data, backend_order(os.getenv("PDF_BACKEND", "auto"))))
+
+def text_from_bytes(data: bytes, suffix: str) -> str:
+    if suffix.lower() == ".pdf":
+        return "\n".join(pdf_pages_from_bytes(data)).strip()
+    if suffix.lower() == ".csv":
+        # Column statistics and a few sampled rows, however many rows the sheet has
+        return digest_csv(data, sample_rows=int(os.getenv("CSV_SAMPLE_ROWS", "20")))
+    return decode_text(data)
 
 def read_any_text(path: Path) -> str:
-    if path.suffix.lower() == ".pdf":
-        return read_pdf(path)
-    return read_txt(path)
+    return text_from_bytes(path.read_bytes(), path.suffix)
 
 def extract_questions(text: str) -> List[str]:
-    lines = [ln.strip() for ln in text.splitlines()]
-    chunks = []
-    buf: List[str] = []
-    def flush():
-        nonlocal buf, chunks
-        if buf:
-            joined = " ".join(buf).strip()
-            if joined:
-                chunks.append(joined)
-            buf = []
-
-    for ln in lines:
-        if not ln:
-            flush()
-            continue
-        if re.match(r"^(\d+[\).]\s+|[a-zA-Z]\)\s+|-|\*)", ln) or ln.endswith("?"):
-            flush()
-            buf.append(ln)
-            flush()
-        else:
-            buf.append(ln)
-    flush()
-
-    if not chunks:
-        paras = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
-        return paras[:20]
-    return chunks[:50]
+    # One entry per top-level question, with its "a)" parts kept underneath
+    return [q.full_text() for q in segment_text(text)]
 
 def clean_filename(name: str) -> str:
     name = re.sub(r"[^\w\-. ]", "_", name).strip()
@@ -183,64 +197,62 @@ def list_materials(classroom, course_id: str, max_items: int) -> List[dict]:
             break
     return items[:max_items]
 
-def _download_google_file_export(drive, file_id: str, mime_type: str, out_path: Path):
-    request = drive.files().export_media(fileId=file_id, mimeType=mime_type)
-    fh = io.FileIO(str(out_path), "wb")
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-
-def _download_drive_file(drive, file_id: str, out_path: Path):
-    request = drive.files().get_media(fileId=file_id)
-    fh = io.FileIO(str(out_path), "wb")
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-
-def download_materials_files(drive, materials: List[dict]) -> List[Path]:
-    paths: List[Path] = []
+# Google Docs/Slides/Sheets are exported to text: mime type -> (export mime type, extension)
+GOOGLE_EXPORTS = {
+    "application/vnd.google-apps.document": ("text/plain", ".txt"),
+    "application/vnd.google-apps.presentation": ("text/plain", ".txt"),
+    "application/vnd.google-apps.spreadsheet": ("text/csv", ".csv"),
+}
+
+def _download_cache_path(file_id: str, revision: Optional[str], ext: str) -> Path:
+    # Named by id and revision, so files with the same title never overwrite each other
+    tag = hashlib.sha1(revision.encode("utf-8")).hexdigest()[:12] if revision else "latest"
+    return DOWNLOADS_DIR / f"{file_id}-{tag}{ext}"
+
+def _fetch(request, cache_path: Optional[Path], revision: Optional[str]) -> bytes:
+    if cache_path is None:
+        # Straight into memory with the same retries and range resume: no write and re-read
+        return download_to_memory(request)
+    if revision is None or not cache_path.exists():
+        # Partial downloads stay next to cache_path as .part files and resume on the next run
+        download_to_file(request, cache_path, revision=revision)
+    return cache_path.read_bytes()
+
+def download_materials_files(drive, materials: List[dict], keep_downloads: bool = False,
+                             skip: Optional[Callable[[str, Optional[str]], bool]] = None) -> List[MaterialFile]:
+    # skip(file_id, revision) is checked after the metadata call, before any bytes are fetched
+    files: List[MaterialFile] = []
     for m in materials or []:
         if "driveFile" in m:
             drive_info = m["driveFile"]["driveFile"]
             fid = drive_info["id"]
-            meta = drive.files().get(fileId=fid, fields="id,name,mimeType").execute()
+            meta = drive.files().get(fileId=fid, fields="id,name,mimeType,md5Checksum,modifiedTime").execute()
             name = meta["name"]
             mt = meta["mimeType"]
+            revision = meta.get("md5Checksum") or meta.get("modifiedTime")
+            if skip is not None and skip(fid, revision):
+                continue
             safe = clean_filename(name)
 
             if mt.startswith("application/vnd.google-apps"):
-                # Export Google Docs/Slides/Sheets to text where possible
-                if mt == "application/vnd.google-apps.document":
-                    out = DOWNLOADS_DIR / f"{safe}.txt"
-                    _download_google_file_export(drive, fid, "text/plain", out)
-                    paths.append(out)
-                elif mt == "application/vnd.google-apps.presentation":
-                    out = DOWNLOADS_DIR / f"{safe}.txt"
-                    _download_google_file_export(drive, fid, "text/plain", out)
-                    paths.append(out)
-                elif mt == "application/vnd.google-apps.spreadsheet":
-                    out = DOWNLOADS_DIR / f"{safe}.csv"
-                    _download_google_file_export(drive, fid, "text/csv", out)
-                    paths.append(out)
-                else:
+                if mt not in GOOGLE_EXPORTS:
                     # skip other Google types
                     continue
+                export_mime, ext = GOOGLE_EXPORTS[mt]
+                request = drive.files().export_media(fileId=fid, mimeType=export_mime)
             else:
                 # Binary file (pdf, docx, etc.)
-                ext = ""
-                if "." in name:
-                    ext = name[name.rfind("."):]
-                out = DOWNLOADS_DIR / f"{safe}{ext}"
-                _download_drive_file(drive, fid, out)
-                paths.append(out)
+                ext = name[name.rfind("."):] if "." in name else ""
+                request = drive.files().get_media(fileId=fid)
+            cache_path = _download_cache_path(fid, revision, ext) if keep_downloads else None
+            files.append(MaterialFile(f"{safe}{ext}", _fetch(request, cache_path, revision), cache_path,
+                                      file_id=fid, revision=revision))
         # links/youtube/forms are skipped for this pipeline
-    return paths
+    return files
 
-def collect_files_from_coursework(drive, cw: dict) -> List[Path]:
+def collect_files_from_coursework(drive, cw: dict, keep_downloads: bool = False) -> List[MaterialFile]:
     materials = cw.get("materials", [])
-    return download_materials_files(drive, materials)
+    return download_materials_files(drive, materials, keep_downloads)
 
 # --------------------------
 # LLM tasks (Gemini via LangChain)
@@ -251,6 +263,29 @@ def get_llm(gemini_key: str):
         raise RuntimeError("Invalid Gemini API key.")
     return ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=gemini_key, temperature=0.2)
 
+# Course and coursework the LLM calls are accounted to in the usage ledger
+USAGE_CONTEXT = {"source": "cli"}
+_usage_ledger: Optional[UsageLedger] = None
+
+def invoke_llm(prompt, llm, inputs: dict, purpose: str) -> str:
+    """Run prompt | llm and append the call's tokens and time to data/usage.sqlite"""
+    global _usage_ledger
+    started = time.monotonic()
+    reply, outcome = None, "error"
+    try:
+        reply = (prompt | llm).invoke(inputs)
+        outcome = "ok"
+        return reply.content
+    finally:
+        call = usage_of(reply, getattr(llm, "model", None))
+        call.update(purpose=purpose, outcome=outcome, seconds=time.monotonic() - started)
+        try:
+            if _usage_ledger is None:
+                _usage_ledger = UsageLedger(USAGE_LEDGER_PATH)
+            _usage_ledger.record(call, [dict(USAGE_CONTEXT)])
+        except sqlite3.Error as e:
+            print(f"[usage] could not record LLM call: {e}", file=sys.stderr)
+
 ASSIGNMENT_PROMPT = ChatPromptTemplate.from_template(
     """You are a careful, step-by-step problem solver. 
 You are given the raw text of one assignment file. Extract distinct questions and SOLVE them clearly.
@@ -274,6 +309,46 @@ Notes text:
 """
 )
 
+NOTES_CHUNK_PROMPT = ChatPromptTemplate.from_template(
+    """You are a concise academic summarizer. The text below is one section of a longer set of notes.
+Summarize only this section:
+- Key bullet points
+- Definitions/formulas (if any), copied exactly
+
+Notes section:
+{notes_text}
+"""
+)
+
+NOTES_MERGE_PROMPT = ChatPromptTemplate.from_template(
+    """You are a concise academic summarizer. Below are summaries of consecutive sections of one set of notes.
+Combine them into a single tight study note:
+- Key bullet points (merge duplicates, keep the original order of topics)
+- Definitions/formulas (if any)
+- 3–5 takeaway lines
+
+Section summaries:
+{section_summaries}
+"""
+)
+
+ASSIGNMENT_WITH_NOTES_PROMPT = ChatPromptTemplate.from_template(
+    """You are a careful, step-by-step problem solver.
+You are given the raw text of one assignment file and excerpts from the course's own notes.
+Extract distinct questions and SOLVE them clearly.
+- Show numbered solutions matching the question order.
+- Prefer the definitions, notation and methods used in the course notes.
+- If the text includes irrelevant parts (headers/footers), ignore them.
+- If a question lacks enough info, state the assumption and proceed.
+
+Course notes (excerpts):
+{course_notes}
+
+Assignment text:
+{assignment_text}
+"""
+)
+
 QUESTIONS_PROMPT = ChatPromptTemplate.from_template(
     """You are given a set of questions extracted from a file. Provide clear, correct solutions.
 Use step-by-step reasoning and label answers.
@@ -283,19 +358,177 @@ Questions:
 """
 )
 
-def solve_assignment_text(llm, text: str) -> str:
+def solve_assignment_text(llm, text: str, course_notes: str = "") -> str:
     # combine prompt + llm via pipe operator (works with langchain-google-genai integration)
-    chain = ASSIGNMENT_PROMPT | llm
-    return chain.invoke({"assignment_text": text}).content
+    if course_notes:
+        return invoke_llm(ASSIGNMENT_WITH_NOTES_PROMPT, llm, {"assignment_text": text, "course_notes": course_notes},
+                          "assignment")
+    return invoke_llm(ASSIGNMENT_PROMPT, llm, {"assignment_text": text}, "assignment")
 
 def summarize_notes_text(llm, text: str) -> str:
-    chain = NOTES_SUMMARY_PROMPT | llm
-    return chain.invoke({"notes_text": text}).content
+    return invoke_llm(NOTES_SUMMARY_PROMPT, llm, {"notes_text": text}, "notes")
+
+# --------------------------
+# Incremental notes summaries
+# --------------------------
+# Notes are cut into chunks whose boundaries depend on content, not position:
+# a chunk ends after a unit (page or paragraph) whose hash hits the divisor once
+# the chunk is long enough. Slides added to a deck only change the chunks around
+# them, so only those are summarized again; the rest come from the cache.
+NOTES_CHUNK_MIN_CHARS = 1500
+NOTES_CHUNK_MAX_CHARS = 6000
+NOTES_CHUNK_DIVISOR = 4
+NOTES_WORKERS = 4
+# Bump when the chunk or merge prompts change, to stop serving old summaries
+NOTES_CACHE_VERSION = "1"
+
+def read_note_units(f: MaterialFile) -> List[str]:
+    """Pages of a PDF (without page numbers and repeated headers) or paragraphs of a text file"""
+    if f.suffix.lower() == ".pdf":
+        # Page numbers shift when slides are inserted; dropping them keeps unchanged pages' hashes stable
+        return list(BoilerplateFilter(pdf_pages_from_bytes(f.data)))
+    return re.split(r"\n\s*\n", text_from_bytes(f.data, f.suffix))
+
+def chunk_note_units(units: List[str]) -> List[str]:
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+    for unit in units:
+        unit = unit.strip()
+        if not unit:
+            continue
+        buf.append(unit)
+        size += len(unit)
+        boundary = hashlib.sha1(unit.encode("utf-8")).digest()[0] % NOTES_CHUNK_DIVISOR == 0
+        if size >= NOTES_CHUNK_MAX_CHARS or (size >= NOTES_CHUNK_MIN_CHARS and boundary):
+            chunks.append("\n\n".join(buf))
+            buf, size = [], 0
+    if buf:
+        chunks.append("\n\n".join(buf))
+    return chunks
+
+def _notes_cache_key(kind: str, text: str) -> str:
+    return hashlib.sha256(f"{NOTES_CACHE_VERSION}:{kind}:{text}".encode("utf-8")).hexdigest()
+
+def _cached_summary(key: str) -> Optional[str]:
+    path = NOTES_CACHE_DIR / f"{key}.md"
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+def _store_summary(key: str, summary: str):
+    path = NOTES_CACHE_DIR / f"{key}.md"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(summary, encoding="utf-8")
+    os.replace(tmp, path)
+
+def summarize_notes_chunk(llm, text: str) -> str:
+    return invoke_llm(NOTES_CHUNK_PROMPT, llm, {"notes_text": text}, "notes-chunk")
+
+def summarize_notes_incremental(llm, f: MaterialFile) -> str:
+    """Summarize a notes file, reusing cached summaries of unchanged chunks"""
+    chunks = chunk_note_units(read_note_units(f))
+    if not chunks:
+        return ""
+    if len(chunks) == 1:
+        key = _notes_cache_key("whole", chunks[0])
+        summary = _cached_summary(key)
+        if summary is None:
+            summary = summarize_notes_text(llm, chunks[0])
+            _store_summary(key, summary)
+        return summary
+
+    keys = [_notes_cache_key("chunk", chunk) for chunk in chunks]
+    summaries = {key: _cached_summary(key) for key in keys}
+    missing = [(key, chunk) for key, chunk in zip(keys, chunks) if summaries[key] is None]
+
+    def summarize(item):
+        key, chunk = item
+        summary = summarize_notes_chunk(llm, chunk)
+        _store_summary(key, summary)
+        return key, summary
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=NOTES_WORKERS) as pool:
+            summaries.update(pool.map(summarize, missing))
+    # stdout is reserved for output paths
+    print(f"[notes] {f.name}: {len(chunks)} chunks, {len(missing)} summarized, "
+          f"{len(chunks) - len(missing)} cached", file=sys.stderr)
+
+    merge_key = _notes_cache_key("merge", "\n".join(keys))
+    merged = _cached_summary(merge_key)
+    if merged is None:
+        sections = "\n\n".join(f"Section {i + 1}:\n{summaries[key]}" for i, key in enumerate(keys))
+        merged = invoke_llm(NOTES_MERGE_PROMPT, llm, {"section_summaries": sections}, "notes-merge")
+        _store_summary(merge_key, merged)
+    return merged
 
 def solve_questions_list(llm, qs: List[str]) -> str:
     joined = "\n\n".join(f"Q{i+1}. {q}" for i, q in enumerate(qs))
-    chain = QUESTIONS_PROMPT | llm
-    return chain.invoke({"questions": joined}).content
+    return invoke_llm(QUESTIONS_PROMPT, llm, {"questions": joined}, "questions")
+
+# --------------------------
+# Course notes retrieval
+# --------------------------
+# Passages per question, and a cap on the notes added to one prompt however large the course gets
+NOTES_CONTEXT_PER_QUESTION = 3
+NOTES_CONTEXT_MAX_CHARS = 6000
+# Materials unchanged in Classroom are not looked up on Drive again until this old
+NOTES_INDEX_RECHECK_HOURS = 24
+
+def index_files(index: CourseIndex, files: List[MaterialFile]):
+    docs = []
+    for f in files:
+        if f.file_id is None or index.has(f.file_id, f.revision):
+            continue
+        docs.append((f.file_id, f.revision, f.name, text_from_bytes(f.data, f.suffix)))
+    if docs:
+        index.add_documents(docs)
+
+def _read_index_state(index: CourseIndex) -> dict:
+    try:
+        with open(index.directory / "materials.json", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {"checkedAt": 0, "materials": {}}
+
+def _write_index_state(index: CourseIndex, state: dict):
+    tmp_path = index.directory / ".materials.json.tmp"
+    tmp_path.write_text(json.dumps(state), encoding="utf-8")
+    tmp_path.replace(index.directory / "materials.json")
+
+def index_course_materials(classroom, drive, index: CourseIndex, course_id: str, max_items: int,
+                           recheck: bool = False):
+    # Materials whose Classroom updateTime matches the last run are skipped without any Drive call.
+    # A Drive file edited in place keeps its material's updateTime, so every file is looked up
+    # again once a day, or with recheck; even then only new or changed files are downloaded.
+    state = _read_index_state(index)
+    full = recheck or time.time() - state.get("checkedAt", 0) > NOTES_INDEX_RECHECK_HOURS * 3600
+    known = state.get("materials", {})
+    seen = {}
+    for mat in list_materials(classroom, course_id, max_items=max_items):
+        updated = mat.get("updateTime")
+        seen[mat.get("id")] = updated
+        if not full and updated is not None and known.get(mat.get("id")) == updated:
+            continue
+        files = download_materials_files(drive, mat.get("materials", []), skip=index.has)
+        index_files(index, files)
+    _write_index_state(index, {"checkedAt": time.time() if full else state.get("checkedAt", 0), "materials": seen})
+
+def course_notes_context(index: CourseIndex, text: str) -> str:
+    seen = set()
+    parts: List[str] = []
+    size = 0
+    for question in extract_questions(text):
+        for hit in index.search(question, k=NOTES_CONTEXT_PER_QUESTION):
+            key = (hit["doc"], hit["text"])
+            if key in seen:
+                continue
+            seen.add(key)
+            part = f"[{hit['title']}]\n{hit['text']}"
+            if size + len(part) > NOTES_CONTEXT_MAX_CHARS:
+                return "\n\n".join(parts)
+            parts.append(part)
+            size += len(part)
+    return "\n\n".join(parts)
 
 # --------------------------
 # PDF writer
@@ -342,6 +575,7 @@ def handle_questions_file(llm, questions_path: Optional[Path]) -> Optional[Path]
         raise FileNotFoundError(f"questions_file not found: {questions_path}")
 
     text = read_any_text(questions_path)
+    USAGE_CONTEXT.update(courseId=None, courseWorkId=None)
     qs = extract_questions(text)
     if not qs:
         qs = [text]
@@ -352,38 +586,51 @@ def handle_questions_file(llm, questions_path: Optional[Path]) -> Optional[Path]
     write_text_to_pdf(out_path, result, title=f"Solutions for {questions_path.name}")
     return out_path
 
-def process_assignments(classroom, drive, llm, course_ids: List[str], max_items: int) -> List[Path]:
+def process_assignments(classroom, drive, llm, course_ids: List[str], max_items: int,
+                        keep_downloads: bool = False, notes_context: bool = True,
+                        recheck_notes: bool = False) -> List[Path]:
     out_paths: List[Path] = []
     for cid in course_ids:
+        index = None
+        if notes_context:
+            index = CourseIndex.for_course(INDEX_DIR, cid)
+            index_course_materials(classroom, drive, index, cid, max_items, recheck=recheck_notes)
         items = list_assignments(classroom, cid, max_items=max_items)
+        USAGE_CONTEXT.update(courseId=cid, courseWorkId=None)
         for cw in items:
-            files = collect_files_from_coursework(drive, cw)
+            USAGE_CONTEXT["courseWorkId"] = cw.get("id")
+            files = collect_files_from_coursework(drive, cw, keep_downloads)
             if not files:
                 continue
             for f in files:
-                text = read_any_text(f)
+                text = text_from_bytes(f.data, f.suffix)
                 if not text.strip():
                     continue
-                result = solve_assignment_text(llm, text)
+                notes = course_notes_context(index, text) if index is not None else ""
+                result = solve_assignment_text(llm, text, course_notes=notes)
                 base = clean_filename(f.stem) + "-solutions.pdf"
                 out = OUTPUT_SOLUTIONS_DIR / base
                 write_text_to_pdf(out, result, title=f"Solutions for {f.name}")
                 out_paths.append(out)
     return out_paths
 
-def process_notes(classroom, drive, llm, course_ids: List[str], max_items: int) -> List[Path]:
+def process_notes(classroom, drive, llm, course_ids: List[str], max_items: int,
+                  keep_downloads: bool = False) -> List[Path]:
     out_paths: List[Path] = []
     for cid in course_ids:
+        index = CourseIndex.for_course(INDEX_DIR, cid)
         items = list_materials(classroom, cid, max_items=max_items)
+        USAGE_CONTEXT.update(courseId=cid, courseWorkId=None)
         for mat in items:
-            files = download_materials_files(drive, mat.get("materials", []))
+            files = download_materials_files(drive, mat.get("materials", []), keep_downloads)
             if not files:
                 continue
+            # Already downloaded, so index them for later assignment runs
+            index_files(index, files)
             for f in files:
-                text = read_any_text(f)
-                if not text.strip():
+                result = summarize_notes_incremental(llm, f)
+                if not result.strip():
                     continue
-                result = summarize_notes_text(llm, text)
                 base = clean_filename(f.stem) + "-summary.pdf"
                 out = OUTPUT_SUMMARIES_DIR / base
                 write_text_to_pdf(out, result, title=f"Summary for {f.name}")
@@ -401,6 +648,12 @@ def main():
     parser.add_argument("--course_id", type=str, default=None)
     parser.add_argument("--questions_file", type=str, default=None)
     parser.add_argument("--max_items", type=int, default=5)
+    parser.add_argument("--keep_downloads", action="store_true",
+                        help="also save attachments under data/downloads and reuse them on later runs")
+    parser.add_argument("--no_notes_context", action="store_true",
+                        help="do not add passages from the course's notes to assignment prompts")
+    parser.add_argument("--recheck_notes", action="store_true",
+                        help="look up every notes file on Drive, not only materials changed in Classroom")
     args = parser.parse_args()
 
     ensure_dirs()
@@ -417,11 +670,15 @@ def main():
     # Process assignments/notes if selected
     if args.mode in ("assignments", "all") and classroom:
         course_ids = resolve_course_ids(classroom, args.course_id)
-        output_paths += process_assignments(classroom, drive, llm, course_ids, max_items=args.max_items)
+        output_paths += process_assignments(classroom, drive, llm, course_ids, max_items=args.max_items,
+                                            keep_downloads=args.keep_downloads,
+                                            notes_context=not args.no_notes_context,
+                                            recheck_notes=args.recheck_notes)
 
     if args.mode in ("notes", "all") and classroom:
         course_ids = resolve_course_ids(classroom, args.course_id)
-        output_paths += process_notes(classroom, drive, llm, course_ids, max_items=args.max_items)
+        output_paths += process_notes(classroom, drive, llm, course_ids, max_items=args.max_items,
+                                      keep_downloads=args.keep_downloads)
 
     # ✅ Handle local questions PDF directly
     if args.questions_file:
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the question segmenter on multi-megabyte assignments.
+
+Compares the flat splitter the solver used before (a list of every line, a
+regex compiled per line, capped at 50 chunks) with questionSegmenter, both
+on an in-memory string and streamed from a file. Each run produces the text
+of every question, as both callers use it; "tree" also walks every part.
+Reports throughput, the number of questions found and peak Python memory
+(measured in a separate run, since tracing allocations distorts the timings).
+
+    python benchmark_segmenter.py            # 1, 4 and 16 MB
+    python benchmark_segmenter.py 2 32       # sizes in MB
+"""
+import os
+import re
+import sys
+import time
+import tempfile
+import tracemalloc
+from typing import List
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from questionSegmenter import segment, segment_text
+
+QUESTION = """{n}. A train leaves station {n} at {h}:00 travelling at {v} km/h.
+The track is {d} km long and the train stops once for ten minutes.
+
+a) How long does the journey take?
+b) What is its average speed including the stop?
+   i) in km/h
+   ii) in m/s
+c) Would a faster train always arrive earlier? Explain.
+- assume constant speed between stops
+- ignore acceleration
+
+"""
+
+
+def legacy_extract_questions(text: str) -> List[str]:
+    """The splitter copied in AssignmentSolver and the hackathon CLI before the shared segmenter"""
+    lines = [ln.strip() for ln in text.splitlines()]
+    chunks = []
+    buf: List[str] = []
+
+    def flush():
+        nonlocal buf, chunks
+        if buf:
+            joined = " ".join(buf).strip()
+            if joined:
+                chunks.append(joined)
+            buf = []
+
+    for ln in lines:
+        if not ln:
+            flush()
+            continue
+        if re.match(r"^(\d+[\).]\s+|[a-zA-Z]\)\s+|-|\*)", ln) or ln.endswith("?"):
+            flush()
+            buf.append(ln)
+            flush()
+        else:
+            buf.append(ln)
+    flush()
+
+    if not chunks:
+        paras = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+        return paras[:20]
+    return chunks[:50]
+
+
+def worksheet(megabytes: float) -> str:
+    parts = []
+    size = 0
+    n = 0
+    while size < megabytes * 1024 * 1024:
+        n += 1
+        part = QUESTION.format(n=n, h=n % 24, v=60 + n % 90, d=100 + n % 400)
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def measure(label: str, megabytes: float, run) -> None:
+    started = time.perf_counter()
+    found = run()
+    elapsed = time.perf_counter() - started
+    # A second run for memory: tracemalloc slows allocation-heavy code too much to time it
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<22} {elapsed:7.2f}s  {megabytes / elapsed:7.1f} MB/s  "
+          f"{found:>7} questions  peak {peak / 1024 / 1024:7.1f} MB")
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    for megabytes in sizes:
+        text = worksheet(megabytes)
+        print(f"{megabytes:g} MB worksheet ({text.count(chr(10))} lines):")
+        measure("legacy (capped at 50)", megabytes, lambda: len(legacy_extract_questions(text)))
+        measure("segment_text", megabytes, lambda: len([q.full_text() for q in segment_text(text)]))
+        measure("segment_text (tree)", megabytes,
+                lambda: sum(1 for q in segment_text(text) if len(list(q.walk()))))
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as f:
+            f.write(text)
+        try:
+            def streamed():
+                # Questions are consumed as they are yielded; the file is never read whole
+                with open(f.name, encoding="utf-8", newline="") as stream:
+                    return sum(1 for q in segment(stream) if q.full_text())
+            measure("segment (file stream)", megabytes, streamed)
+        finally:
+            os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,18 @@ const solutionSchema = new mongoose.Schema({
     default: null
   },
   
+  // Content-addressed artifacts written by the solver (used instead of inline bytes)
+  pdfArtifact: {
+    ref: String,
+    size: Number
+  },
+  
+  textArtifact: {
+    ref: String,
+    size: Number,
+    encoding: String
+  },
+  
   // Metadata
   solvedAt: {
     type: Date,
@@ -61,6 +73,12 @@ const solutionSchema = new mongoose.Schema({
     default: 0
   },
   
+  // Per-stage measurements reported by the Python solver
+  solverMetrics: {
+    type: mongoose.Schema.Types.Mixed,
+    default: null
+  },
+  
   // Original assignment materials info
   materials: [{
     fileId: String,
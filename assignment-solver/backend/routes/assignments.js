@@ -3,6 +3,7 @@ const router = express.Router();
 const { oauth2Client } = require('../config/googleAuth');
 const { getCourses, getAllAssignments } = require('../services/classroomService');
 const { auth } = require('../middleware/auth');
+const { schedulePresolve } = require('../services/solverQueue');
 
 // Add CORS headers to all responses in this router
 router.use((req, res, next) => {
@@ -54,6 +55,9 @@ router.get('/', auth, async (req, res) => {
     // Get assignments
     const assignments = await getAllAssignments(user.googleTokens.accessToken);
     console.log('📝 Assignments fetched:', assignments ? assignments.length : 0);
+
+    // Warm the solver's caches for fresh coursework in the background
+    schedulePresolve(user.googleTokens.accessToken, (assignments || []).map((a) => a.courseId));
     
     res.json({
       success: true,
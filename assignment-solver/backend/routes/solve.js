@@ -4,6 +4,9 @@ const { spawn } = require('child_process');
 const path = require('path');
 const { auth } = require('../middleware/auth');
 const Solution = require('../models/Solution');
+const solverQueue = require('../services/solverQueue');
+const artifactStore = require('../services/artifactStore');
+const { runPythonJson } = require('../services/pythonRunner');
 
 router.use((req, res, next) => {
   res.header('Access-Control-Allow-Origin', 'http://localhost:3000');
@@ -115,7 +118,29 @@ router.post('/solve', auth, async (req, res) => {
     console.log('🤖 Solution record created with ID:', solution._id);
 
     // Start solving process asynchronously
-    solveAssignmentAsync(solution._id, user.googleTokens.accessToken, materials);
+    if (solverQueue.isQueueEnabled()) {
+      try {
+        await solverQueue.enqueueSolveJob(solution._id, user.googleTokens.accessToken, materials, user._id,
+          { courseId, courseWorkId: assignmentId });
+      } catch (error) {
+        if (!(error instanceof solverQueue.QueueOverloadedError)) {
+          throw error;
+        }
+        // Turned away before any work was done: drop the record and tell the client when to retry
+        await Solution.findByIdAndDelete(solution._id);
+        console.log('🧵 Solver queue overloaded, retry after', error.retryAfter, 's');
+        res.set('Retry-After', String(error.retryAfter));
+        return res.status(503).json({
+          error: 'Solver is busy',
+          message: error.message,
+          retryAfter: error.retryAfter
+        });
+      }
+      watchQueuedSolution(solution._id);
+    } else {
+      solveAssignmentAsync(solution._id, user.googleTokens.accessToken, materials,
+        { courseId, courseWorkId: assignmentId, userId: user._id });
+    }
 
     res.json({
       success: true,
@@ -144,7 +169,7 @@ router.get('/solution/:solutionId', auth, async (req, res) => {
     const solution = await Solution.findOne({
       _id: solutionId,
       userId: user._id
-    });
+    }).select('-solutionPdf');
 
     if (!solution) {
       return res.status(404).json({
@@ -193,45 +218,66 @@ router.get('/solution/:solutionId/pdf', auth, async (req, res) => {
       });
     }
 
-    if (solution.status !== 'completed' || !solution.solutionPdf || solution.solutionPdf.length === 0) {
+    if (solution.status !== 'completed') {
       return res.status(400).json({
         error: 'Solution PDF not available'
       });
     }
 
-    console.log('📄 PDF DOWNLOAD - Sending PDF, size:', solution.solutionPdf.length, 'bytes');
-    console.log('📄 PDF DOWNLOAD - Assignment title:', solution.assignmentTitle);
-    
-    // Check if the PDF is valid (starts with %PDF)
-    const isValidPdf = solution.solutionPdf.length > 4 && 
-                      solution.solutionPdf[0] === 0x25 && 
-                      solution.solutionPdf[1] === 0x50 && 
-                      solution.solutionPdf[2] === 0x44 && 
-                      solution.solutionPdf[3] === 0x46;
-    
-    let pdfBuffer = solution.solutionPdf;
-    
-    if (!isValidPdf) {
-      console.log('📄 PDF DOWNLOAD - Invalid PDF detected, regenerating...');
+    // Check if the stored PDF is valid (starts with %PDF)
+    const inlinePdf = solution.solutionPdf;
+    const isValidPdf = !!inlinePdf && inlinePdf.length > 4 &&
+                      inlinePdf[0] === 0x25 &&
+                      inlinePdf[1] === 0x50 &&
+                      inlinePdf[2] === 0x44 &&
+                      inlinePdf[3] === 0x46;
+    let pdfArtifactPath = solution.pdfArtifact?.ref
+      ? artifactStore.artifactPath(solution.pdfArtifact.ref)
+      : null;
+    let pdfBuffer = inlinePdf;
+
+    if (!pdfArtifactPath && !isValidPdf) {
+      // Deferred, missing or invalid PDF: render it now through the Python render cache
+      console.log('📄 PDF DOWNLOAD - No valid PDF stored, rendering on demand...');
       try {
-        // Regenerate PDF from solution text
-        pdfBuffer = await createSimplePdf(solution.solutionText || 'No solution text available');
-        
-        // Update the solution with the new PDF
-        if (pdfBuffer && pdfBuffer.length > 0) {
+        const rendered = await renderSolutionPdf(solution);
+        if (rendered.pdfArtifact) {
+          solution.pdfArtifact = {
+            ref: rendered.pdfArtifact.ref,
+            size: rendered.pdfArtifact.size
+          };
+          pdfArtifactPath = artifactStore.artifactPath(rendered.pdfArtifact.ref);
+        } else {
+          pdfBuffer = Buffer.from(rendered.pdfBytes, 'hex');
           solution.solutionPdf = pdfBuffer;
-          await solution.save();
-          console.log('📄 PDF DOWNLOAD - PDF regenerated and saved, new size:', pdfBuffer.length);
         }
+        await solution.save();
+        console.log('📄 PDF DOWNLOAD - PDF rendered', rendered.cacheHit ? '(render cache hit)' : '');
       } catch (error) {
-        console.error('📄 PDF DOWNLOAD - Error regenerating PDF:', error);
+        console.error('📄 PDF DOWNLOAD - Error rendering PDF:', error);
         return res.status(500).json({
           error: 'Failed to generate valid PDF'
         });
       }
-    } else {
-      console.log('📄 PDF DOWNLOAD - Valid PDF detected');
     }
+
+    // Artifact-backed PDFs are streamed from the shared store with Range support
+    if (pdfArtifactPath) {
+      console.log('📄 PDF DOWNLOAD - Streaming artifact', solution.pdfArtifact.ref);
+      res.setHeader('Cache-Control', 'private, max-age=0, must-revalidate');
+      res.setHeader('ETag', `"${solution.pdfArtifact.ref}"`);
+      if (req.headers['if-none-match'] === `"${solution.pdfArtifact.ref}"`) {
+        return res.status(304).end();
+      }
+      res.setHeader('Access-Control-Allow-Origin', 'http://localhost:3000');
+      res.setHeader('Access-Control-Allow-Credentials', 'true');
+      res.setHeader('Content-Type', 'application/pdf');
+      res.setHeader('Content-Disposition', `inline; filename="${solution.assignmentTitle}_solution.pdf"`);
+      return artifactStore.sendArtifact(req, res, pdfArtifactPath);
+    }
+
+    console.log('📄 PDF DOWNLOAD - Sending PDF, size:', pdfBuffer.length, 'bytes');
+    console.log('📄 PDF DOWNLOAD - Assignment title:', solution.assignmentTitle);
     
     // Disable caching to prevent 304 Not Modified responses
     res.setHeader('Cache-Control', 'no-cache, no-store, must-revalidate');
@@ -384,7 +430,7 @@ router.get('/solutions', auth, async (req, res) => {
 });
 
 // Async function to solve assignment
-async function solveAssignmentAsync(solutionId, accessToken, materials) {
+async function solveAssignmentAsync(solutionId, accessToken, materials, usage = {}) {
   const startTime = Date.now();
   
   try {
@@ -405,7 +451,7 @@ async function solveAssignmentAsync(solutionId, accessToken, materials) {
     console.log('🤖 Calling Python solver with materials:', materials?.length || 0);
     
     // Spawn Python process with full path and UTF-8 encoding
-    const pythonExecutable = 'C:\\Python313\\python.exe';
+    const pythonExecutable = process.env.PYTHON_EXECUTABLE || 'C:\\Python313\\python.exe';
     const pythonProcess = spawn(pythonExecutable, [
       pythonSolverPath,
       geminiApiKey,
@@ -416,13 +462,28 @@ async function solveAssignmentAsync(solutionId, accessToken, materials) {
       env: {
         ...process.env,
         PYTHONIOENCODING: 'utf-8',
-        PYTHONUNBUFFERED: '1'
+        PYTHONUNBUFFERED: '1',
+        // Names the profile file when SOLVER_PROFILE_DIR is set
+        SOLVER_SOLUTION_ID: String(solutionId),
+        // What the LLM usage ledger accounts this solve to
+        SOLVER_COURSE_ID: String(usage.courseId || ''),
+        SOLVER_COURSE_WORK_ID: String(usage.courseWorkId || ''),
+        SOLVER_USER_ID: String(usage.userId || '')
       }
     });
 
     let solutionText = '';
     let errorOutput = '';
 
+    // Backstop for the solver's own deadline: a child that outlives it is stopped
+    const deadlineSeconds = parseFloat(process.env.SOLVER_JOB_DEADLINE_SECONDS || '600');
+    const killTimer = deadlineSeconds > 0
+      ? setTimeout(() => {
+          errorOutput += `\nSolver did not finish within its ${deadlineSeconds}s deadline and was stopped`;
+          pythonProcess.kill();
+        }, (deadlineSeconds + 30) * 1000)
+      : null;
+
     pythonProcess.stdout.setEncoding('utf8');
     pythonProcess.stderr.setEncoding('utf8');
 
@@ -436,6 +497,7 @@ async function solveAssignmentAsync(solutionId, accessToken, materials) {
     });
 
     pythonProcess.on('close', async (code) => {
+      clearTimeout(killTimer);
       const processingTime = Date.now() - startTime;
       
       try {
@@ -457,29 +519,7 @@ async function solveAssignmentAsync(solutionId, accessToken, materials) {
             parsedResult = { solutionText: solutionText.trim() };
           }
 
-          // Create PDF if not provided
-          let pdfBuffer = Buffer.from('');
-          if (parsedResult.pdfBytes) {
-            try {
-              pdfBuffer = Buffer.from(parsedResult.pdfBytes, 'hex');
-            } catch (e) {
-              console.error('🤖 Error parsing PDF bytes:', e);
-              pdfBuffer = await createSimplePdf(parsedResult.solutionText || solutionText);
-            }
-          } else {
-            // Generate PDF from text using simple method
-            pdfBuffer = await createSimplePdf(parsedResult.solutionText || solutionText);
-          }
-
-          // Update solution with results
-          solution.solutionText = parsedResult.solutionText || solutionText;
-          if (pdfBuffer && pdfBuffer.length > 0) {
-            solution.solutionPdf = pdfBuffer;
-          }
-          solution.status = 'completed';
-          solution.processingTime = processingTime;
-          
-          await solution.save();
+          await completeSolution(solution, parsedResult, solutionText, processingTime);
           console.log('🤖 Solution completed and saved');
           
         } else {
@@ -514,6 +554,102 @@ async function solveAssignmentAsync(solutionId, accessToken, materials) {
   }
 }
 
+// Store a successful solver result on the solution document
+async function completeSolution(solution, parsedResult, rawOutput, processingTime) {
+  // Create PDF if not provided
+  let pdfBuffer = Buffer.from('');
+  if (parsedResult.pdfDeferred) {
+    // Rendered on first download by services/pdfRenderer.py
+  } else if (parsedResult.pdfArtifact) {
+    solution.pdfArtifact = {
+      ref: parsedResult.pdfArtifact.ref,
+      size: parsedResult.pdfArtifact.size
+    };
+  } else if (parsedResult.pdfBytes) {
+    try {
+      pdfBuffer = Buffer.from(parsedResult.pdfBytes, 'hex');
+    } catch (e) {
+      console.error('🤖 Error parsing PDF bytes:', e);
+      pdfBuffer = await createSimplePdf(parsedResult.solutionText || rawOutput);
+    }
+  } else {
+    // Generate PDF from text using simple method
+    pdfBuffer = await createSimplePdf(parsedResult.solutionText || rawOutput);
+  }
+
+  // Update solution with results
+  solution.solutionText = parsedResult.solutionText || rawOutput;
+  if (parsedResult.textArtifact) {
+    solution.textArtifact = {
+      ref: parsedResult.textArtifact.ref,
+      size: parsedResult.textArtifact.size,
+      encoding: parsedResult.textArtifact.encoding
+    };
+  }
+  if (pdfBuffer && pdfBuffer.length > 0) {
+    solution.solutionPdf = pdfBuffer;
+  }
+  if (parsedResult.metrics) {
+    solution.solverMetrics = parsedResult.metrics;
+  }
+  solution.status = 'completed';
+  solution.processingTime = processingTime;
+
+  await solution.save();
+}
+
+// Render (or fetch from the render cache) the PDF for a solution's text
+async function renderSolutionPdf(solution) {
+  const request = solution.solutionText
+    ? { solutionText: solution.solutionText }
+    : { textRef: solution.textArtifact?.ref };
+  // Same title the solver uses, so renders made at solve time are cache hits
+  request.title = 'Assignment Solution';
+  return runPythonJson('pdfRenderer.py', [], JSON.stringify(request));
+}
+
+// Wait for a queued solve job and copy its outcome onto the solution
+function watchQueuedSolution(solutionId) {
+  solverQueue.watchJob(solutionId, async (job) => {
+    try {
+      const solution = await Solution.findById(solutionId);
+      if (!solution) {
+        console.error('🧵 Solution not found for queued job:', solutionId);
+        return;
+      }
+
+      const processingTime = Date.now() - solution.createdAt.getTime();
+      if (job && job.status === 'done' && job.result && job.result.success) {
+        await completeSolution(solution, job.result, '', processingTime);
+        console.log('🧵 Queued solution completed and saved:', solutionId);
+      } else {
+        solution.status = 'failed';
+        solution.solutionText = `Solving failed: ${(job && job.lastError) || 'Job was lost from the solver queue'}`;
+        solution.processingTime = processingTime;
+        await solution.save();
+        console.error('🧵 Queued solution failed:', solutionId);
+      }
+    } catch (dbError) {
+      console.error('🧵 Database error:', dbError);
+    }
+  });
+}
+
+// Re-attach to queued jobs after a server restart so no solution stays stuck in processing
+async function resumeQueuedSolutions() {
+  if (!solverQueue.isQueueEnabled()) {
+    return;
+  }
+
+  try {
+    const pending = await Solution.find({ status: 'processing' }).select('_id');
+    pending.forEach(solution => watchQueuedSolution(solution._id));
+    console.log('🧵 Watching', pending.length, 'queued solutions');
+  } catch (error) {
+    console.error('🧵 Error resuming queued solutions:', error);
+  }
+}
+
 // Simple PDF creation using PDFKit
 async function createSimplePdf(text) {
   try {
@@ -580,3 +716,4 @@ async function createSimplePdf(text) {
 }
 
 module.exports = router;
+module.exports.resumeQueuedSolutions = resumeQueuedSolutions;
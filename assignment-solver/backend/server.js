@@ -44,7 +44,7 @@ app.use(cors({
     'Content-Range',
     'Range'
   ],
-  exposedHeaders: ['Content-Length', 'Content-Type', 'Content-Disposition'],
+  exposedHeaders: ['Content-Length', 'Content-Type', 'Content-Disposition', 'Content-Range', 'Accept-Ranges'],
   preflightContinue: false,
   optionsSuccessStatus: 200
 }));
@@ -102,6 +102,7 @@ app.use('*', (req, res) => {
 mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/assignment-solver')
   .then(() => {
     console.log('✅ Connected to MongoDB');
+    require('./routes/solve').resumeQueuedSolutions();
   })
   .catch((err) => {
     console.error('❌ MongoDB connection error:', err);
@@ -0,0 +1,74 @@
+const fs = require('fs');
+const path = require('path');
+
+// Same layout as services/artifactStore.py: <data dir>/artifacts/ab/cd/<sha256>
+const backendDir = path.join(__dirname, '..');
+const dataDir = process.env.SOLVER_DATA_DIR
+  ? path.resolve(backendDir, process.env.SOLVER_DATA_DIR)
+  : path.join(backendDir, 'data');
+const artifactsDir = path.join(dataDir, 'artifacts');
+
+/**
+ * Path of an uncompressed artifact, or null if it is missing or compressed
+ */
+const artifactPath = (ref) => {
+  const digest = String(ref || '').replace(/^sha256:/, '');
+  if (!/^[0-9a-f]{64}$/.test(digest)) {
+    return null;
+  }
+  const filePath = path.join(artifactsDir, digest.slice(0, 2), digest.slice(2, 4), digest);
+  return fs.existsSync(filePath) ? filePath : null;
+};
+
+/**
+ * Parse a single-range "bytes=start-end" header against a known size
+ */
+const parseRange = (rangeHeader, size) => {
+  const match = /^bytes=(\d*)-(\d*)$/.exec(rangeHeader || '');
+  if (!match || (match[1] === '' && match[2] === '')) {
+    return null;
+  }
+  let start;
+  let end;
+  if (match[1] === '') {
+    // Suffix range: the last N bytes
+    start = Math.max(0, size - parseInt(match[2], 10));
+    end = size - 1;
+  } else {
+    start = parseInt(match[1], 10);
+    end = match[2] === '' ? size - 1 : Math.min(parseInt(match[2], 10), size - 1);
+  }
+  if (start > end || start >= size) {
+    return null;
+  }
+  return { start, end };
+};
+
+/**
+ * Stream an artifact to an Express response, honouring Range requests
+ */
+const sendArtifact = (req, res, filePath) => {
+  const size = fs.statSync(filePath).size;
+  res.setHeader('Accept-Ranges', 'bytes');
+
+  const rangeHeader = req.headers.range;
+  if (rangeHeader) {
+    const range = parseRange(rangeHeader, size);
+    if (!range) {
+      res.setHeader('Content-Range', `bytes */${size}`);
+      return res.status(416).end();
+    }
+    res.status(206);
+    res.setHeader('Content-Range', `bytes ${range.start}-${range.end}/${size}`);
+    res.setHeader('Content-Length', range.end - range.start + 1);
+    return fs.createReadStream(filePath, range).pipe(res);
+  }
+
+  res.setHeader('Content-Length', size);
+  return fs.createReadStream(filePath).pipe(res);
+};
+
+module.exports = {
+  artifactPath,
+  sendArtifact
+};
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed artifact store on the local filesystem.
+
+Artifacts are keyed by the SHA-256 of their uncompressed bytes and sharded
+as <root>/ab/cd/<digest><suffix>, so identical solutions produced for
+different users are written once. Text can be stored zlib- or
+zstd-compressed; PDFs are stored raw so readers can serve byte ranges
+straight from the file.
+
+    python artifactStore.py stat <ref>
+    python artifactStore.py cat <ref> [--start N] [--end N]
+"""
+import io
+import os
+import sys
+import zlib
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from solverConfig import SolverConfig
+
+REF_PREFIX = "sha256:"
+CHUNK_SIZE = 64 * 1024
+
+# encoding name -> file suffix
+ENCODINGS = {
+    "identity": "",
+    "zlib": ".zz",
+    "zstd": ".zst",
+}
+
+
+class ArtifactNotFound(KeyError):
+    pass
+
+
+class _ZlibReader(io.RawIOBase):
+    """Streams the decompressed contents of a zlib file"""
+
+    def __init__(self, fh: BinaryIO):
+        self._fh = fh
+        self._decompressor = zlib.decompressobj()
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = self._fh.read(CHUNK_SIZE)
+            if not chunk:
+                self._pending = self._decompressor.flush()
+                if not self._pending:
+                    return 0
+                break
+            self._pending = self._decompressor.decompress(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        self._fh.close()
+        super().close()
+
+
+class ArtifactStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    @classmethod
+    def from_config(cls, config: SolverConfig) -> "ArtifactStore":
+        return cls(config.artifacts_dir)
+
+    @staticmethod
+    def _digest(ref: str) -> str:
+        digest = ref[len(REF_PREFIX):] if ref.startswith(REF_PREFIX) else ref
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid artifact reference: {ref}")
+        return digest
+
+    def _base_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def locate(self, ref: str) -> Optional[tuple]:
+        """(path, encoding) of a stored artifact, or None"""
+        base = self._base_path(self._digest(ref))
+        for encoding, suffix in ENCODINGS.items():
+            path = base.with_name(base.name + suffix)
+            if path.exists():
+                return path, encoding
+        return None
+
+    def exists(self, ref: str) -> bool:
+        return self.locate(ref) is not None
+
+    def put(self, data: bytes, compression: Optional[str] = None,
+            media_type: str = "application/octet-stream") -> dict:
+        """Store bytes and return their reference; storing existing content is free"""
+        encoding = compression or "identity"
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if encoding == "zstd" and zstandard is None:
+            encoding = "zlib"
+
+        digest = hashlib.sha256(data).hexdigest()
+        ref = REF_PREFIX + digest
+        located = self.locate(ref)
+        if located is not None:
+            path, stored_encoding = located
+            return self._describe(ref, len(data), path, stored_encoding, media_type, deduplicated=True)
+
+        if encoding == "zlib":
+            stored = zlib.compress(data, 6)
+        elif encoding == "zstd":
+            stored = zstandard.ZstdCompressor(level=6).compress(data)
+        else:
+            stored = data
+
+        base = self._base_path(digest)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        path = base.with_name(base.name + ENCODINGS[encoding])
+        # Write then rename so readers never observe a partial artifact
+        fd, tmp_path = tempfile.mkstemp(dir=str(base.parent), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(stored)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return self._describe(ref, len(data), path, encoding, media_type, deduplicated=False)
+
+    def put_text(self, text: str, compression: Optional[str] = "zlib") -> dict:
+        return self.put(text.encode("utf-8"), compression=compression, media_type="text/plain; charset=utf-8")
+
+    @staticmethod
+    def _describe(ref: str, size: int, path: Path, encoding: str, media_type: str,
+                  deduplicated: bool) -> dict:
+        return {
+            "ref": ref,
+            "size": size,
+            "storedSize": path.stat().st_size,
+            "encoding": encoding,
+            "mediaType": media_type,
+            "deduplicated": deduplicated,
+        }
+
+    def open(self, ref: str) -> BinaryIO:
+        """Readable stream of the artifact's uncompressed bytes"""
+        located = self.locate(ref)
+        if located is None:
+            raise ArtifactNotFound(ref)
+        path, encoding = located
+        fh = open(path, "rb")
+        if encoding == "zlib":
+            return io.BufferedReader(_ZlibReader(fh), CHUNK_SIZE)
+        if encoding == "zstd":
+            if zstandard is None:
+                fh.close()
+                raise RuntimeError("zstandard is required to read this artifact")
+            return zstandard.ZstdDecompressor().stream_reader(fh, closefd=True)
+        return fh
+
+    def iter_range(self, ref: str, start: int = 0, end: Optional[int] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield bytes [start, end) in chunks; raw artifacts seek, compressed ones skip ahead"""
+        with self.open(ref) as stream:
+            if start:
+                if hasattr(stream, "seekable") and stream.seekable():
+                    stream.seek(start)
+                else:
+                    remaining = start
+                    while remaining > 0:
+                        skipped = stream.read(min(chunk_size, remaining))
+                        if not skipped:
+                            return
+                        remaining -= len(skipped)
+            remaining = None if end is None else max(0, end - start)
+            while remaining is None or remaining > 0:
+                chunk = stream.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def read_range(self, ref: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_range(ref, start, end))
+
+    def get(self, ref: str) -> bytes:
+        return self.read_range(ref)
+
+    def get_text(self, ref: str) -> str:
+        return self.get(ref).decode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read artifacts from the solver artifact store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stat = sub.add_parser("stat", help="print where and how an artifact is stored")
+    stat.add_argument("ref")
+    cat = sub.add_parser("cat", help="write an artifact (or a byte range of it) to stdout")
+    cat.add_argument("ref")
+    cat.add_argument("--start", type=int, default=0)
+    cat.add_argument("--end", type=int, default=None, help="exclusive end offset")
+    args = parser.parse_args()
+
+    store = ArtifactStore.from_config(SolverConfig.from_env())
+    located = store.locate(args.ref)
+    if located is None:
+        print(f"Artifact not found: {args.ref}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "stat":
+        path, encoding = located
+        print(f"{args.ref}\t{encoding}\t{path.stat().st_size}\t{path}")
+    else:
+        out = sys.stdout.buffer
+        for chunk in store.iter_range(args.ref, args.start, args.end):
+            out.write(chunk)
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
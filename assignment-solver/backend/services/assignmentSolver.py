@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import os
-import io
 import re
 import textwrap
 import sys
+import time
+import asyncio
+import tracemalloc
 import json
+import uuid
+import sqlite3
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # Set UTF-8 encoding for output
 if sys.platform == "win32":
@@ -27,31 +31,78 @@ if sys.platform == "win32":
 
 # Google APIs
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 
 # LLM + utils
 from dotenv import load_dotenv
-from pypdf import PdfReader
 from langchain.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-# PDF writing
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+# Sibling solver modules (this file is run as a script and imported as services.assignmentSolver)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from artifactStore import ArtifactStore
+from boilerplate import CHARS_PER_TOKEN, BoilerplateFilter
+from deadlines import JobCancelled, JobDeadline, LatencyHistory, invoke_with_deadline
+from duplicateText import DuplicateFilter
+from extractors import ExtractionBudget, PageStream, find_extractor
+from jobQueue import PermanentJobError
+from memoryMonitor import MemoryMonitor
+from parsedDocument import DocumentBuilder, ParsedDocument
+from pdfRenderer import DEFAULT_TITLE, RenderCache, clean_text_for_pdf, render_solution_pdf
+from questionCache import QuestionCache
+from resumableDownload import download_to_file
+from sampleProfiler import JobProfiler
+from singleFlight import material_set_key
+from solutionCache import SolutionCache
+from solverConfig import SolverConfig
+from solverUtils import safe_print
+from solverWorkers import WorkerPool
+from usageLedger import MeteredRunnable, UsageLedger, usage_of
 
-def safe_print(message):
-    """Print function that handles encoding issues on Windows and outputs to stderr for debugging"""
-    try:
-        print(message, file=sys.stderr)
-    except UnicodeEncodeError:
-        # If there's a Unicode error, print a safe ASCII version
-        safe_message = message.encode('ascii', 'replace').decode('ascii')
-        print(safe_message, file=sys.stderr)
+NO_CONTENT_TEXT = "No readable content found in assignment materials."
+# Shorter solutions are treated as a failed solve
+MIN_SOLUTION_CHARS = 10
+
+_BATCH_MARKER = re.compile(r"^\s*#{2,4}\s*ASSIGNMENT\s+(\d+)\s*$", re.MULTILINE)
+
+def split_batch_reply(reply: str, count: int) -> Dict[int, str]:
+    """Solutions of a batched reply by 1-based assignment number; sections that fail validation are left out"""
+    markers = list(_BATCH_MARKER.finditer(reply))
+    numbers = [int(marker.group(1)) for marker in markers]
+    solutions: Dict[int, str] = {}
+    for marker, following in zip(markers, markers[1:] + [None]):
+        number = int(marker.group(1))
+        # A repeated marker means the model mixed up the sections; trust neither
+        if not 1 <= number <= count or numbers.count(number) > 1:
+            continue
+        solution = reply[marker.end():following.start() if following else len(reply)].strip()
+        if len(solution) >= MIN_SOLUTION_CHARS and "<<<ASSIGNMENT" not in solution:
+            solutions[number] = solution
+    return solutions
 
 class AssignmentSolver:
-    def __init__(self, gemini_api_key: str):
+    def __init__(self, gemini_api_key: str, raise_errors: bool = False, usage_context: Optional[dict] = None,
+                 config: Optional[SolverConfig] = None):
         self.gemini_api_key = gemini_api_key
+        # Queue workers need LLM failures to surface so the job can be retried
+        self.raise_errors = raise_errors
+        self.config = config or SolverConfig.from_env()
+        # Per-job measurements returned to Node.js alongside the solution
+        self.metrics: dict = {}
+        self.memory = MemoryMonitor()
+        # Cleared when the solution was built from errors or incomplete input
+        self.cacheable = True
+        self.deadline = JobDeadline(self.config.job_deadline_seconds)
+        self.latency = LatencyHistory(self.config.latency_history_path)
+        # Who the LLM calls are made for (courseId, courseWorkId, userId, solutionId, source)
+        self.usage_context = usage_context or {}
+        # Partial downloads belong to one job, so concurrent solves of the same attachment never
+        # share a .part file; a retried job keeps its solution id and resumes its own download
+        self._download_tag = re.sub(r"[^\w.-]", "_", self.usage_context.get("solutionId") or "") or None
+        self.ledger = UsageLedger.from_config(self.config) if self.config.usage_ledger else None
+        self._loop = asyncio.new_event_loop()
         self.llm = self._get_llm()
         
     def _get_llm(self):
@@ -64,92 +115,68 @@ class AssignmentSolver:
             temperature=0.2
         )
     
-    def _read_pdf_from_url(self, access_token: str, file_id: str) -> str:
-        """Download and read PDF content from Google Drive"""
+    def _build_drive(self, access_token: str):
+        """Build a Drive client from the user's OAuth access token"""
+        # Create a proper credentials object
+        creds = Credentials(
+            token=access_token,
+            client_id=os.getenv('GOOGLE_CLIENT_ID'),
+            client_secret=os.getenv('GOOGLE_CLIENT_SECRET')
+        )
+        # A stalled socket read fails after http_timeout_seconds instead of hanging the job
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=self.config.http_timeout_seconds))
+        return build("drive", "v3", http=http, cache_discovery=False)
+    
+    def _download_path(self, file_id: str) -> Path:
+        """Where this job downloads a Drive file; unique per job, stable across its retries"""
+        tag = self._download_tag or f"tmp-{uuid.uuid4().hex}"
+        return self.config.downloads_dir / f"{tag}-{file_id}"
+    
+    def _open_drive_file(self, access_token: str, file_id: str) -> Optional[PageStream]:
+        """Download a Drive file and return its lazily extracted pages, or None if unreadable"""
         try:
-            safe_print(f"[PDF] Attempting to read PDF from Google Drive: {file_id}")
-            
-            # Create OAuth2 client with your app's credentials
-            from google.oauth2.credentials import Credentials
-            from google.auth.transport.requests import Request
-            
-            # Create a proper credentials object
-            creds = Credentials(
-                token=access_token,
-                client_id=os.getenv('GOOGLE_CLIENT_ID'),
-                client_secret=os.getenv('GOOGLE_CLIENT_SECRET')
-            )
+            safe_print(f"[DRIVE] Attempting to read file from Google Drive: {file_id}")
             
             # Build the Drive service
-            drive = build("drive", "v3", credentials=creds, cache_discovery=False)
-            
-            safe_print(f"[PDF] Drive service built successfully, downloading file...")
+            drive = self._build_drive(access_token)
+            meta = drive.files().get(fileId=file_id, fields="id,name,mimeType,md5Checksum,modifiedTime").execute()
+            mime_type = meta.get("mimeType", "")
             
-            # Download file
-            request = drive.files().get_media(fileId=file_id)
-            file_io = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_io, request)
+            extractor = find_extractor(mime_type)
+            if extractor is None:
+                safe_print(f"[DRIVE] Skipping unsupported file type: {mime_type}")
+                return None
             
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status:
-                    safe_print(f"[PDF] Download progress: {int(status.progress() * 100)}%")
-            
-            safe_print(f"[PDF] File downloaded successfully, reading PDF content...")
-            
-            # Read PDF content
-            file_io.seek(0)
-            reader = PdfReader(file_io)
-            
-            parts = []
-            for page in reader.pages:
-                try:
-                    text = page.extract_text()
-                    if text:
-                        parts.append(text)
-                except Exception as e:
-                    safe_print(f"Error extracting text from page: {e}")
-                    continue
+            # Native Google formats are exported straight to text; everything else is downloaded as-is
+            if extractor.export_mime:
+                safe_print(f"[DRIVE] Exporting {mime_type} as {extractor.export_mime}...")
+                request = drive.files().export_media(fileId=file_id, mimeType=extractor.export_mime)
+            else:
+                safe_print(f"[DRIVE] Downloading {mime_type}...")
+                request = drive.files().get_media(fileId=file_id)
+            # Range requests into data/downloads: a retried job resumes where the last attempt stopped
+            revision = meta.get("md5Checksum") or meta.get("modifiedTime")
+            dest = self._download_path(file_id)
+            try:
+                path = download_to_file(request, dest, revision=revision, check=self.deadline.check)
+            except BaseException:
+                if self._download_tag is None:
+                    # Nothing could resume a download without a job id
+                    for leftover in (dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json")):
+                        leftover.unlink(missing_ok=True)
+                raise
+            data = path.read_bytes()
+            path.unlink()
             
-            return "\n".join(parts).strip()
+            safe_print(f"[DRIVE] File downloaded successfully, extracting text with '{extractor.name}'...")
+            return extractor.extract(data, self.config)
             
+        except JobCancelled:
+            raise
         except Exception as e:
-            safe_print(f"Error reading PDF: {e}")
-            return ""
-    
-    def _extract_questions(self, text: str) -> List[str]:
-        """Extract questions from assignment text"""
-        lines = [ln.strip() for ln in text.splitlines()]
-        chunks = []
-        buf: List[str] = []
-        
-        def flush():
-            nonlocal buf, chunks
-            if buf:
-                joined = " ".join(buf).strip()
-                if joined:
-                    chunks.append(joined)
-                buf = []
-
-        for ln in lines:
-            if not ln:
-                flush()
-                continue
-            # Check for question patterns
-            if re.match(r"^(\d+[\).]\s+|[a-zA-Z]\)\s+|-|\*)", ln) or ln.endswith("?"):
-                flush()
-                buf.append(ln)
-                flush()
-            else:
-                buf.append(ln)
-        flush()
-
-        if not chunks:
-            # Fallback to paragraph splitting
-            paras = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
-            return paras[:20]
-        return chunks[:50]
+            safe_print(f"Error reading Drive file: {e}")
+            self.cacheable = False
+            return None
     
     def _create_assignment_prompt(self):
         """Create the assignment solving prompt"""
@@ -203,6 +230,169 @@ Provide complete, detailed solutions using ONLY ASCII characters."""
         )
     
     
+    def _create_questions_prompt(self):
+        """Prompt for answering individual questions with machine-readable answer markers"""
+        return ChatPromptTemplate.from_template(
+            """You are a careful, step-by-step problem solver and academic expert.
+Solve each of the questions below clearly and comprehensively.
+
+- Use ONLY standard ASCII characters (32-126): no emojis or Unicode symbols
+- Show each step, state formulas in ASCII, and state assumptions if information is missing
+- Start every answer with a line containing only its marker, exactly as given (for example "### Q3")
+- Do not repeat the question text and do not write anything before the first marker
+
+Questions:
+{questions}"""
+        )
+    
+    def _create_batch_prompt(self):
+        """Prompt for solving several unrelated assignments in one request"""
+        return ChatPromptTemplate.from_template(
+            """You are a careful, step-by-step problem solver and academic expert.
+Below are {count} separate assignments from different students. Solve each one on its own, clearly and completely.
+
+- Use ONLY standard ASCII characters (32-126): no emojis or Unicode symbols
+- Show numbered solutions matching each assignment's question order, with each step and formulas in ASCII
+- If a question lacks information, state the assumption and proceed
+- Start the solutions of assignment N with a line containing only "### ASSIGNMENT N", then give its solutions
+- Answer every assignment, in order, and never mix content between assignments
+
+{assignments}"""
+        )
+    
+    def solve_assignments_batch(self, texts: List[str], contexts: Optional[List[dict]] = None) -> Dict[int, str]:
+        """
+        Solve several assignment texts with one LLM request; returns {1-based index: solution}
+        for those split cleanly. contexts are the usage contexts of the jobs the texts belong to.
+        """
+        packed = "\n\n".join(
+            f"<<<ASSIGNMENT {i + 1}>>>\n{text.strip()}\n<<<END ASSIGNMENT {i + 1}>>>" for i, text in enumerate(texts)
+        )
+        chain = self._create_batch_prompt() | self.llm
+        safe_print(f"Sending {len(texts)} assignments to LLM in one request...")
+        reply = self._invoke_llm(chain, {"count": len(texts), "assignments": packed},
+                                 purpose="batch", contexts=contexts).content
+        solutions = split_batch_reply(reply, len(texts))
+        if len(solutions) < len(texts):
+            missing = sorted(set(range(1, len(texts) + 1)) - set(solutions))
+            safe_print(f"Could not split batched reply for assignments {missing}")
+        return {i: self._clean_text_for_pdf(solution) for i, solution in solutions.items()}
+    
+    def solve_questions(self, questions: List[str]) -> Optional[Dict[int, str]]:
+        """Answer a list of questions; returns {1-based index: answer} or None if the reply cannot be split"""
+        joined = "\n\n".join(f"### Q{i + 1}\n{q}" for i, q in enumerate(questions))
+        chain = self._create_questions_prompt() | self.llm
+        safe_print(f"Sending {len(questions)} uncached questions to LLM...")
+        reply = self._invoke_llm(chain, {"questions": joined}, purpose="questions").content
+        
+        answers: Dict[int, str] = {}
+        markers = list(re.finditer(r"^\s*#{2,4}\s*Q(\d+)\s*$", reply, re.MULTILINE))
+        for marker, following in zip(markers, markers[1:] + [None]):
+            end = following.start() if following else len(reply)
+            answer = reply[marker.end():end].strip()
+            if answer:
+                answers[int(marker.group(1))] = answer
+        if set(answers) != set(range(1, len(questions) + 1)):
+            safe_print(f"Could not split LLM reply into {len(questions)} answers (got {sorted(answers)})")
+            return None
+        return answers
+    
+    def _solve_with_question_cache(self, document: ParsedDocument) -> str:
+        """Reuse cached answers for known questions and send only the rest to the LLM"""
+        # Question offsets were found once for the document; only the chunks are sliced here
+        questions = document.questions()
+        if not questions:
+            return self.solve_assignment(document.text)
+        
+        # Answers are shared within a course only; without one, within the assignment
+        scope = self.usage_context.get("courseId") or self.usage_context.get("courseWorkId") or ""
+        cache = QuestionCache(self.config.question_cache_path, self.config.question_similarity, scope=scope)
+        lookups = [cache.lookup(q) for q in questions]
+        answers = {i: found["answer"] for i, found in enumerate(lookups) if found["match"]}
+        misses = [i for i in range(len(questions)) if i not in answers]
+        self.metrics["questionCache"] = {
+            "questions": len(questions),
+            "exactHits": sum(1 for found in lookups if found["match"] == "exact"),
+            "nearHits": sum(1 for found in lookups if found["match"] == "near"),
+            "misses": len(misses),
+            "hitRate": round((len(questions) - len(misses)) / len(questions), 3),
+            "similarities": [found["similarity"] for found in lookups],
+            "fallback": False
+        }
+        safe_print(f"Question cache: {len(questions) - len(misses)}/{len(questions)} questions reused")
+        
+        if misses:
+            try:
+                solved = self.solve_questions([questions[i] for i in misses])
+            except JobCancelled:
+                raise
+            except Exception as e:
+                safe_print(f"Error solving questions: {e}")
+                if self.raise_errors:
+                    raise
+                self.cacheable = False
+                return f"Error occurred while solving assignment: {str(e)}\n\nPlease try again or contact support if the issue persists."
+            if solved is None:
+                # The reply could not be attributed to questions; solve the whole text as before
+                self.metrics["questionCache"]["fallback"] = True
+                return self.solve_assignment(document.text)
+            for position, index in enumerate(misses):
+                answers[index] = self._clean_text_for_pdf(solved[position + 1])
+                cache.store(questions[index], answers[index])
+        
+        # Chunks keep their own labels ("1.", "a)"), so they are not renumbered here
+        solution = "\n\n".join(f"{questions[i]}\n\n{answers[i].strip()}" for i in range(len(questions)))
+        return self._clean_text_for_pdf(solution)
+    
+    def _llm_stats(self) -> dict:
+        return self.metrics.setdefault("llm", {"calls": 0, "hedged": 0, "hedgeWins": 0, "seconds": 0.0,
+                                               "inputTokens": 0, "outputTokens": 0})
+    
+    def _record_usage(self, purpose: str, contexts: Optional[List[dict]], attempt: str, outcome: str,
+                      reply, seconds: float):
+        """Count one LLM request (including hedges and failures) in the job metrics and the usage ledger"""
+        call = usage_of(reply, getattr(self.llm, "model", None))
+        stats = self._llm_stats()
+        stats["inputTokens"] += call["inputTokens"] or 0
+        stats["outputTokens"] += call["outputTokens"] or 0
+        if self.ledger is None:
+            return
+        call.update(purpose=purpose, attempt=attempt, outcome=outcome, seconds=seconds)
+        try:
+            self.ledger.record(call, contexts or [self.usage_context])
+        except sqlite3.Error as e:
+            # Accounting must never fail a solve
+            safe_print(f"Could not record LLM usage: {e}")
+    
+    def _invoke_llm(self, chain, inputs: dict, purpose: str = "assignment", contexts: Optional[List[dict]] = None):
+        """
+        Invoke an LLM chain within the job deadline, hedging slow calls when enabled.
+        Every LLM call goes through here, so each request's token usage reaches the ledger.
+        """
+        # The latency percentile is learned from, and gates, single whole-assignment calls only;
+        # batched requests and the smaller calls left after question-cache hits use the fixed delay
+        learned = self.config.hedge_llm and purpose == "assignment" and not contexts
+        hedge_after = None
+        if self.config.hedge_llm:
+            percentile = self.latency.percentile(self.config.hedge_percentile) if learned else None
+            hedge_after = percentile or self.config.hedge_after_seconds
+        metered = MeteredRunnable(chain, lambda attempt, outcome, reply, seconds: self._record_usage(
+            purpose, contexts, attempt, outcome, reply, seconds))
+        started = time.monotonic()
+        result, hedged, winner = invoke_with_deadline(metered, inputs, self.deadline, hedge_after, loop=self._loop)
+        elapsed = time.monotonic() - started
+        if learned:
+            self.latency.record(elapsed)
+        
+        stats = self._llm_stats()
+        stats["calls"] += 1
+        stats["hedged"] += int(hedged)
+        stats["hedgeWins"] += int(winner == "hedge")
+        stats["seconds"] = round(stats["seconds"] + elapsed, 3)
+        if hedged:
+            safe_print(f"LLM call hedged after {hedge_after:.1f}s; {winner} request answered first")
+        return result
+    
     def solve_assignment(self, assignment_text: str) -> str:
         """Solve assignment questions using LLM"""
         try:
@@ -213,7 +403,7 @@ Provide complete, detailed solutions using ONLY ASCII characters."""
             chain = prompt | self.llm
             
             safe_print("Sending request to LLM...")
-            result = chain.invoke({"assignment_text": assignment_text})
+            result = self._invoke_llm(chain, {"assignment_text": assignment_text})
             
             solution_text = result.content
             safe_print(f"LLM response received (length: {len(solution_text)} characters)")
@@ -224,175 +414,367 @@ Provide complete, detailed solutions using ONLY ASCII characters."""
             
             return cleaned_solution
             
+        except JobCancelled:
+            raise
         except Exception as e:
             error_msg = f"Error solving assignment: {e}"
             safe_print(error_msg)
+            if self.raise_errors:
+                raise
+            self.cacheable = False
             return f"Error occurred while solving assignment: {str(e)}\n\nPlease try again or contact support if the issue persists."
     
-    def solve_assignment_from_materials(self, access_token: str, materials: List[dict]) -> str:
-        """Solve assignment from Google Classroom materials"""
-        assignment_text = ""
+    def _extract_materials(self, access_token: str, materials: List[dict]) -> ParsedDocument:
+        """Extract the text of every Drive attachment until the prompt budget runs out"""
+        # Pages are collected per file and joined once, keeping their offsets
+        builder = DocumentBuilder()
+        budget = ExtractionBudget(self.config.prompt_budget_chars)
+        duplicates = DuplicateFilter(self.config.dedupe_max_distance) if self.config.dedupe else None
+        files_report = []
+        skipped_files = []
+        boilerplate_chars = 0
+        boilerplate_lines = 0
         
-        # Extract text from all materials
+        # Extract text from all materials until the prompt budget runs out
         for material in materials:
             if "driveFile" in material:
                 drive_file = material["driveFile"]["driveFile"]
                 file_id = drive_file["id"]
                 file_title = drive_file["title"]
                 
+                if budget.exhausted:
+                    # Not even downloaded: nothing more fits in the prompt
+                    skipped_files.append(file_title)
+                    continue
+                
                 safe_print(f"Processing file: {file_title}")
                 
-                # Read PDF content
-                file_content = self._read_pdf_from_url(access_token, file_id)
-                if file_content:
-                    assignment_text += f"\n\n=== {file_title} ===\n{file_content}"
+                # Read file content page by page
+                pages = self._open_drive_file(access_token, file_id)
+                if pages is None:
+                    continue
+                parts = []
+                pages_read = 0
+                # Headers, footers and page numbers are dropped before they count against the budget
+                cleaned = BoilerplateFilter(pages, paged=pages.paged and self.config.strip_boilerplate)
+                try:
+                    for page_text in cleaned:
+                        self.deadline.check()
+                        pages_read += 1
+                        # Content already taken from an earlier attachment is not charged twice
+                        if duplicates is not None:
+                            page_text = duplicates.clean(page_text)
+                        page_text = budget.take(page_text)
+                        if page_text:
+                            parts.append(page_text)
+                        if budget.exhausted:
+                            break
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    safe_print(f"Error extracting text from {file_title}: {e}")
+                pages_skipped = max(0, pages.total - pages_read) if pages.total is not None else None
+                if pages_skipped:
+                    safe_print(f"Prompt budget reached: skipped {pages_skipped} pages of {file_title}")
+                boilerplate_chars += cleaned.chars_removed
+                boilerplate_lines += cleaned.lines_removed
+                file_report = {"id": file_id, "title": file_title, "pagesRead": pages_read, "pagesSkipped": pages_skipped,
+                               "boilerplateChars": cleaned.chars_removed}
+                if pages.info:
+                    file_report["extractor"] = pages.info
+                duplicate_of = duplicates.end_file(file_title) if duplicates is not None else None
+                if duplicate_of is not None:
+                    kept = sum(len(part) for part in parts)
+                    budget.refund(kept)
+                    duplicates.drop_file(kept)
+                    safe_print(f"{file_title} repeats {duplicate_of}; left out of the prompt")
+                    parts = [f'(Same content as "{duplicate_of}"; omitted.)']
+                    file_report["duplicateOf"] = duplicate_of
+                files_report.append(file_report)
+                
+                builder.add_file(file_title, parts)
+        
+        self.metrics["extraction"] = {
+            "budgetChars": budget.max_chars,
+            "usedChars": budget.used,
+            "files": files_report,
+            "filesSkipped": skipped_files
+        }
+        self.metrics["boilerplate"] = {
+            "linesRemoved": boilerplate_lines,
+            "charsRemoved": boilerplate_chars,
+            "tokensSaved": boilerplate_chars // CHARS_PER_TOKEN
+        }
+        if boilerplate_chars:
+            safe_print(f"Stripped {boilerplate_lines} boilerplate lines (~{boilerplate_chars // CHARS_PER_TOKEN} tokens)")
+        if duplicates is not None:
+            self.metrics["duplicates"] = duplicates.report()
+            self.metrics["duplicates"]["tokensSaved"] = duplicates.chars_removed // CHARS_PER_TOKEN
+            if duplicates.chars_removed:
+                safe_print(f"Dropped {duplicates.chars_removed} duplicate characters across attachments")
+        document = builder.build()
+        self.metrics["document"] = document.report()
+        return document
+    
+    def extract_document(self, access_token: str, materials: List[dict]) -> ParsedDocument:
+        """The assignment's attachments, with the text as it goes into the prompt"""
+        with self.memory.stage("extract"), self.deadline.stage("extract"):
+            return self._extract_materials(access_token, materials)
+    
+    def solve_text(self, document: ParsedDocument) -> str:
+        """Solve an extracted assignment on its own"""
+        with self.memory.stage("solve"), self.deadline.stage("solve"):
+            if self.config.question_cache:
+                return self._solve_with_question_cache(document)
+            return self.solve_assignment(document.text)
+    
+    def solve_assignment_from_materials(self, access_token: str, materials: List[dict]) -> str:
+        """Solve assignment from Google Classroom materials"""
+        document = self.extract_document(access_token, materials)
         
-        if not assignment_text.strip():
-            return "No readable content found in assignment materials."
+        if not document.text.strip():
+            self.cacheable = False
+            return NO_CONTENT_TEXT
         
-        return self.solve_assignment(assignment_text)
+        return self.solve_text(document)
+    
+    def finish_metrics(self) -> dict:
+        """Add the memory and deadline reports once every stage has run"""
+        self.metrics["memory"] = self.memory.report()
+        self.metrics["deadline"] = self.deadline.report()
+        return self.metrics
     
     def _clean_text_for_pdf(self, text: str) -> str:
         """Clean text to be PDF-safe by removing unsupported characters"""
-        if not text:
-            return ""
-        
-        # Replace common Unicode characters with ASCII equivalents
-        replacements = {
-            # Quotes
-            '"': '"', '"': '"', ''': "'", ''': "'",
-            # Dashes
-            '–': '-', '—': '-', '―': '-',
-            # Arrows and symbols
-            '→': '->', '←': '<-', '↑': '^', '↓': 'v',
-            '✓': '[CHECK]', '✗': '[X]', '★': '*', '☆': '*',
-            # Mathematical symbols
-            '×': 'x', '÷': '/', '≤': '<=', '≥': '>=', '≠': '!=',
-            '∑': 'SUM', '∏': 'PRODUCT', '∆': 'DELTA', '∞': 'INFINITY',
-            # Bullets
-            '•': '* ', '◦': '- ', '▪': '- ', '▫': '- ',
-            # Other symbols
-            '©': '(C)', '®': '(R)', '™': '(TM)', '°': 'deg',
+        return clean_text_for_pdf(text)
+    
+    def create_solution_pdf(self, solution_text: str, title: str = "Assignment Solution") -> bytes:
+        """Create PDF from solution text with proper encoding handling"""
+        return render_solution_pdf(solution_text, title)
+
+def run_solve(gemini_key: str, access_token: str, materials: List[dict], raise_errors: bool = False,
+              presolve: bool = False, profile_tag: Optional[str] = None, usage_context: Optional[dict] = None) -> dict:
+    """Solve one set of materials and build the JSON result handed back to Node.js"""
+    # Sampled only with SOLVER_PROFILE_DIR set; the profile is kept when the job is slow
+    profiler = JobProfiler(SolverConfig.from_env(), profile_tag)
+    with profiler:
+        result = _solve_and_render(gemini_key, access_token, materials, raise_errors, presolve, usage_context)
+    if profiler.path is not None:
+        result["metrics"]["profile"] = str(profiler.path)
+    return result
+
+def _solve_and_render(gemini_key: str, access_token: str, materials: List[dict], raise_errors: bool,
+                      presolve: bool, usage_context: Optional[dict]) -> dict:
+    # Initialize solver
+    safe_print("🔧 Initializing solver...")
+    solver = AssignmentSolver(gemini_key, raise_errors=raise_errors, usage_context=usage_context)
+    
+    cache, cache_key, solution_text = _cached_solution(solver, access_token, materials)
+    if solution_text:
+        safe_print("✅ Solution served from cache")
+    else:
+        # Solve assignment
+        safe_print("🧠 Solving assignment...")
+        solution_text = solver.solve_assignment_from_materials(access_token, materials)
+        _keep_solution(solver, cache, cache_key, solution_text, presolve)
+    return _render_result(solver, solution_text)
+
+def _cached_solution(solver: AssignmentSolver, access_token: str, materials: List[dict]) -> tuple:
+    """(cache, cache key, cached solution text or None)"""
+    config = solver.config
+    cache = SolutionCache.from_config(config) if config.solution_cache else None
+    cache_key = material_set_key(materials, access_token, require_revisions=True) if cache else None
+    solution_text = cache.get(cache_key) if cache_key else None
+    if cache is not None:
+        solver.metrics["solutionCache"] = "hit" if solution_text else ("miss" if cache_key else "uncacheable")
+    return cache, cache_key, solution_text
+
+def _keep_solution(solver: AssignmentSolver, cache: Optional[SolutionCache], cache_key: Optional[str],
+                   solution_text: str, presolve: bool):
+    """Reject empty solutions and cache good ones"""
+    if not solution_text or len(solution_text.strip()) < MIN_SOLUTION_CHARS:
+        raise ValueError("Solution text is too short or empty")
+    
+    safe_print(f"✅ Solution generated: {len(solution_text)} characters")
+    if cache_key and solver.cacheable:
+        cache.put(cache_key, solution_text, source="presolve" if presolve else "solve")
+
+def _render_result(solver: AssignmentSolver, solution_text: str) -> dict:
+    """Render the solution and build the JSON result handed back to Node.js"""
+    config = solver.config
+    if config.render_mode == "on-demand":
+        # The PDF is rendered (and cached) by pdfRenderer.py the first time it is requested
+        safe_print("📄 PDF deferred until first download")
+        solver.finish_metrics()
+        result = {
+            "success": True,
+            "solutionText": solution_text,
+            "pdfDeferred": True,
+            "metrics": solver.metrics
         }
+        if config.artifacts:
+            result["textArtifact"] = _store_solution_text(config, solution_text)
+        return result
+    
+    if not config.artifacts:
+        # Create PDF
+        safe_print("📄 Creating PDF...")
+        with solver.memory.stage("render"), solver.deadline.stage("render"):
+            solver.deadline.check()
+            if config.render_fragments:
+                # Fragments are cached in the artifact store even when results carry inline bytes
+                render_cache = RenderCache.from_config(config)
+                pdf_artifact, _ = render_cache.render(solution_text, "Assignment Solution")
+                pdf_bytes = render_cache.store.get(pdf_artifact["ref"])
+            else:
+                pdf_bytes = solver.create_solution_pdf(solution_text, "Assignment Solution")
+        solver.finish_metrics()
         
-        # Apply replacements
-        cleaned_text = text
-        for unicode_char, ascii_replacement in replacements.items():
-            cleaned_text = cleaned_text.replace(unicode_char, ascii_replacement)
-        
-        # Remove any remaining non-ASCII characters
-        # Keep only printable ASCII characters (32-126) plus newlines and tabs
-        cleaned_text = ''.join(char for char in cleaned_text 
-                              if ord(char) < 128 and (char.isprintable() or char in '\n\r\t'))
+        if not pdf_bytes:
+            raise ValueError("PDF generation failed - no bytes returned")
         
-        return cleaned_text
+        safe_print(f"📦 PDF created: {len(pdf_bytes)} bytes")
+        return {
+            "success": True,
+            "solutionText": solution_text,
+            "pdfBytes": pdf_bytes.hex(),
+            "metrics": solver.metrics
+        }
     
-    def create_solution_pdf(self, solution_text: str, title: str = "Assignment Solution") -> bytes:
-        """Create PDF from solution text with proper encoding handling"""
-        try:
-            # Clean the solution text to be PDF-safe
-            clean_solution = self._clean_text_for_pdf(solution_text)
-            clean_title = self._clean_text_for_pdf(title)
-            
-            safe_print(f"Creating PDF with cleaned text (length: {len(clean_solution)} chars)")
-            
-            # Create PDF in memory with proper encoding
-            pdf_buffer = io.BytesIO()
-            
-            # Import additional ReportLab modules for better text handling
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-            from reportlab.lib.units import inch
-            from reportlab.lib.enums import TA_LEFT, TA_CENTER
-            
-            # Create document with proper encoding
-            doc = SimpleDocTemplate(
-                pdf_buffer,
-                pagesize=letter,
-                rightMargin=40,
-                leftMargin=40,
-                topMargin=50,
-                bottomMargin=50
-            )
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                fontName='Helvetica-Bold'
-            )
-            
-            body_style = ParagraphStyle(
-                'CustomBody',
-                parent=styles['Normal'],
-                fontSize=11,
-                spaceAfter=12,
-                alignment=TA_LEFT,
-                fontName='Helvetica',
-                leftIndent=0,
-                rightIndent=0
-            )
-            
-            # Build content
-            story = []
-            
-            # Add title
-            title_para = Paragraph(clean_title, title_style)
-            story.append(title_para)
-            story.append(Spacer(1, 0.2*inch))
-            
-            # Process solution text into paragraphs
-            paragraphs = clean_solution.split('\n\n')
-            
-            for para_text in paragraphs:
-                if para_text.strip():
-                    # Clean and escape HTML entities for ReportLab
-                    clean_para = para_text.strip()
-                    clean_para = clean_para.replace('&', '&amp;')
-                    clean_para = clean_para.replace('<', '&lt;')
-                    clean_para = clean_para.replace('>', '&gt;')
-                    
-                    # Create paragraph
-                    para = Paragraph(clean_para, body_style)
-                    story.append(para)
-                    story.append(Spacer(1, 0.1*inch))
-            
-            # Build PDF
-            doc.build(story)
-            
-            # Get PDF bytes
-            pdf_buffer.seek(0)
-            pdf_bytes = pdf_buffer.getvalue()
-            
-            safe_print(f"PDF created successfully (size: {len(pdf_bytes)} bytes)")
-            return pdf_bytes
-            
-        except Exception as e:
-            safe_print(f"Error creating PDF: {e}")
-            # Create a simple error PDF
+    # Hand back references into the shared artifact store instead of inline bytes
+    safe_print("📄 Creating PDF...")
+    with solver.memory.stage("render"), solver.deadline.stage("render"):
+        solver.deadline.check()
+        pdf_artifact, cache_hit = RenderCache.from_config(config).render(solution_text, "Assignment Solution")
+        text_artifact = _store_solution_text(config, solution_text)
+    solver.finish_metrics()
+    safe_print(f"🗄️ Artifacts stored: text {text_artifact['ref']}, pdf {pdf_artifact['ref']}"
+               f"{' (render cache hit)' if cache_hit else ''}")
+    return {
+        "success": True,
+        "solutionText": solution_text,
+        "textArtifact": text_artifact,
+        "pdfArtifact": pdf_artifact,
+        "metrics": solver.metrics
+    }
+
+def _store_solution_text(config: SolverConfig, solution_text: str) -> dict:
+    compression = None if config.text_compression in ("none", "identity") else config.text_compression
+    return ArtifactStore.from_config(config).put_text(solution_text, compression=compression)
+
+def _job_gemini_key(payload: dict) -> str:
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_key:
+        raise PermanentJobError("GEMINI_API_KEY is not set in the worker environment")
+    if not payload.get("accessToken"):
+        raise PermanentJobError("Job payload has no Google access token")
+    return gemini_key
+
+def _usage_context(payload: dict) -> dict:
+    """Whom a queued job's LLM calls are accounted to"""
+    return {"courseId": payload.get("courseId"), "courseWorkId": payload.get("courseWorkId"),
+            "userId": payload.get("userId"), "solutionId": payload.get("solutionId"),
+            "source": "presolve" if payload.get("presolve") else "solve"}
+
+def _warm_render_cache(config: SolverConfig, payload: dict, result: dict):
+    if payload.get("presolve") and result.get("pdfDeferred") and config.artifacts:
+        # Warm the render cache too, so the first download does not wait for reportlab
+        RenderCache.from_config(config).render(result["solutionText"], DEFAULT_TITLE)
+
+def solve_job(payload: dict) -> dict:
+    """Job handler run by the worker pool for each queued solve"""
+    gemini_key = _job_gemini_key(payload)
+    result = run_solve(gemini_key, payload["accessToken"], payload.get("materials") or [],
+                       raise_errors=True, presolve=bool(payload.get("presolve")),
+                       profile_tag=payload.get("solutionId") or payload.get("courseWorkId"),
+                       usage_context=_usage_context(payload))
+    _warm_render_cache(SolverConfig.from_env(), payload, result)
+    return result
+
+def solve_jobs_batch(payloads: List[dict]) -> List[object]:
+    """
+    Batch handler run by the worker pool for several small solves. Each job's
+    attachments are extracted with its own token; texts of at most
+    SOLVER_BATCH_MAX_CHARS go to the LLM in one request and the reply is split
+    back per job. Jobs whose section is missing or malformed, or that were too
+    long to batch, are solved on their own. Returns a result or an exception
+    per payload.
+    """
+    config = SolverConfig.from_env()
+    outcomes: List[object] = [None] * len(payloads)
+    entries: Dict[int, dict] = {}
+    tag = (payloads[0].get("solutionId") or payloads[0].get("courseWorkId")) if payloads else None
+    profiler = JobProfiler(config, f"batch-{tag}")
+    with profiler:
+        for position, payload in enumerate(payloads):
+            try:
+                solver = AssignmentSolver(_job_gemini_key(payload), raise_errors=True,
+                                          usage_context=_usage_context(payload))
+                materials = payload.get("materials") or []
+                cache, cache_key, solution_text = _cached_solution(solver, payload["accessToken"], materials)
+                document = None
+                if not solution_text:
+                    document = solver.extract_document(payload["accessToken"], materials)
+                    if not document.text.strip():
+                        solver.cacheable = False
+                        solution_text, document = NO_CONTENT_TEXT, None
+                entries[position] = {"solver": solver, "cache": cache, "cacheKey": cache_key,
+                                     "document": document, "solution": solution_text}
+            except Exception as e:
+                outcomes[position] = e
+        
+        batched = [p for p, entry in entries.items()
+                   if entry["document"] is not None and len(entry["document"]) <= config.batch_max_chars]
+        if len(batched) > 1:
+            lead = entries[batched[0]]["solver"]
+            try:
+                with lead.memory.stage("solve"), lead.deadline.stage("solve"):
+                    texts = [entries[p]["document"].text for p in batched]
+                    # The request's tokens are split between the jobs it served
+                    contexts = [entries[p]["solver"].usage_context for p in batched]
+                    solutions = lead.solve_assignments_batch(texts, contexts=contexts)
+            except Exception as e:
+                safe_print(f"Batched LLM request failed, solving each assignment on its own: {e}")
+                solutions = {}
+            for number, position in enumerate(batched, start=1):
+                entry = entries[position]
+                entry["solver"].metrics["batch"] = {"jobs": len(batched), "split": number in solutions}
+                if number in solutions:
+                    entry["solution"] = solutions[number]
+        
+        for position, entry in entries.items():
+            solver = entry["solver"]
             try:
-                pdf_buffer = io.BytesIO()
-                c = canvas.Canvas(pdf_buffer, pagesize=letter)
-                c.setFont("Helvetica", 12)
-                c.drawString(40, 750, "Error generating assignment solution PDF")
-                c.drawString(40, 730, f"Error: {str(e)}")
-                c.drawString(40, 710, "Please try again or contact support.")
-                c.save()
-                pdf_buffer.seek(0)
-                return pdf_buffer.getvalue()
-            except:
-                return b""
+                if entry["document"] is not None:
+                    if entry["solution"] is None:
+                        entry["solution"] = solver.solve_text(entry["document"])
+                    _keep_solution(solver, entry["cache"], entry["cacheKey"], entry["solution"],
+                                   bool(payloads[position].get("presolve")))
+                outcomes[position] = _render_result(solver, entry["solution"])
+                _warm_render_cache(config, payloads[position], outcomes[position])
+            except Exception as e:
+                outcomes[position] = e
+    if profiler.path is not None:
+        for outcome in outcomes:
+            if isinstance(outcome, dict):
+                outcome["metrics"]["profile"] = str(profiler.path)
+    return outcomes
+
+def run_workers():
+    """Run the solver worker pool until interrupted"""
+    load_dotenv()
+    WorkerPool(solve_job, batch_handler=solve_jobs_batch).run()
 
 def main():
     """CLI interface for Node.js integration with enhanced error handling"""
+    if len(sys.argv) == 2 and sys.argv[1] == "worker":
+        run_workers()
+        return
+    
     if len(sys.argv) < 4:
         error_result = {
             "success": False,
-            "error": "Usage: python assignment_solver.py <gemini_api_key> <access_token> <materials_json>",
+            "error": "Usage: python assignment_solver.py <gemini_api_key> <access_token> <materials_json> | worker",
             "solutionText": "Invalid command line arguments provided."
         }
         print(json.dumps(error_result))
@@ -413,34 +795,15 @@ def main():
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in materials: {e}")
         
-        # Initialize solver
-        safe_print("🔧 Initializing solver...")
-        solver = AssignmentSolver(gemini_key)
-        
-        # Solve assignment
-        safe_print("🧠 Solving assignment...")
-        solution_text = solver.solve_assignment_from_materials(access_token, materials)
-        
-        if not solution_text or len(solution_text.strip()) < 10:
-            raise ValueError("Solution text is too short or empty")
-        
-        safe_print(f"✅ Solution generated: {len(solution_text)} characters")
-        
-        # Create PDF
-        safe_print("📄 Creating PDF...")
-        pdf_bytes = solver.create_solution_pdf(solution_text, "Assignment Solution")
-        
-        if not pdf_bytes:
-            raise ValueError("PDF generation failed - no bytes returned")
-        
-        safe_print(f"📦 PDF created: {len(pdf_bytes)} bytes")
-        
-        # Return JSON response
-        result = {
-            "success": True,
-            "solutionText": solution_text,
-            "pdfBytes": pdf_bytes.hex()
-        }
+        if SolverConfig.from_env().trace_memory:
+            tracemalloc.start()
+        # Node.js passes the solution id so a kept profile can be matched to the request,
+        # and the course, coursework and user the LLM usage is accounted to
+        usage_context = {field: os.getenv(name) or None for field, name in (
+            ("courseId", "SOLVER_COURSE_ID"), ("courseWorkId", "SOLVER_COURSE_WORK_ID"),
+            ("userId", "SOLVER_USER_ID"), ("solutionId", "SOLVER_SOLUTION_ID"))}
+        result = run_solve(gemini_key, access_token, materials, profile_tag=os.getenv("SOLVER_SOLUTION_ID"),
+                           usage_context=usage_context)
         
         safe_print("🎉 Assignment solving completed successfully!")
         print(json.dumps(result))
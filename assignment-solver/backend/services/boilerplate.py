@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Removes running headers, footers and page numbers from extracted pages.
+
+Handouts repeat the course code, institution name and page number on every
+page; sent to the LLM as-is they only cost input tokens. The filter looks at
+the first pages of a file, finds lines repeated verbatim in the top or
+bottom lines of most of them, and keeps only their first occurrence, so the
+course name is still seen once and a repeated instruction is not lost. Page
+numbers written as such ("Page 7", "7 of 9", "7 / 9", "- 7 -") are dropped
+everywhere. A bare "7" is only dropped when the sampled pages carry bare
+numbers at the same edge that count up with the page, and only when it is
+this page's number, so a year, a lone answer or a "3)" marker stays.
+Numbered lines are not matched loosely: "Question 3: ..." on every page is
+content, not a header. Runs of blank lines are collapsed.
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# Pages inspected before deciding what is boilerplate
+SAMPLE_PAGES = 8
+# Lines at each end of a page that may hold a header or footer
+EDGE_LINES = 3
+# Share of sampled pages a line must appear on to count as boilerplate
+MIN_PAGE_RATIO = 0.5
+
+# Rough characters-per-token ratio for reporting savings
+CHARS_PER_TOKEN = 4
+
+_PAGE_NUMBER = re.compile(
+    r"^(?:page\s*\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?|\d{1,4}\s*(?:of|/)\s*\d{1,4}|[-–]\s*\d{1,4}\s*[-–])$",
+    re.IGNORECASE,
+)
+_BARE_NUMBER = re.compile(r"^\d{1,4}$")
+_BLANK_RUN = re.compile(r"\n{3,}")
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.lower().split())
+
+
+def _edges(lines: List[str]) -> List[Tuple[str, int]]:
+    """(position, index) pairs of the non-blank lines near the top and bottom of a page"""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    top = [("top", i) for i in filled[:EDGE_LINES]]
+    bottom = [("bottom", i) for i in filled[-EDGE_LINES:]]
+    return top + [edge for edge in bottom if edge[1] not in {i for _, i in top}]
+
+
+def collapse_blank_lines(text: str) -> str:
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_RUN.sub("\n\n", text).strip("\n")
+
+
+class BoilerplateFilter:
+    """Wraps an iterable of page texts and yields them with boilerplate removed"""
+
+    def __init__(self, pages: Iterable[str], paged: bool = True):
+        self._pages = iter(pages)
+        # Blocks of a text document have no running headers; only blank runs are collapsed there
+        self.paged = paged
+        self.chars_in = 0
+        self.chars_out = 0
+        self.lines_removed = 0
+        self._keys: Set[Tuple[str, str]] = set()
+        self._seen: Set[Tuple[str, str]] = set()
+        # Edge ("top"/"bottom") -> printed number minus page index, where bare page numbers were found
+        self._numbering: Dict[str, int] = {}
+        self._page = 0
+
+    def _learn(self, sample: List[str]):
+        counts: Counter = Counter()
+        numbering: Counter = Counter()
+        for index, page in enumerate(sample):
+            lines = page.split("\n")
+            edges = _edges(lines)
+            counts.update({(pos, _line_key(lines[i])) for pos, i in edges})
+            numbering.update({(pos, int(lines[i]) - index) for pos, i in edges if _BARE_NUMBER.match(lines[i].strip())})
+        needed = max(2, int(len(sample) * MIN_PAGE_RATIO + 0.999))
+        self._keys = {key for key, count in counts.items() if count >= needed}
+        # Bare numbers are page numbers only when they count up with the pages at one edge
+        for (pos, offset), count in numbering.most_common():
+            if count >= needed:
+                self._numbering.setdefault(pos, offset)
+
+    def _is_page_number(self, pos: str, line: str) -> bool:
+        offset = self._numbering.get(pos)
+        return offset is not None and _BARE_NUMBER.match(line) is not None and int(line) == self._page + offset
+
+    def clean(self, page: str) -> str:
+        self.chars_in += len(page)
+        if self.paged:
+            lines = page.split("\n")
+            drop = set()
+            for pos, i in _edges(lines):
+                line = lines[i].strip()
+                key = (pos, _line_key(line))
+                if _PAGE_NUMBER.match(line) or key in self._seen or self._is_page_number(pos, line):
+                    drop.add(i)
+                elif key in self._keys:
+                    self._seen.add(key)
+            self.lines_removed += len(drop)
+            page = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+            self._page += 1
+        page = collapse_blank_lines(page)
+        self.chars_out += len(page)
+        return page
+
+    def __iter__(self) -> Iterator[str]:
+        sample: List[str] = []
+        if self.paged:
+            # Buffer the first pages; they are extracted anyway unless the budget runs out first
+            for page in self._pages:
+                sample.append(page)
+                if len(sample) >= SAMPLE_PAGES:
+                    break
+            if len(sample) >= 2:
+                self._learn(sample)
+        for page in sample:
+            yield self.clean(page)
+        for page in self._pages:
+            yield self.clean(page)
+
+    @property
+    def chars_removed(self) -> int:
+        return self.chars_in - self.chars_out
+
+
+def strip_boilerplate(pages: List[str]) -> List[str]:
+    """Eager variant for callers that already hold every page"""
+    return list(BoilerplateFilter(pages))
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-course BM25 index over course material text, for adding only the
+relevant passages of a course's notes to a prompt.
+
+Documents are cut into passages of about PASSAGE_CHARS. Each call to
+add_documents writes one immutable segment of NumPy arrays in term-major
+(CSC) order: for term t, doc_ids[term_ptr[t]:term_ptr[t + 1]] are the
+passages containing it and tfs the matching term frequencies. Segments are
+opened with mmap_mode="r", so a search touches only the postings of the
+query terms. Re-adding a document at a new revision tombstones its old
+passages; once there are more than MAX_SEGMENTS segments, or a third of
+the passages are dead, everything is rewritten into a single segment.
+
+    index = CourseIndex.for_course(root, course_id)
+    index.add_documents([(file_id, revision, title, text)])
+    index.search("state the first law of thermodynamics", k=3)
+"""
+import os
+import re
+import json
+import math
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+PASSAGE_CHARS = 800
+MAX_SEGMENTS = 8
+MAX_DEAD_RATIO = 0.33
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+what which who how why when where does do did can you your we our they their i he she not no
+""".split())
+
+Document = Tuple[str, str, str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_passages(text: str, target: int = PASSAGE_CHARS) -> List[str]:
+    """Group paragraphs into passages of about target characters; longer paragraphs are cut at sentences"""
+    pieces: List[str] = []
+    for para in re.split(r"\n\s*\n", text):
+        para = " ".join(para.split())
+        while len(para) > target * 2:
+            cut = para.rfind(". ", 0, target * 2)
+            cut = cut + 1 if cut > target // 2 else target
+            pieces.append(para[:cut].strip())
+            para = para[cut:].strip()
+        if para:
+            pieces.append(para)
+    passages: List[str] = []
+    buf = ""
+    for piece in pieces:
+        if buf and len(buf) + len(piece) > target:
+            passages.append(buf)
+            buf = ""
+        buf = f"{buf}\n\n{piece}" if buf else piece
+    if buf:
+        passages.append(buf)
+    return passages
+
+
+class _Segment:
+    """Memory-mapped arrays and passage texts of one segment"""
+
+    def __init__(self, directory: Path, name: str):
+        self.name = name
+        base = directory / name
+        self.term_ptr = np.load(f"{base}.term_ptr.npy", mmap_mode="r")
+        self.doc_ids = np.load(f"{base}.doc_ids.npy", mmap_mode="r")
+        self.tfs = np.load(f"{base}.tfs.npy", mmap_mode="r")
+        self.lengths = np.load(f"{base}.lengths.npy", mmap_mode="r")
+        self.offsets = np.load(f"{base}.offsets.npy", mmap_mode="r")
+        self.passages_path = Path(f"{base}.passages.jsonl")
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term_id + 1 >= len(self.term_ptr):
+            # Term added to the vocabulary after this segment was written
+            return self.doc_ids[:0], self.tfs[:0]
+        start, end = int(self.term_ptr[term_id]), int(self.term_ptr[term_id + 1])
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def passages(self, ids: Iterable[int]) -> Dict[int, dict]:
+        found = {}
+        with open(self.passages_path, "rb") as fh:
+            for pid in ids:
+                fh.seek(int(self.offsets[pid]))
+                found[pid] = json.loads(fh.readline())
+        return found
+
+
+class CourseIndex:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._read_json("manifest.json", {"segments": [], "documents": {}, "next_segment": 1})
+        self.vocab: Dict[str, int] = self._read_json("vocab.json", {})
+        self._segments: Dict[str, _Segment] = {}
+
+    @classmethod
+    def for_course(cls, root: Path, course_id: str) -> "CourseIndex":
+        return cls(Path(root) / re.sub(r"[^A-Za-z0-9_.-]", "_", str(course_id)))
+
+    def _read_json(self, name: str, default):
+        try:
+            with open(self.directory / name, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return default
+
+    def _write_json(self, name: str, value):
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.directory), prefix=f".{name}-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(value, fh)
+        os.replace(tmp_path, self.directory / name)
+
+    def _segment(self, name: str) -> _Segment:
+        if name not in self._segments:
+            self._segments[name] = _Segment(self.directory, name)
+        return self._segments[name]
+
+    # --------------------------
+    # Writing
+    # --------------------------
+    def has(self, doc_id: str, revision: Optional[str]) -> bool:
+        """Whether this revision of a document is already indexed"""
+        doc = self.manifest["documents"].get(doc_id)
+        return doc is not None and revision is not None and doc["revision"] == revision
+
+    def add_documents(self, documents: List[Document]) -> int:
+        """Index (doc_id, revision, title, text) tuples, replacing older revisions; returns passages added"""
+        records = []
+        placed = []
+        for doc_id, revision, title, text in documents:
+            if self.has(doc_id, revision):
+                continue
+            self._remove(doc_id)
+            passages = split_passages(text)
+            placed.append((doc_id, revision, title, len(records), len(passages)))
+            records.extend({"doc": doc_id, "title": title, "text": p} for p in passages)
+        if not placed:
+            return 0
+        name = f"seg-{self.manifest['next_segment']:06d}"
+        self.manifest["next_segment"] += 1
+        if records:
+            self._write_segment(name, records)
+            self.manifest["segments"].append({"name": name, "passages": len(records), "deleted": []})
+        for doc_id, revision, title, first, count in placed:
+            self.manifest["documents"][doc_id] = {"revision": revision, "title": title,
+                                                  "segment": name if count else None,
+                                                  "first": first, "count": count}
+        self._write_json("vocab.json", self.vocab)
+        self._write_json("manifest.json", self.manifest)
+        if self._needs_compaction():
+            self.compact()
+        return len(records)
+
+    def _remove(self, doc_id: str):
+        doc = self.manifest["documents"].pop(doc_id, None)
+        if doc is None or not doc["segment"]:
+            return
+        for segment in self.manifest["segments"]:
+            if segment["name"] == doc["segment"]:
+                segment["deleted"] = sorted(set(segment["deleted"]) | set(range(doc["first"], doc["first"] + doc["count"])))
+
+    def _write_segment(self, name: str, records: List[dict]):
+        term_ids: List[int] = []
+        passage_ids: List[int] = []
+        counts: List[int] = []
+        lengths = np.zeros(len(records), dtype=np.float32)
+        for pid, record in enumerate(records):
+            tokens = tokenize(record["text"])
+            lengths[pid] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                passage_ids.append(pid)
+                counts.append(tf)
+        terms = np.asarray(term_ids, dtype=np.int64)
+        order = np.lexsort((np.asarray(passage_ids, dtype=np.int64), terms))
+        term_ptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocab)), out=term_ptr[1:])
+
+        base = self.directory / name
+        np.save(f"{base}.term_ptr.npy", term_ptr)
+        np.save(f"{base}.doc_ids.npy", np.asarray(passage_ids, dtype=np.int32)[order])
+        np.save(f"{base}.tfs.npy", np.asarray(counts, dtype=np.float32)[order])
+        np.save(f"{base}.lengths.npy", lengths)
+        offsets = np.zeros(len(records), dtype=np.int64)
+        with open(f"{base}.passages.jsonl", "wb") as fh:
+            for pid, record in enumerate(records):
+                offsets[pid] = fh.tell()
+                fh.write(json.dumps(record).encode("utf-8") + b"\n")
+        np.save(f"{base}.offsets.npy", offsets)
+
+    def _needs_compaction(self) -> bool:
+        segments = self.manifest["segments"]
+        total = sum(s["passages"] for s in segments)
+        dead = sum(len(s["deleted"]) for s in segments)
+        return len(segments) > MAX_SEGMENTS or (total and dead / total > MAX_DEAD_RATIO)
+
+    def compact(self):
+        """Rewrite every live passage into one segment and drop the old ones"""
+        old = [s["name"] for s in self.manifest["segments"]]
+        documents = []
+        for doc_id, doc in self.manifest["documents"].items():
+            text = ""
+            if doc["segment"]:
+                found = self._segment(doc["segment"]).passages(range(doc["first"], doc["first"] + doc["count"]))
+                text = "\n\n".join(found[pid]["text"] for pid in sorted(found))
+            documents.append((doc_id, doc["revision"], doc["title"], text))
+        self.manifest = {"segments": [], "documents": {}, "next_segment": self.manifest["next_segment"]}
+        self.vocab = {}
+        self._segments = {}
+        # Passages keep their paragraph breaks, so splitting the joined text gives the same passages back
+        self.add_documents(documents)
+        for name in old:
+            for suffix in ("term_ptr.npy", "doc_ids.npy", "tfs.npy", "lengths.npy", "offsets.npy", "passages.jsonl"):
+                path = self.directory / f"{name}.{suffix}"
+                if path.exists():
+                    path.unlink()
+
+    # --------------------------
+    # Reading
+    # --------------------------
+    def search(self, query: str, k: int = 3) -> List[dict]:
+        """Top-k passages by BM25 score, as {"doc", "title", "text", "score"}"""
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        segments = [(s, self._segment(s["name"])) for s in self.manifest["segments"]]
+        if not term_ids or not segments:
+            return []
+        live = sum(s["passages"] - len(s["deleted"]) for s, _ in segments)
+        avgdl = max(1e-6, sum(float(np.sum(seg.lengths)) for _, seg in segments) / max(1, sum(s["passages"] for s, _ in segments)))
+        df = {t: sum(len(seg.postings(t)[0]) for _, seg in segments) for t in term_ids}
+
+        candidates = []
+        for info, seg in segments:
+            scores = np.zeros(info["passages"], dtype=np.float32)
+            for t in term_ids:
+                docs, tfs = seg.postings(t)
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (live - df[t] + 0.5) / (df[t] + 0.5))
+                norm = tfs * (K1 + 1) / (tfs + K1 * (1 - B + B * seg.lengths[docs] / avgdl))
+                # Each passage appears once per term, so plain fancy-index addition is safe
+                scores[docs] += idf * norm
+            if info["deleted"]:
+                scores[np.asarray(info["deleted"], dtype=np.int64)] = 0
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            candidates.extend((float(scores[pid]), info["name"], int(pid)) for pid in top if scores[pid] > 0)
+
+        best = sorted(candidates, reverse=True)[:k]
+        results = []
+        for score, name, pid in best:
+            record = self._segment(name).passages([pid])[pid]
+            results.append({**record, "score": round(score, 3)})
+        return results
+
+    def stats(self) -> dict:
+        segments = self.manifest["segments"]
+        return {
+            "documents": len(self.manifest["documents"]),
+            "segments": len(segments),
+            "passages": sum(s["passages"] - len(s["deleted"]) for s in segments),
+            "terms": len(self.vocab),
+        }
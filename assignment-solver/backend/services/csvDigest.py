@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact digests of CSV files (Google Sheets exports, gradebooks, datasets).
+
+Sending every row of a 50k-row sheet to the LLM makes an enormous, slow
+prompt that mostly repeats itself. Instead the CSV is streamed in chunks of
+CHUNK_ROWS rows; each chunk's columns are NumPy string arrays, which are
+parsed to floats and summarized in bulk (type, empty cells, min/max/mean/std,
+distinct values, most common values). A reservoir keeps sample_rows rows
+chosen uniformly from the whole file. The digest is the column summary plus
+those rows, so its size depends on the column count and the sample budget,
+not on the number of rows.
+"""
+import io
+import csv
+import random
+from typing import BinaryIO, Dict, List, Optional
+
+import numpy as np
+
+CHUNK_ROWS = 8192
+DEFAULT_SAMPLE_ROWS = 20
+# Distinct values are counted exactly up to this many per column
+DISTINCT_LIMIT = 10000
+# Most common values listed for text columns with few distinct values
+TOP_VALUES = 5
+MAX_COLUMNS = 40
+CELL_CHARS = 40
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() and abs(value) < 1e15 else f"{value:.4g}"
+
+
+class ColumnSummary:
+    """Running statistics of one column, updated a chunk at a time"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.filled = 0
+        self.empty = 0
+        self.numeric = True
+        self.integer = True
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.mean = 0.0
+        # Sum of squared deviations from the mean, merged across chunks (Chan et al.)
+        self._m2 = 0.0
+        # value -> count; None once there are more than DISTINCT_LIMIT distinct values
+        self.counts: Optional[Dict[str, int]] = {}
+
+    def add(self, cells: np.ndarray):
+        cells = np.char.strip(cells)
+        filled = cells[cells != ""]
+        self.empty += len(cells) - len(filled)
+        if not len(filled):
+            return
+        if self.numeric:
+            try:
+                numbers = filled.astype(np.float64)
+            except ValueError:
+                # One non-numeric cell makes the whole column text
+                self.numeric = False
+            else:
+                self._add_numbers(numbers)
+        self.filled += len(filled)
+        if self.counts is not None:
+            values, counts = np.unique(filled, return_counts=True)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                self.counts[value] = self.counts.get(value, 0) + count
+            if len(self.counts) > DISTINCT_LIMIT:
+                self.counts = None
+
+    def _add_numbers(self, numbers: np.ndarray):
+        count = len(numbers)
+        chunk_mean = float(numbers.mean())
+        chunk_m2 = float(((numbers - chunk_mean) ** 2).sum())
+        total = self.filled + count
+        delta = chunk_mean - self.mean
+        self._m2 += chunk_m2 + delta * delta * self.filled * count / total
+        self.mean += delta * count / total
+        self.min = min(self.min, float(numbers.min()))
+        self.max = max(self.max, float(numbers.max()))
+        self.integer = self.integer and bool(np.all(np.mod(numbers, 1) == 0))
+
+    @property
+    def kind(self) -> str:
+        if not self.filled:
+            return "empty"
+        if self.numeric:
+            return "integer" if self.integer else "number"
+        return "text"
+
+    @property
+    def std(self) -> float:
+        return (self._m2 / self.filled) ** 0.5 if self.filled else 0.0
+
+    def describe(self) -> str:
+        parts = [f"{self.filled} values"]
+        if self.empty:
+            parts.append(f"{self.empty} empty")
+        if self.numeric and self.filled:
+            parts.append(f"min {_fmt(self.min)}, max {_fmt(self.max)}, mean {self.mean:.4g}, std {self.std:.4g}")
+        parts.append(f"{len(self.counts)} distinct" if self.counts is not None else f"over {DISTINCT_LIMIT} distinct")
+        line = f"- {self.name} ({self.kind}): " + ", ".join(parts)
+        if not self.numeric and self.counts and len(self.counts) < self.filled:
+            common = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_VALUES]
+            line += "; most common: " + ", ".join(f"{value[:CELL_CHARS]} ({count})" for value, count in common)
+        return line
+
+
+class CsvDigest:
+    """Column summaries and a uniform row sample of one CSV, built in a single streaming pass"""
+
+    def __init__(self, source: BinaryIO, sample_rows: int = DEFAULT_SAMPLE_ROWS):
+        text = io.TextIOWrapper(source, encoding="utf-8-sig", errors="ignore", newline="")
+        reader = csv.reader(text)
+        self.header = [name.strip() for name in next(reader, [])]
+        self.columns = [ColumnSummary(name or f"column {i + 1}") for i, name in enumerate(self.header)]
+        self.rows = 0
+        self.sample_rows = max(0, sample_rows)
+        # Fixed seed: the same file always gives the same digest
+        rng = random.Random(0)
+        sample: List[tuple] = []
+        chunk: List[List[str]] = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if len(row) > len(self.columns):
+                self.columns += [ColumnSummary(f"column {i + 1}") for i in range(len(self.columns), len(row))]
+            # Reservoir sampling keeps each row with equal probability
+            if len(sample) < self.sample_rows:
+                sample.append((self.rows, row))
+            else:
+                slot = rng.randint(0, self.rows)
+                if slot < self.sample_rows:
+                    sample[slot] = (self.rows, row)
+            self.rows += 1
+            chunk.append(row)
+            if len(chunk) >= CHUNK_ROWS:
+                self._add_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._add_chunk(chunk)
+        text.detach()
+        self.sample = [row for _, row in sorted(sample)]
+
+    def _add_chunk(self, chunk: List[List[str]]):
+        width = len(self.columns)
+        cells = np.array([row + [""] * (width - len(row)) for row in chunk], dtype=str)
+        for j, column in enumerate(self.columns):
+            column.add(cells[:, j])
+
+    def render(self) -> str:
+        width = len(self.columns)
+        lines = [f"Spreadsheet digest: {self.rows} rows x {width} columns"]
+        lines.append("")
+        lines.append("Columns:")
+        lines.extend(column.describe() for column in self.columns[:MAX_COLUMNS])
+        if width > MAX_COLUMNS:
+            lines.append(f"- ... {width - MAX_COLUMNS} more columns not shown")
+        if self.sample:
+            label = f"all {self.rows} rows" if len(self.sample) == self.rows else \
+                f"{len(self.sample)} of {self.rows} rows, chosen at random"
+            out = io.StringIO()
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow([column.name for column in self.columns[:MAX_COLUMNS]])
+            for row in self.sample:
+                writer.writerow([cell.strip()[:CELL_CHARS] for cell in row[:MAX_COLUMNS]])
+            lines.append("")
+            lines.append(f"Sample rows ({label}):")
+            lines.append(out.getvalue().rstrip("\n"))
+        return "\n".join(lines)
+
+    def report(self) -> dict:
+        return {"rows": self.rows, "columns": len(self.columns), "sampleRows": len(self.sample)}
+
+
+def digest_csv(data: bytes, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> str:
+    """Digest text of a CSV file's bytes"""
+    return CsvDigest(io.BytesIO(data), sample_rows).render()
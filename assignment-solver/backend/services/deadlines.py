@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deadlines, cooperative cancellation and hedged LLM calls for solver jobs.
+
+A job gets one time budget that is split across its stages (extraction,
+solving, rendering). Long-running loops call JobDeadline.check() between
+units of work (download chunks, pages, files), which raises once the stage
+or the job is out of time or the job was cancelled.
+
+LLM calls run as asyncio tasks so they can be abandoned for real: when the
+deadline passes the task is cancelled, which closes the underlying request.
+With hedging on, a second identical request is started once the first has
+been running longer than a recent latency percentile; whichever finishes
+first wins and the other is cancelled. Only calls already in the slow tail
+are duplicated, so the extra cost stays small.
+"""
+import json
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Share of the job budget each stage may use; any stage is also capped by what is left of the job
+STAGE_SHARES = {
+    "extract": 0.35,
+    "solve": 0.55,
+    "render": 0.10,
+}
+
+# Latency samples kept for the hedging percentile, and how many are needed before trusting it
+LATENCY_HISTORY = 200
+MIN_LATENCY_SAMPLES = 20
+CANCEL_POLL_SECONDS = 0.25
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class DeadlineExceeded(JobCancelled):
+    pass
+
+
+class CancelToken:
+    """Shared flag telling every stage of a job to stop at its next check"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+
+class JobDeadline:
+    """Time budget of one job; total_seconds of 0 or less means no deadline"""
+
+    def __init__(self, total_seconds: float, cancel: Optional[CancelToken] = None,
+                 shares: Optional[Dict[str, float]] = None):
+        self.total = total_seconds if total_seconds and total_seconds > 0 else None
+        self.cancel = cancel or CancelToken()
+        self.shares = shares or STAGE_SHARES
+        self.started = time.monotonic()
+        self.stage_name: Optional[str] = None
+        self._stage_end: Optional[float] = None
+        self.stages: Dict[str, dict] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        outer = (self.stage_name, self._stage_end)
+        began = time.monotonic()
+        budget = None
+        if self.total is not None:
+            budget = self.total * self.shares.get(name, 1.0)
+            self._stage_end = min(self.started + self.total, began + budget)
+        self.stage_name = name
+        try:
+            yield self
+        finally:
+            self.stages[name] = {
+                "budgetSeconds": None if budget is None else round(budget, 1),
+                "seconds": round(time.monotonic() - began, 3),
+            }
+            self.stage_name, self._stage_end = outer
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the current stage (or the job outside any stage); None if unlimited"""
+        if self.total is None:
+            return None
+        end = self._stage_end if self._stage_end is not None else self.started + self.total
+        return end - time.monotonic()
+
+    def check(self):
+        """Raise if the job was cancelled or the current stage is out of time"""
+        self.cancel.raise_if_cancelled()
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            reason = f"{self.stage_name or 'job'} stage exceeded its deadline"
+            self.cancel.cancel(reason)
+            raise DeadlineExceeded(reason)
+
+    def report(self) -> dict:
+        return {
+            "budgetSeconds": self.total,
+            "elapsedSeconds": round(time.monotonic() - self.started, 3),
+            "stages": self.stages,
+            "cancelled": self.cancel.reason,
+        }
+
+
+class LatencyHistory:
+    """Recent LLM latencies, shared by solver processes through a small JSON file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> List[float]:
+        try:
+            with open(self.path) as fh:
+                return [float(x) for x in json.load(fh)][-LATENCY_HISTORY:]
+        except (OSError, ValueError, TypeError):
+            return []
+
+    def record(self, seconds: float):
+        samples = (self.load() + [round(seconds, 3)])[-LATENCY_HISTORY:]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Concurrent writers may drop each other's samples; that only thins the history
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=".latency-")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump(samples, fh)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        samples = sorted(self.load())
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+async def _race(runnable, inputs: Any, deadline: JobDeadline, hedge_after: Optional[float]) -> tuple:
+    """Run runnable.ainvoke, hedging once after hedge_after seconds; returns (result, hedged, winner)"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks = {asyncio.ensure_future(runnable.ainvoke(inputs)): "primary"}
+    hedged = False
+    last_error: Optional[BaseException] = None
+    try:
+        while tasks:
+            remaining = deadline.remaining()
+            waits = [CANCEL_POLL_SECONDS]
+            if remaining is not None:
+                waits.append(max(0.0, remaining))
+            if hedge_after is not None and not hedged:
+                waits.append(max(0.0, started + hedge_after - loop.time()))
+            done, _ = await asyncio.wait(set(tasks), timeout=min(waits), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                label = tasks.pop(task)
+                if task.exception() is None:
+                    return task.result(), hedged, label
+                last_error = task.exception()
+            deadline.check()
+            if hedge_after is not None and not hedged and loop.time() - started >= hedge_after:
+                hedged = True
+                tasks[asyncio.ensure_future(runnable.ainvoke(inputs))] = "hedge"
+        raise last_error
+    finally:
+        # The losing (or abandoned) request is cancelled rather than left running
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def invoke_with_deadline(runnable, inputs: Any, deadline: JobDeadline, hedge_after: Optional[float] = None,
+                         loop: Optional[asyncio.AbstractEventLoop] = None) -> tuple:
+    """Blocking wrapper around _race for the synchronous solver code"""
+    deadline.check()
+    if loop is None:
+        return asyncio.run(_race(runnable, inputs, deadline, hedge_after))
+    # Async LLM clients bind to the loop of their first call, so callers making several keep one loop
+    return loop.run_until_complete(_race(runnable, inputs, deadline, hedge_after))
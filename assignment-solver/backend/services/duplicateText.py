@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Drops content repeated across the attachments of one job.
+
+Instructors often attach the same handout twice, or both the DOCX and the
+PDF of it; concatenated, the prompt carries that text several times. Each
+attachment's pages pass through one DuplicateFilter per job. Paragraphs
+already seen in an earlier attachment are removed, whether verbatim or
+nearly so (re-wrapped, a typo fixed): paragraphs are compared by the SimHash
+of their three-word shingles, and a bucket per band of the 64-bit
+fingerprint finds candidates within max_distance bits without comparing
+every pair. The whole attachment is fingerprinted the same way as it
+streams, so a near-copy of an earlier file whose paragraphs were split
+differently (PDF line breaks against DOCX paragraphs) is recognised once it
+ends and replaced by a reference to the first copy. Short paragraphs
+("Answer:", "Show your working.") are never dropped.
+
+A near match only counts when both texts carry the same numbers and math
+symbols, in the same order: "a mass of 5 kg" and "a mass of 12 kg" are a
+few bits apart but are different problems, and dropping one would have the
+solver answer a question it never saw.
+"""
+import re
+import hashlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SHINGLE_WORDS = 3
+# Paragraphs shorter than this are kept even when repeated
+MIN_PARAGRAPH_CHARS = 80
+DEFAULT_MAX_DISTANCE = 3
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_CONSTANT = re.compile(r"\d+(?:[.,]\d+)*|[-+−*/^=<>%×÷±≤≥≠√∑∫π°$€£]")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """64-bit hashes of the word shingles of text, case and whitespace ignored"""
+    words = _WORD.findall(text.lower())
+    # Fewer words than a shingle still make one shingle
+    count = max(1, len(words) - SHINGLE_WORDS + 1) if words else 0
+    # A stable hash, so a retried job drops exactly the same content
+    digests = b"".join(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"), digest_size=8).digest()
+                       for i in range(count))
+    return np.frombuffer(digests, dtype="<u8")
+
+
+def _bit_votes(hashes: np.ndarray) -> np.ndarray:
+    """Per-bit (ones - zeros) over the hashes, the running state of a SimHash"""
+    if not len(hashes):
+        return np.zeros(64, dtype=np.int64)
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    return 2 * bits.sum(axis=0, dtype=np.int64) - len(hashes)
+
+
+def _fingerprint(votes: np.ndarray) -> int:
+    return int(np.packbits(votes > 0, bitorder="little").view(np.uint64)[0])
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of text; similar texts differ in few bits"""
+    return _fingerprint(_bit_votes(_shingle_hashes(text)))
+
+
+def constants_of(text: str) -> str:
+    """The numbers and math symbols of text, in order; near-copies must agree on these"""
+    return " ".join(_CONSTANT.findall(text))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FingerprintIndex:
+    """
+    Fingerprints bucketed by band. With max_distance + 1 bands, two
+    fingerprints within max_distance bits agree exactly on at least one band.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max(0, max_distance)
+        bands = min(64, self.max_distance + 1)
+        self._width = 64 // bands
+        self._shifts = [i * self._width for i in range(bands)]
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, object]]] = defaultdict(list)
+
+    def _keys(self, fingerprint: int):
+        mask = (1 << self._width) - 1
+        return [(i, (fingerprint >> shift) & mask) for i, shift in enumerate(self._shifts)]
+
+    def find(self, fingerprint: int, accept: Optional[Callable[[object], bool]] = None):
+        """Value stored with a fingerprint within max_distance bits, the first that accept() allows"""
+        for key in self._keys(fingerprint):
+            for other, value in self._buckets.get(key, ()):
+                if hamming(fingerprint, other) <= self.max_distance and (accept is None or accept(value)):
+                    return value
+        return None
+
+    def add(self, fingerprint: int, value):
+        for key in self._keys(fingerprint):
+            self._buckets[key].append((fingerprint, value))
+
+
+class DuplicateFilter:
+    """Removes paragraphs and whole attachments already seen earlier in the same job"""
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self._paragraphs = FingerprintIndex(max_distance)
+        self._files = FingerprintIndex(max_distance)
+        # Number of the attachment being read
+        self._file = 0
+        self._votes = np.zeros(64, dtype=np.int64)
+        self._constants = hashlib.blake2b(digest_size=16)
+        self._file_chars = 0
+        self.paragraphs_removed = 0
+        self.files_removed = 0
+        self.chars_removed = 0
+
+    def clean(self, page: str) -> str:
+        """Page text of the current attachment without paragraphs from earlier attachments"""
+        self._votes += _bit_votes(_shingle_hashes(page))
+        # Tokens never span pages, so a PDF and a DOCX of one handout hash alike
+        self._constants.update("".join(token + " " for token in _CONSTANT.findall(page)).encode("utf-8"))
+        self._file_chars += len(page)
+        kept = []
+        start = 0
+        for match in list(_PARAGRAPH_BREAK.finditer(page)) + [None]:
+            end = match.start() if match else len(page)
+            paragraph = page[start:end]
+            if len(paragraph.strip()) >= MIN_PARAGRAPH_CHARS:
+                fingerprint = simhash(paragraph)
+                constants = constants_of(paragraph)
+                # Repeats within one attachment are left alone; only earlier attachments count
+                seen = self._paragraphs.find(fingerprint, lambda value: value[0] != self._file and value[1] == constants)
+                if seen is not None:
+                    self.paragraphs_removed += 1
+                    self.chars_removed += len(paragraph)
+                    paragraph = None
+                else:
+                    self._paragraphs.add(fingerprint, (self._file, constants))
+            if paragraph is not None:
+                kept.append(paragraph if match is None else paragraph + match.group(0))
+            start = match.end() if match else start
+        return "".join(kept).strip("\n")
+
+    def end_file(self, title: str) -> Optional[str]:
+        """Finish the current attachment; the title of an earlier one it nearly copies, if any"""
+        original = None
+        if self._file_chars >= MIN_PARAGRAPH_CHARS:
+            fingerprint = _fingerprint(self._votes)
+            constants = self._constants.digest()
+            seen = self._files.find(fingerprint, lambda value: value[1] == constants)
+            if seen is not None:
+                original = seen[0]
+            else:
+                self._files.add(fingerprint, (title, constants))
+        self._file += 1
+        self._votes = np.zeros(64, dtype=np.int64)
+        self._constants = hashlib.blake2b(digest_size=16)
+        self._file_chars = 0
+        return original
+
+    def drop_file(self, chars: int):
+        """Count what was kept of an attachment that turned out to be a copy"""
+        self.files_removed += 1
+        self.chars_removed += chars
+
+    def report(self) -> dict:
+        return {"filesRemoved": self.files_removed, "paragraphsRemoved": self.paragraphs_removed,
+                "charsRemoved": self.chars_removed}
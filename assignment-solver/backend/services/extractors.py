@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Text extractors for Drive attachments, dispatched on mime type.
+
+Each extractor declares the mime types it handles and, for native Google
+formats, the format Drive should export to. The solver looks the file's
+mime type up here, so a new format only needs a registered function. It
+gets the job's SolverConfig along with the bytes, so settings such as the
+PDF backend come from the solver rather than the environment:
+
+    @register_extractor("application/rtf")
+    def extract_rtf(data: bytes, config: SolverConfig) -> PageStream:
+        ...
+
+Extractors are lazy: they return a PageStream that parses one page (or one
+block of text) at a time, so a caller with a prompt budget can stop
+consuming it and the remaining pages are never parsed.
+"""
+import io
+import re
+import zipfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from csvDigest import CsvDigest
+from pdfBackends import PdfExtraction, backend_order
+from solverConfig import SolverConfig
+
+# Plain-text formats are cut into blocks of about this size so budgets can stop mid-file
+TEXT_BLOCK_CHARS = 4000
+
+
+class PageStream:
+    """Lazily extracted page texts of one file; total is None when not known up front"""
+
+    def __init__(self, pages: Iterable[str], total: Optional[int] = None, paged: bool = False,
+                 info: Optional[dict] = None):
+        self._pages = pages
+        self._total = total
+        # True when items are real pages (with running headers), not blocks cut from a text
+        self.paged = paged
+        # Extractor details for the job metrics, filled in while pages are consumed
+        self.info = info
+
+    @property
+    def total(self) -> Optional[int]:
+        # A PdfExtraction that switches backend mid-file may revise its page count
+        return getattr(self._pages, "total", self._total)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._pages)
+
+    def text(self) -> str:
+        """Extract every page eagerly"""
+        return "\n".join(page for page in self if page).strip()
+
+
+ExtractFn = Callable[[bytes, SolverConfig], PageStream]
+
+
+class ExtractionBudget:
+    """Character allowance for the prompt, shared by every file of one job"""
+
+    def __init__(self, max_chars: int):
+        # 0 or less means unlimited
+        self.max_chars = max_chars
+        self.used = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_chars > 0 and self.used >= self.max_chars
+
+    def take(self, text: str) -> str:
+        """Charge text against the budget, truncating what does not fit"""
+        if self.max_chars > 0:
+            text = text[:max(0, self.max_chars - self.used)]
+        self.used += len(text)
+        return text
+
+    def refund(self, chars: int):
+        """Give back characters taken for text that was later dropped"""
+        self.used = max(0, self.used - chars)
+
+
+class Extractor:
+    def __init__(self, name: str, mime_types: List[str], extract: ExtractFn,
+                 export_mime: Optional[str] = None):
+        self.name = name
+        self.mime_types = mime_types
+        self.extract = extract
+        # Native Google files cannot be downloaded, only exported to this format
+        self.export_mime = export_mime
+
+
+_REGISTRY: Dict[str, Extractor] = {}
+
+
+def register_extractor(*mime_types: str, export_mime: Optional[str] = None, name: Optional[str] = None):
+    """Decorator registering fn(data: bytes, config: SolverConfig) -> PageStream for the given mime types"""
+    def decorator(fn: ExtractFn) -> ExtractFn:
+        extractor = Extractor(name or fn.__name__, list(mime_types), fn, export_mime)
+        for mime_type in mime_types:
+            _REGISTRY[mime_type] = extractor
+        return fn
+    return decorator
+
+
+def find_extractor(mime_type: str) -> Optional[Extractor]:
+    """Extractor for a mime type; any other text/* type falls back to plain text"""
+    if mime_type in _REGISTRY:
+        return _REGISTRY[mime_type]
+    if mime_type.startswith("text/"):
+        return _REGISTRY["text/plain"]
+    return None
+
+
+def _decode(data: bytes) -> str:
+    # Drive exports are UTF-8, sometimes with a byte order mark
+    return data.decode("utf-8-sig", errors="ignore").strip()
+
+
+def _text_blocks(text: str) -> PageStream:
+    """Split plain text at paragraph breaks into blocks of about TEXT_BLOCK_CHARS"""
+    # Finding the cut points is cheap; only the slicing is deferred
+    bounds = []
+    start = 0
+    while start < len(text):
+        end = start + TEXT_BLOCK_CHARS
+        if end < len(text):
+            cut = text.rfind("\n\n", start, end)
+            if cut > start:
+                end = cut
+        bounds.append((start, end))
+        start = end
+    return PageStream((text[a:b].strip("\n") for a, b in bounds), total=len(bounds))
+
+
+@register_extractor("text/plain", "text/markdown", name="text")
+def extract_text(data: bytes, config: SolverConfig) -> PageStream:
+    return _text_blocks(_decode(data))
+
+
+@register_extractor("application/vnd.google-apps.document", export_mime="text/plain", name="google-docs")
+def extract_google_doc(data: bytes, config: SolverConfig) -> PageStream:
+    return _text_blocks(_decode(data))
+
+
+@register_extractor("application/vnd.google-apps.presentation", export_mime="text/plain", name="google-slides")
+def extract_google_slides(data: bytes, config: SolverConfig) -> PageStream:
+    return _text_blocks(_decode(data))
+
+
+def _csv_digest(data: bytes, config: SolverConfig) -> PageStream:
+    """Column statistics and sample rows instead of every row (see csvDigest.py)"""
+    info: dict = {}
+
+    def digest():
+        summary = CsvDigest(io.BytesIO(data), config.csv_sample_rows)
+        info.update(summary.report())
+        yield summary.render()
+    return PageStream(digest(), total=1, info=info)
+
+
+@register_extractor("text/csv", name="csv")
+def extract_csv(data: bytes, config: SolverConfig) -> PageStream:
+    return _csv_digest(data, config)
+
+
+@register_extractor("application/vnd.google-apps.spreadsheet", export_mime="text/csv", name="google-sheets")
+def extract_google_sheet(data: bytes, config: SolverConfig) -> PageStream:
+    return _csv_digest(data, config)
+
+
+@register_extractor("application/pdf", name="pdf")
+def extract_pdf(data: bytes, config: SolverConfig) -> PageStream:
+    extraction = PdfExtraction(data, backend_order(config.pdf_backend, config.pdf_benchmark_path))
+    return PageStream(extraction, total=extraction.total, paged=True, info=extraction.report)
+
+
+@register_extractor("application/vnd.openxmlformats-officedocument.wordprocessingml.document", name="docx")
+def extract_docx(data: bytes, config: SolverConfig) -> PageStream:
+    """Paragraph text of a .docx, read straight from its XML without python-docx"""
+    namespace = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for para in root.iter(f"{namespace}p"):
+        text = "".join(node.text or "" for node in para.iter(f"{namespace}t"))
+        paragraphs.append(text)
+    return _text_blocks(re.sub(r"\n{3,}", "\n\n", "\n".join(paragraphs)).strip())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Expected running time of a solve, estimated before it is queued.
+
+The estimate only has to rank jobs and size the backlog, not be exact: a
+fixed cost for the LLM round trip, plus per-file, per-page and per-megabyte
+terms. Page counts come from earlier solves of the same file when the queue
+has seen it (JobQueue.known_pages), otherwise they are guessed from the file
+size. The queue scales the result by how long jobs actually took relative
+to their estimates, so the constants only need to be in the right ratio.
+"""
+from typing import Dict, List, Optional
+
+from singleFlight import material_file_ids
+
+BASE_SECONDS = 10.0
+SECONDS_PER_FILE = 2.0
+SECONDS_PER_PAGE = 0.5
+SECONDS_PER_MB = 1.0
+
+# Rough page sizes for guessing page counts from bytes
+BYTES_PER_PDF_PAGE = 100_000
+BYTES_PER_TEXT_PAGE = 3_000
+# Native Google files report no size until exported
+DEFAULT_PAGES = 5
+
+
+def guess_pages(meta: Optional[dict]) -> int:
+    size = int((meta or {}).get("size") or 0)
+    if not size:
+        return DEFAULT_PAGES
+    per_page = BYTES_PER_PDF_PAGE if (meta or {}).get("mimeType") == "application/pdf" else BYTES_PER_TEXT_PAGE
+    return max(1, size // per_page)
+
+
+def estimate_cost(materials: List[dict], metas: Optional[Dict[str, Optional[dict]]] = None,
+                  known_pages: Optional[Dict[str, int]] = None) -> dict:
+    """Estimated seconds of a solve and the inputs behind it"""
+    metas = metas or {}
+    known_pages = known_pages or {}
+    file_ids = sorted(set(material_file_ids(materials)))
+    size = sum(int((metas.get(file_id) or {}).get("size") or 0) for file_id in file_ids)
+    pages = sum(known_pages.get(file_id) or guess_pages(metas.get(file_id)) for file_id in file_ids)
+    seconds = (BASE_SECONDS + SECONDS_PER_FILE * len(file_ids) + SECONDS_PER_PAGE * pages
+               + SECONDS_PER_MB * size / (1024 * 1024))
+    return {"seconds": round(seconds, 1), "files": len(file_ids), "bytes": size, "pages": pages}
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Durable solve-job queue backed by a local SQLite database in WAL mode.
+
+Jobs move through pending -> leased -> done, or back to pending with a
+backoff when a worker reports a failure or stops heartbeating. Jobs that
+run out of attempts are dead-lettered and can be revived by hand.
+
+Jobs enqueued with a flight key (see singleFlight.py) are coalesced: while
+a job with the same key is in flight, newcomers wait on it instead of
+running, and they complete with the leader's result.
+
+Within a priority level, workers take the job with the smallest estimated
+running time (cost, from jobCost.py), so quizzes are not stuck behind long
+labs. Every second a job waits takes AGING_RATE seconds off its cost, so a
+long job cannot starve, and the cost is multiplied by one plus the number of
+jobs the same user already has running, which shares workers fairly. When
+the backlog ahead of a new job is deeper than max_depth or would take more
+than max_wait seconds, enqueue sheds it: QueueFull with a retry-after hint,
+or, for background work, a deferred start.
+
+The module is stdlib-only so the Node.js backend can call its CLI cheaply:
+
+    python jobQueue.py enqueue <job_id> [--coalesce] [--owner <user_id>] < payload.json
+    python jobQueue.py status <job_id> [<job_id> ...]
+    python jobQueue.py stats
+    python jobQueue.py dead
+    python jobQueue.py revive <job_id>
+"""
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from jobCost import estimate_cost
+from solverConfig import SolverConfig
+from singleFlight import fetch_materials_meta, material_file_ids, material_set_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL DEFAULT 'solve',
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    leased_by TEXT,
+    lease_expires REAL,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    flight_key TEXT,
+    leader_id TEXT,
+    cost REAL NOT NULL DEFAULT 0,
+    owner TEXT,
+    leased_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, run_at);
+CREATE TABLE IF NOT EXISTS file_pages (
+    file_id TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scheduler_stats (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_flight ON jobs (flight_key, status);
+CREATE INDEX IF NOT EXISTS jobs_leader ON jobs (leader_id);
+"""
+
+# Columns added after the first release of the schema
+MIGRATIONS = {
+    "flight_key": "ALTER TABLE jobs ADD COLUMN flight_key TEXT",
+    "leader_id": "ALTER TABLE jobs ADD COLUMN leader_id TEXT",
+    "cost": "ALTER TABLE jobs ADD COLUMN cost REAL NOT NULL DEFAULT 0",
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "leased_at": "ALTER TABLE jobs ADD COLUMN leased_at REAL",
+}
+
+# Cost assumed for jobs queued without an estimate
+DEFAULT_COST_SECONDS = 30.0
+# Seconds of estimated cost forgiven per second of waiting
+AGING_RATE = 0.1
+# Ready jobs of the top priority compared when picking the next one
+LEASE_CANDIDATES = 200
+# Smallest retry-after hint handed to a shed request
+MIN_RETRY_AFTER = 5.0
+# Weight of the latest job in the running actual/estimated time ratio
+COST_SCALE_ALPHA = 0.2
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+WAITING = "waiting"
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying the job cannot help"""
+
+
+class QueueFull(Exception):
+    """Raised by enqueue when the backlog is too deep to take a new job in time"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    def __init__(self, path: Path, lease_seconds: float = 120.0, max_attempts: int = 4,
+                 backoff_base: float = 5.0, backoff_max: float = 300.0, workers: int = 1,
+                 max_depth: int = 0, max_wait: float = 0.0):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Load shedding: 0 disables either limit
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.max_wait = max_wait
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._migrate()
+
+    def _migrate(self):
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(statement)
+        conn.executescript(INDEXES)
+
+    @classmethod
+    def from_config(cls, config: SolverConfig) -> "JobQueue":
+        return cls(
+            config.queue_path,
+            lease_seconds=config.lease_seconds,
+            max_attempts=config.max_attempts,
+            backoff_base=config.backoff_base,
+            backoff_max=config.backoff_max,
+            workers=config.workers,
+            max_depth=config.max_queue_depth,
+            max_wait=config.max_queue_wait_seconds,
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit so transactions are explicit"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff with full jitter"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+        return random.uniform(ceiling / 2, ceiling)
+
+    @staticmethod
+    def _cost_scale(conn: sqlite3.Connection) -> float:
+        """How long jobs have actually run relative to their estimates"""
+        row = conn.execute("SELECT value FROM scheduler_stats WHERE name = 'cost_scale'").fetchone()
+        return row[0] if row else 1.0
+
+    def _backlog(self, conn: sqlite3.Connection, priority: int, now: float) -> tuple:
+        """(jobs ahead of a new job at this priority, seconds until a worker would reach it)"""
+        scale = self._cost_scale(conn)
+        rows = conn.execute(
+            "SELECT status, cost, leased_at FROM jobs WHERE (status = ? AND priority >= ?) OR status = ?",
+            (PENDING, priority, LEASED),
+        ).fetchall()
+        work = 0.0
+        for row in rows:
+            expected = (row["cost"] or DEFAULT_COST_SECONDS) * scale
+            if row["status"] == LEASED:
+                expected = max(0.0, expected - (now - (row["leased_at"] or now)))
+            work += expected
+        return len(rows), work / self.workers
+
+    def _shed(self, conn: sqlite3.Connection, priority: int, now: float) -> Optional[tuple]:
+        """(reason, retry-after seconds) when a new job should not be taken now, else None"""
+        if not self.max_depth and not self.max_wait:
+            return None
+        depth, wait = self._backlog(conn, priority, now)
+        if self.max_depth and depth >= self.max_depth:
+            per_job = wait / depth if depth else DEFAULT_COST_SECONDS
+            return (f"{depth} jobs queued", max(MIN_RETRY_AFTER, per_job * (depth - self.max_depth + 1)))
+        if self.max_wait and wait > self.max_wait:
+            return (f"predicted wait of {wait:.0f}s", max(MIN_RETRY_AFTER, wait - self.max_wait))
+        return None
+
+    # --------------------------
+    # Producer side
+    # --------------------------
+    def enqueue(self, job_id: str, payload: dict, kind: str = "solve", priority: int = 0,
+                delay: float = 0.0, flight_key: Optional[str] = None, cost: float = 0.0,
+                owner: Optional[str] = None, shed: str = "reject") -> dict:
+        """
+        Add a job; enqueueing an id that is already queued or running is a no-op.
+        With a flight_key, the job waits on an in-flight job with the same key; a
+        leader that has not started yet takes on the follower's kind and priority
+        if they are more urgent, so a user never waits behind a background job.
+        cost is the estimated running time in seconds and owner the requesting
+        user. When the queue is overloaded, shed="reject" raises QueueFull and
+        shed="defer" delays the job's start by the retry-after hint instead.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] in (PENDING, LEASED, WAITING):
+                conn.execute("COMMIT")
+                return self._row_to_job(row)
+            leader = None
+            if flight_key:
+                leader = conn.execute(
+                    "SELECT id FROM jobs WHERE flight_key = ? AND status IN (?, ?) "
+                    "AND leader_id IS NULL AND id != ? ORDER BY created_at LIMIT 1",
+                    (flight_key, PENDING, LEASED, job_id),
+                ).fetchone()
+                if leader is not None:
+                    conn.execute(
+                        "UPDATE jobs SET kind = ?, priority = ?, owner = COALESCE(owner, ?), updated_at = ? "
+                        "WHERE id = ? AND status = ? AND priority < ?",
+                        (kind, priority, owner, now, leader["id"], PENDING, priority),
+                    )
+            if leader is None:
+                # Followers add no work, so only jobs that will actually run can be shed
+                overload = self._shed(conn, priority, now)
+                if overload is not None:
+                    reason, retry_after = overload
+                    if shed != "defer":
+                        raise QueueFull(f"Solver queue is overloaded ({reason})", retry_after)
+                    delay = max(delay, retry_after)
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, kind, payload, status, priority, attempts, "
+                "max_attempts, run_at, created_at, updated_at, flight_key, leader_id, cost, owner) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), WAITING if leader else PENDING, priority,
+                 self.max_attempts, now + delay, now, now, flight_key, leader["id"] if leader else None,
+                 cost, owner),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._row_to_job(row)
+
+    # --------------------------
+    # Consumer side
+    # --------------------------
+    def _promote_followers(self, conn: sqlite3.Connection, leader_id: str, now: float):
+        """A leader was dead-lettered; hand its waiting followers to the oldest of them"""
+        followers = conn.execute(
+            "SELECT id FROM jobs WHERE leader_id = ? AND status = ? ORDER BY created_at",
+            (leader_id, WAITING),
+        ).fetchall()
+        if not followers:
+            return
+        new_leader = followers[0]["id"]
+        conn.execute(
+            "UPDATE jobs SET status = ?, leader_id = NULL, run_at = ?, updated_at = ? WHERE id = ?",
+            (PENDING, now, now, new_leader),
+        )
+        conn.execute(
+            "UPDATE jobs SET leader_id = ?, updated_at = ? WHERE leader_id = ? AND status = ?",
+            (new_leader, now, leader_id, WAITING),
+        )
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float):
+        """Return jobs whose worker stopped heartbeating; must run inside a transaction"""
+        expired = conn.execute(
+            "SELECT id, attempts, max_attempts FROM jobs WHERE status = ? AND lease_expires < ?",
+            (LEASED, now),
+        ).fetchall()
+        for row in expired:
+            if row["attempts"] >= row["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, leased_by = NULL, lease_expires = NULL, "
+                    "last_error = ?, updated_at = ? WHERE id = ?",
+                    (DEAD, "lease expired on final attempt", now, row["id"]),
+                )
+                self._promote_followers(conn, row["id"], now)
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, leased_by = NULL, lease_expires = NULL, "
+                    "run_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                    (PENDING, now + self._backoff(row["attempts"]), "lease expired", now, row["id"]),
+                )
+
+    def lease(self, worker_id: str, kinds: Optional[Iterable[str]] = None,
+              limits: Optional[Dict[str, int]] = None, max_cost: Optional[float] = None) -> Optional[dict]:
+        """
+        Claim the next runnable job for worker_id, or None when nothing is ready.
+        limits caps how many jobs of a kind may be leased at once across all workers.
+        max_cost only considers jobs with an estimate of at most that many seconds.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reclaim_expired(conn, now)
+            query = "SELECT id FROM jobs WHERE status = ? AND run_at <= ?"
+            params: list = [PENDING, now]
+            if kinds:
+                kinds = list(kinds)
+                query += " AND kind IN (%s)" % ",".join("?" * len(kinds))
+                params.extend(kinds)
+            full = [
+                kind for kind, cap in (limits or {}).items()
+                if conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ? AND kind = ?",
+                                (LEASED, kind)).fetchone()[0] >= cap
+            ]
+            if full:
+                query += " AND kind NOT IN (%s)" % ",".join("?" * len(full))
+                params.extend(full)
+            if max_cost is not None:
+                query += " AND cost > 0 AND cost <= ?"
+                params.append(max_cost)
+            query = query.replace("SELECT id", "SELECT id, priority, cost, owner, created_at", 1)
+            query += " ORDER BY priority DESC, run_at, created_at LIMIT ?"
+            params.append(LEASE_CANDIDATES)
+            candidates = conn.execute(query, params).fetchall()
+            if not candidates:
+                conn.execute("COMMIT")
+                return None
+            running = dict(conn.execute(
+                "SELECT owner, COUNT(*) FROM jobs WHERE status = ? AND owner IS NOT NULL GROUP BY owner",
+                (LEASED,),
+            ).fetchall())
+
+            def effective_cost(candidate) -> float:
+                cost = (candidate["cost"] or DEFAULT_COST_SECONDS) * (1 + running.get(candidate["owner"], 0))
+                return cost - AGING_RATE * (now - candidate["created_at"])
+
+            top = candidates[0]["priority"]
+            row = min((c for c in candidates if c["priority"] == top), key=effective_cost)
+            conn.execute(
+                "UPDATE jobs SET status = ?, leased_by = ?, lease_expires = ?, leased_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (LEASED, worker_id, now + self.lease_seconds, now, now, row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._row_to_job(job)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend a lease; False means the lease was lost and the work should stop"""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND leased_by = ? AND status = ?",
+            (now + self.lease_seconds, now, job_id, worker_id, LEASED),
+        )
+        return cur.rowcount == 1
+
+    def ack(self, job_id: str, worker_id: str, result: dict) -> bool:
+        """Complete a job along with every job coalesced onto it"""
+        now = time.time()
+        encoded = json.dumps(result)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            started = conn.execute(
+                "SELECT cost, leased_at FROM jobs WHERE id = ? AND leased_by = ? AND status = ?",
+                (job_id, worker_id, LEASED),
+            ).fetchone()
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, leased_by = NULL, lease_expires = NULL, "
+                "last_error = NULL, updated_at = ? WHERE id = ? AND leased_by = ? AND status = ?",
+                (DONE, encoded, now, job_id, worker_id, LEASED),
+            )
+            acked = cur.rowcount == 1
+            if acked:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE leader_id = ? AND status = ?",
+                    (DONE, encoded, now, job_id, WAITING),
+                )
+                self._learn(conn, started, result, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return acked
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[str]:
+        """Record a failed attempt; returns the job's new status"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND leased_by = ? AND status = ?",
+                (job_id, worker_id, LEASED),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if retry and row["attempts"] < row["max_attempts"]:
+                status = PENDING
+                run_at = now + self._backoff(row["attempts"])
+            else:
+                status = DEAD
+                run_at = now
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_at = ?, leased_by = NULL, lease_expires = NULL, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (status, run_at, error, now, job_id),
+            )
+            if status == DEAD:
+                self._promote_followers(conn, job_id, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def _learn(self, conn: sqlite3.Connection, started: sqlite3.Row, result: dict, now: float):
+        """Feed a finished job's duration and page counts back into the cost estimates"""
+        metrics = (result or {}).get("metrics") or {}
+        # A batched job's time is shared with the rest of its batch, so it says little about its estimate
+        if started["cost"] and started["leased_at"] and not metrics.get("batch"):
+            ratio = min(5.0, max(0.2, (now - started["leased_at"]) / started["cost"]))
+            scale = (1 - COST_SCALE_ALPHA) * self._cost_scale(conn) + COST_SCALE_ALPHA * ratio
+            conn.execute("INSERT OR REPLACE INTO scheduler_stats (name, value) VALUES ('cost_scale', ?)", (scale,))
+        extraction = metrics.get("extraction") or {}
+        for record in extraction.get("files") or []:
+            # Only files read to the end (or cut short with a known total) give a page count
+            if record.get("id") and record.get("pagesSkipped") is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO file_pages (file_id, pages, updated_at) VALUES (?, ?, ?)",
+                    (record["id"], record["pagesRead"] + record["pagesSkipped"], now),
+                )
+
+    def known_pages(self, file_ids: Iterable[str]) -> Dict[str, int]:
+        """Page counts of files seen in earlier solves"""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return {}
+        rows = self._conn().execute(
+            "SELECT file_id, pages FROM file_pages WHERE file_id IN (%s)" % ",".join("?" * len(file_ids)),
+            file_ids,
+        ).fetchall()
+        return {row["file_id"]: row["pages"] for row in rows}
+
+    def estimate(self, materials: List[dict], access_token: Optional[str] = None,
+                 metas: Optional[Dict[str, Optional[dict]]] = None) -> dict:
+        """Cost estimate of a solve of these materials (see jobCost.py)"""
+        if metas is None and access_token:
+            metas = fetch_materials_meta(access_token, materials)
+        return estimate_cost(materials, metas, self.known_pages(material_file_ids(materials)))
+
+    # --------------------------
+    # Inspection
+    # --------------------------
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {PENDING: 0, WAITING: 0, LEASED: 0, DONE: 0, DEAD: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        # Wait a new user solve would see
+        counts["predictedWaitSeconds"] = round(self._backlog(conn, 0, time.time())[1], 1)
+        return counts
+
+    def dead_letters(self, limit: int = 50) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (DEAD, limit)
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def revive(self, job_id: str) -> bool:
+        """Move a dead-lettered job back to pending with a fresh attempt budget"""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, attempts = 0, run_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = ?",
+            (PENDING, now, now, job_id, DEAD),
+        )
+        return cur.rowcount == 1
+
+
+def _public_view(job: Optional[dict]) -> Optional[dict]:
+    """Job fields safe to hand back to Node (the payload carries an access token)"""
+    if job is None:
+        return None
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "maxAttempts": job["max_attempts"],
+        "lastError": job["last_error"],
+        "coalescedWith": job["leader_id"],
+        "result": job["result"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and feed the solver job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enqueue = sub.add_parser("enqueue", help="read a JSON payload from stdin and queue it")
+    enqueue.add_argument("job_id")
+    enqueue.add_argument("--kind", default="solve")
+    enqueue.add_argument("--priority", type=int, default=0)
+    enqueue.add_argument("--coalesce", action="store_true",
+                         help="share the work with any in-flight job for the same material revisions")
+    enqueue.add_argument("--owner", default=None, help="requesting user, for fair sharing of workers")
+    status = sub.add_parser("status", help="print the state of one or more jobs")
+    status.add_argument("job_ids", nargs="+")
+    sub.add_parser("stats", help="print job counts by status")
+    sub.add_parser("dead", help="list dead-lettered jobs")
+    revive = sub.add_parser("revive", help="requeue a dead-lettered job")
+    revive.add_argument("job_id")
+    args = parser.parse_args()
+
+    queue = JobQueue.from_config(SolverConfig.from_env())
+
+    if args.command == "enqueue":
+        payload = json.loads(sys.stdin.read() or "{}")
+        materials = payload.get("materials") or []
+        access_token = payload.get("accessToken")
+        # One metadata fetch per file serves both the flight key and the cost estimate
+        metas = fetch_materials_meta(access_token, materials) if access_token else {}
+        flight_key = None
+        if args.coalesce:
+            flight_key = material_set_key(materials, access_token, metas=metas)
+        cost = queue.estimate(materials, metas=metas)
+        try:
+            job = queue.enqueue(args.job_id, payload, kind=args.kind, priority=args.priority,
+                                flight_key=flight_key, cost=cost["seconds"], owner=args.owner)
+            output = {"success": True, "job": _public_view(job), "cost": cost}
+        except QueueFull as e:
+            # Not a failure of the CLI: Node turns this into 503 with Retry-After
+            output = {"success": False, "overloaded": True, "error": str(e),
+                      "retryAfter": int(e.retry_after + 0.999)}
+    elif args.command == "status":
+        output = {"success": True, "jobs": {jid: _public_view(queue.get(jid)) for jid in args.job_ids}}
+    elif args.command == "stats":
+        output = {"success": True, "stats": queue.stats()}
+    elif args.command == "dead":
+        output = {"success": True, "jobs": [_public_view(job) for job in queue.dead_letters()]}
+    else:
+        output = {"success": queue.revive(args.job_id)}
+
+    print(json.dumps(output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory measurements for solver jobs and the data behind worker recycling.
+
+RSS is sampled on a background thread while a stage runs, so the peak of
+a short spike (a pypdf reader, a reportlab story) is caught rather than
+only the before/after values. When tracemalloc is tracing, the Python-level
+peak of each stage is recorded too; it is off by default because it slows
+allocation-heavy code noticeably.
+"""
+import os
+import sys
+import gc
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+SAMPLE_SECONDS = 0.05
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None when it cannot be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as fh:
+                return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        import resource
+        # Peak rather than current on these platforms, but still a usable ceiling check
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    except ImportError:
+        return None
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / MB, 1)
+
+
+class _RssSampler(threading.Thread):
+    """Tracks the highest RSS seen since the last reset"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(SAMPLE_SECONDS):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+class MemoryMonitor:
+    """Records start, end and peak memory of named stages of one job"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: Dict[str, dict] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        sampler = _RssSampler()
+        start = sampler.peak
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        began = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            end = current_rss()
+            peak = max((v for v in (start, sampler.peak, end) if v is not None), default=None)
+            record = {
+                "rssStartMB": _mb(start),
+                "rssEndMB": _mb(end),
+                "rssPeakMB": _mb(peak),
+                "seconds": round(time.perf_counter() - began, 3),
+            }
+            if tracing:
+                record["tracedPeakMB"] = _mb(tracemalloc.get_traced_memory()[1])
+            self.stages[name] = record
+
+    def report(self) -> dict:
+        peaks = [s["rssPeakMB"] for s in self.stages.values() if s["rssPeakMB"] is not None]
+        return {"stages": self.stages, "rssPeakMB": max(peaks) if peaks else None}
+
+
+def top_allocations(limit: int = 15) -> List[str]:
+    """Largest allocation sites, or the most common object types when tracemalloc is off"""
+    if tracemalloc.is_tracing():
+        stats = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )).statistics("lineno")
+        return [f"{stat.size / 1024:.1f} KiB in {stat.count} blocks at {stat.traceback[0]}" for stat in stats[:limit]]
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return [f"{count} live {name} objects" for name, count in counts.most_common(limit)]
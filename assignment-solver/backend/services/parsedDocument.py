@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extracted assignment text with its file, page and question boundaries.
+
+The text of a multi-file assignment used to be grown with += one file at a
+time, losing where each page started, and every later stage split the whole
+string again. A ParsedDocument is built with a single join and keeps the
+start offset of every file and page in compact integer arrays; a file or a
+page is sliced out of the one text buffer only when asked for. The question
+tree (see questionSegmenter) is built per file on first use and kept with
+the document, so file headers never become questions.
+
+    builder = DocumentBuilder()
+    builder.add_file("Worksheet 1", ["page one text", "page two text"])
+    document = builder.build()
+    document.text, document.page(1), document.questions()
+"""
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from questionSegmenter import Question, segment_text
+
+
+class ParsedDocument:
+    """One text buffer plus the offsets of its files, pages and questions"""
+
+    __slots__ = ("text", "file_starts", "content_starts", "file_titles", "page_starts", "_questions")
+
+    def __init__(self, text: str, file_starts: array = None, content_starts: array = None,
+                 file_titles: Tuple[str, ...] = (), page_starts: array = None):
+        self.text = text
+        # Where each file's "=== title ===" header and its content begin
+        self.file_starts = file_starts if file_starts is not None else array("q")
+        self.content_starts = content_starts if content_starts is not None else array("q")
+        self.file_titles = file_titles
+        self.page_starts = page_starts if page_starts is not None else array("q")
+        # Top-level questions, segmented on first use
+        self._questions: Optional[List[Question]] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "ParsedDocument":
+        """A document with no file or page boundaries"""
+        return cls(text)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def _end_of_file(self, index: int) -> int:
+        return self.file_starts[index + 1] if index + 1 < len(self.file_starts) else len(self.text)
+
+    @property
+    def file_count(self) -> int:
+        return len(self.file_starts)
+
+    def file_text(self, index: int) -> str:
+        """Content of one file, without its header"""
+        return self.text[self.content_starts[index]:self._end_of_file(index)]
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_starts)
+
+    def file_of(self, offset: int) -> int:
+        """Index of the file containing a text offset, or -1 before the first file"""
+        return bisect_right(self.file_starts, offset) - 1
+
+    def page(self, index: int) -> str:
+        """Text of one page; the last page of a file ends where the next file's header starts"""
+        start = self.page_starts[index]
+        end = self._end_of_file(self.file_of(start))
+        if index + 1 < len(self.page_starts):
+            end = min(end, self.page_starts[index + 1])
+        return self.text[start:end].strip("\n")
+
+    def question_tree(self) -> List[Question]:
+        """Top-level questions of every file, with offsets into the document text"""
+        if self._questions is None:
+            if not self.file_starts:
+                self._questions = list(segment_text(self.text))
+            else:
+                self._questions = []
+                for i in range(self.file_count):
+                    self._questions += segment_text(self.file_text(i), offset=self.content_starts[i])
+        return self._questions
+
+    def question_spans(self) -> array:
+        """Start/end offsets of the top-level questions, as flat pairs"""
+        spans = array("q")
+        for question in self.question_tree():
+            spans.extend((question.start, question.end))
+        return spans
+
+    def questions(self) -> List[str]:
+        """Text of each top-level question with its parts"""
+        return [question.full_text() for question in self.question_tree()]
+
+    def report(self) -> dict:
+        return {"chars": len(self.text), "files": self.file_count, "pages": self.page_count}
+
+
+class DocumentBuilder:
+    """Collects files page by page and joins the text once in build()"""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._size = 0
+        self._file_starts = array("q")
+        self._content_starts = array("q")
+        self._titles: List[str] = []
+        self._page_starts = array("q")
+
+    def add_file(self, title: str, pages: List[str]):
+        """Append a file under an "=== title ===" header; files with no text are left out"""
+        content = "\n".join(pages)
+        # The file's content is stripped as a whole, so page offsets shift by the leading whitespace
+        lead = len(content) - len(content.lstrip())
+        content = content.strip()
+        if not content:
+            return
+        header = f"\n\n=== {title} ===\n"
+        base = self._size + len(header)
+        self._file_starts.append(self._size)
+        self._content_starts.append(base)
+        self._titles.append(title)
+        offset = 0
+        for page in pages:
+            start = max(0, offset - lead)
+            if start < len(content):
+                self._page_starts.append(base + start)
+            offset += len(page) + 1
+        self._parts += (header, content)
+        self._size = base + len(content)
+
+    def build(self) -> ParsedDocument:
+        return ParsedDocument("".join(self._parts), self._file_starts, self._content_starts,
+                              tuple(self._titles), self._page_starts)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Interchangeable PDF text extraction libraries.
+
+pypdf is pure Python and always installed; pypdfium2 (PDFium bindings) is
+many times faster and pdfminer.six copes better with some odd encodings, so
+both are used when installed. SOLVER_PDF_BACKEND picks one by name, or
+"auto" takes the fastest one measured by
+
+    python pdfBackends.py benchmark sample1.pdf [sample2.pdf ...]
+
+(falling back to PREFERENCE order before any benchmark has been recorded).
+
+Each document is read with the chosen backend first. If it cannot open the
+file, fails on a page, or finds no text at all, the next backend takes over
+from the first page not yet delivered, so callers still see each page once.
+"""
+import io
+import json
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from solverUtils import safe_print
+
+# Fastest first, used when nothing was benchmarked
+PREFERENCE = ["pypdfium2", "pypdf", "pdfminer"]
+
+
+class PdfDocument:
+    """An open PDF that returns the text of page i on demand"""
+
+    def __init__(self, name: str, page_count: int):
+        self.name = name
+        self.page_count = page_count
+
+    def page_text(self, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PdfBackend:
+    name = ""
+    module = ""
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    def open(self, data: bytes) -> PdfDocument:
+        raise NotImplementedError
+
+
+class _PypdfDocument(PdfDocument):
+    def __init__(self, data: bytes):
+        from pypdf import PdfReader
+
+        self._reader = PdfReader(io.BytesIO(data))
+        super().__init__("pypdf", len(self._reader.pages))
+
+    def page_text(self, index: int) -> str:
+        # pypdf parses each page's content stream only when it is extracted
+        return self._reader.pages[index].extract_text() or ""
+
+
+class PypdfBackend(PdfBackend):
+    name = "pypdf"
+    module = "pypdf"
+
+    def open(self, data: bytes) -> PdfDocument:
+        return _PypdfDocument(data)
+
+
+class _PdfiumDocument(PdfDocument):
+    def __init__(self, data: bytes):
+        import pypdfium2
+
+        self._pdf = pypdfium2.PdfDocument(data)
+        super().__init__("pypdfium2", len(self._pdf))
+
+    def page_text(self, index: int) -> str:
+        page = self._pdf[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
+class PdfiumBackend(PdfBackend):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def open(self, data: bytes) -> PdfDocument:
+        return _PdfiumDocument(data)
+
+
+class _PdfminerDocument(PdfDocument):
+    def __init__(self, data: bytes):
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        document = PDFDocument(PDFParser(io.BytesIO(data)))
+        self._pages = list(PDFPage.create_pages(document))
+        self._resources = PDFResourceManager()
+        super().__init__("pdfminer", len(self._pages))
+
+    def page_text(self, index: int) -> str:
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter
+
+        out = io.StringIO()
+        device = TextConverter(self._resources, out, laparams=LAParams())
+        try:
+            PDFPageInterpreter(self._resources, device).process_page(self._pages[index])
+        finally:
+            device.close()
+        return out.getvalue()
+
+
+class PdfminerBackend(PdfBackend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def open(self, data: bytes) -> PdfDocument:
+        return _PdfminerDocument(data)
+
+
+BACKENDS: Dict[str, PdfBackend] = {b.name: b for b in (PdfiumBackend(), PypdfBackend(), PdfminerBackend())}
+
+
+def available_backends() -> List[str]:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def _benchmarked_fastest(benchmark_path: Optional[Path]) -> Optional[str]:
+    if benchmark_path is None:
+        return None
+    try:
+        with open(benchmark_path) as fh:
+            return json.load(fh).get("fastest")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def backend_order(preferred: str = "auto", benchmark_path: Optional[Path] = None) -> List[str]:
+    """Installed backends in the order a document should try them"""
+    installed = available_backends()
+    ranked = [name for name in PREFERENCE if name in installed]
+    ranked += [name for name in installed if name not in ranked]
+    first = preferred if preferred != "auto" else _benchmarked_fastest(benchmark_path)
+    if first and first not in installed:
+        if preferred != "auto":
+            safe_print(f"[PDF] Backend '{first}' is not installed, using {ranked[:1]}")
+        first = None
+    if first:
+        ranked.remove(first)
+        ranked.insert(0, first)
+    return ranked
+
+
+class PdfExtraction:
+    """Page texts of one PDF, switching backend when the current one fails or finds nothing"""
+
+    def __init__(self, data: bytes, order: List[str]):
+        self.data = data
+        self._order = list(order)
+        self._last_error: Optional[Exception] = None
+        # Live per-document metrics: backend that produced the text, time spent inside backends
+        self.report = {"backend": None, "seconds": 0.0, "pages": 0, "fallbacks": []}
+        self._doc = self._open_next()
+        if self._doc is None:
+            raise self._last_error or RuntimeError("No PDF backend is installed")
+        self.total = self._doc.page_count
+
+    def _fallback(self, name: str, reason: str):
+        safe_print(f"[PDF] {name} failed ({reason}), trying the next backend")
+        self.report["fallbacks"].append({"backend": name, "reason": reason})
+
+    def _open_next(self) -> Optional[PdfDocument]:
+        while self._order:
+            name = self._order.pop(0)
+            started = time.perf_counter()
+            try:
+                doc = BACKENDS[name].open(self.data)
+            except Exception as e:
+                self._last_error = e
+                self._fallback(name, f"open: {e}")
+                continue
+            finally:
+                self.report["seconds"] = round(self.report["seconds"] + time.perf_counter() - started, 4)
+            self.report["backend"] = name
+            return doc
+        return None
+
+    def _page_text(self, doc: PdfDocument, index: int) -> str:
+        started = time.perf_counter()
+        try:
+            return doc.page_text(index)
+        finally:
+            self.report["seconds"] = round(self.report["seconds"] + time.perf_counter() - started, 4)
+            self.report["pages"] += 1
+
+    def __iter__(self) -> Iterator[str]:
+        index = 0
+        seen_text = False
+        doc = self._doc
+        try:
+            while doc is not None:
+                # Leading empty pages are held back: if the whole document is empty the next backend retries them
+                held = 0
+                reason = None
+                for i in range(index, self.total):
+                    try:
+                        text = self._page_text(doc, i)
+                    except Exception as e:
+                        if self._order:
+                            reason = f"page {i + 1}: {e}"
+                            break
+                        # Nothing left to fall back to: lose this page, keep the rest
+                        safe_print(f"Error extracting text from page: {e}")
+                        text = ""
+                    if not seen_text and not text.strip():
+                        held += 1
+                        continue
+                    seen_text = True
+                    for _ in range(held):
+                        yield ""
+                    yield text
+                    index = i + 1
+                    held = 0
+                if reason is None:
+                    if seen_text or not self._order:
+                        for _ in range(held):
+                            yield ""
+                        return
+                    reason = "no text"
+                self._fallback(doc.name, reason)
+                doc.close()
+                doc = self._doc = self._open_next()
+                if doc is not None and doc.page_count != self.total:
+                    # Backends can disagree on broken files; pages are served by this one, so its count holds
+                    safe_print(f"[PDF] {doc.name} reads {doc.page_count} pages where the last backend read {self.total}")
+                    self.report["pageCountMismatch"] = {"backend": doc.name, "pages": doc.page_count,
+                                                        "previous": self.total}
+                    self.total = doc.page_count
+                    index = min(index, self.total)
+            for _ in range(index, self.total):
+                yield ""
+        finally:
+            if doc is not None:
+                doc.close()
+
+
+def benchmark(samples: List[bytes], names: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+    """Seconds per page of each installed backend over the samples (None if it failed on one)"""
+    timings: Dict[str, Optional[float]] = {}
+    for name in names or available_backends():
+        pages = 0
+        started = time.perf_counter()
+        try:
+            for data in samples:
+                doc = BACKENDS[name].open(data)
+                try:
+                    for i in range(doc.page_count):
+                        doc.page_text(i)
+                    pages += doc.page_count
+                finally:
+                    doc.close()
+        except Exception as e:
+            safe_print(f"[PDF] {name} failed during benchmark: {e}")
+            timings[name] = None
+            continue
+        timings[name] = round((time.perf_counter() - started) / max(1, pages), 6)
+    return timings
+
+
+def record_benchmark(path: Path, timings: Dict[str, Optional[float]]) -> Optional[str]:
+    """Store the timings and return the fastest backend, which "auto" selection then prefers"""
+    measured = {name: seconds for name, seconds in timings.items() if seconds is not None}
+    fastest = min(measured, key=measured.get) if measured else None
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump({"fastest": fastest, "secondsPerPage": timings, "measuredAt": time.time()}, fh, indent=2)
+    return fastest
+
+
+def main():
+    from solverConfig import SolverConfig
+
+    parser = argparse.ArgumentParser(description="Compare the installed PDF text extraction backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("benchmark", help="time every backend on sample PDFs and remember the fastest")
+    bench.add_argument("files", nargs="+", type=Path)
+    args = parser.parse_args()
+
+    config = SolverConfig.from_env()
+    timings = benchmark([path.read_bytes() for path in args.files])
+    fastest = record_benchmark(config.pdf_benchmark_path, timings)
+    print(json.dumps({"fastest": fastest, "secondsPerPage": timings}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
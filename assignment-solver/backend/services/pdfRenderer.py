@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Solution PDF rendering with a render cache.
+
+Solving only produces normalized text; the PDF is rendered the first time
+somebody asks for it. Rendered PDFs live in the artifact store and are
+indexed by the hash of (renderer version, title, text), so the same
+solution is never laid out twice.
+
+With SOLVER_RENDER_FRAGMENTS the text is cut at question starts into
+fragments of about a page (boundaries are content-defined, as for notes
+chunks, so editing one answer does not move the others). Each fragment is
+rendered to its own PDF and cached by its hash; the document is assembled
+by concatenating fragment pages with pypdf and stamping page numbers, so a
+re-solve that changes one answer lays out one fragment.
+
+    python pdfRenderer.py < {"solutionText": "...", "title": "..."}
+    python pdfRenderer.py < {"textRef": "sha256:...", "title": "..."}
+"""
+import io
+import re
+import sys
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# PDF writing
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from pypdf import PdfReader, PdfWriter
+
+from artifactStore import ArtifactStore
+from solverConfig import SolverConfig
+from solverUtils import safe_print
+
+# Bump whenever the layout below changes so cached PDFs are re-rendered
+RENDERER_VERSION = "1"
+DEFAULT_TITLE = "Assignment Solution"
+
+# A fragment ends at a question start once it holds FRAGMENT_MIN_CHARS and the question's
+# hash is divisible by FRAGMENT_DIVISOR, or it has reached FRAGMENT_MAX_CHARS
+FRAGMENT_MIN_CHARS = 1500
+FRAGMENT_MAX_CHARS = 5000
+FRAGMENT_DIVISOR = 2
+_QUESTION_START = re.compile(r"^(?:Q(?:uestion)?\s*)?\d+[\).:]\s", re.IGNORECASE)
+
+def clean_text_for_pdf(text: str) -> str:
+    """Clean text to be PDF-safe by removing unsupported characters"""
+    if not text:
+        return ""
+
+    # Replace common Unicode characters with ASCII equivalents
+    replacements = {
+        # Quotes
+        '"': '"', '"': '"', ''': "'", ''': "'",
+        # Dashes
+        '–': '-', '—': '-', '―': '-',
+        # Arrows and symbols
+        '→': '->', '←': '<-', '↑': '^', '↓': 'v',
+        '✓': '[CHECK]', '✗': '[X]', '★': '*', '☆': '*',
+        # Mathematical symbols
+        '×': 'x', '÷': '/', '≤': '<=', '≥': '>=', '≠': '!=',
+        '∑': 'SUM', '∏': 'PRODUCT', '∆': 'DELTA', '∞': 'INFINITY',
+        # Bullets
+        '•': '* ', '◦': '- ', '▪': '- ', '▫': '- ',
+        # Other symbols
+        '©': '(C)', '®': '(R)', '™': '(TM)', '°': 'deg',
+    }
+
+    # Apply replacements
+    cleaned_text = text
+    for unicode_char, ascii_replacement in replacements.items():
+        cleaned_text = cleaned_text.replace(unicode_char, ascii_replacement)
+
+    # Remove any remaining non-ASCII characters
+    # Keep only printable ASCII characters (32-126) plus newlines and tabs
+    cleaned_text = ''.join(char for char in cleaned_text 
+                          if ord(char) < 128 and (char.isprintable() or char in '\n\r\t'))
+
+    return cleaned_text
+
+def _layout_pdf(clean_text: str, clean_title: Optional[str]) -> bytes:
+    """Lay out cleaned text (under a title, if given) as PDF pages"""
+    # Create PDF in memory with proper encoding
+    pdf_buffer = io.BytesIO()
+
+    # Import additional ReportLab modules for better text handling
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_LEFT, TA_CENTER
+
+    # Create document with proper encoding
+    doc = SimpleDocTemplate(
+        pdf_buffer,
+        pagesize=letter,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=50,
+        bottomMargin=50,
+        # Deterministic output (no timestamps or random ids) so identical text dedupes
+        invariant=1
+    )
+
+    # Get styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+
+    body_style = ParagraphStyle(
+        'CustomBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        alignment=TA_LEFT,
+        fontName='Helvetica',
+        leftIndent=0,
+        rightIndent=0
+    )
+
+    # Build content
+    story = []
+
+    # Add title
+    if clean_title is not None:
+        title_para = Paragraph(clean_title, title_style)
+        story.append(title_para)
+        story.append(Spacer(1, 0.2*inch))
+
+    # Process solution text into paragraphs
+    paragraphs = clean_text.split('\n\n')
+
+    for para_text in paragraphs:
+        if para_text.strip():
+            # Clean and escape HTML entities for ReportLab
+            clean_para = para_text.strip()
+            clean_para = clean_para.replace('&', '&amp;')
+            clean_para = clean_para.replace('<', '&lt;')
+            clean_para = clean_para.replace('>', '&gt;')
+
+            # Create paragraph
+            para = Paragraph(clean_para, body_style)
+            story.append(para)
+            story.append(Spacer(1, 0.1*inch))
+
+    # Build PDF
+    doc.build(story)
+
+    # Get PDF bytes
+    pdf_buffer.seek(0)
+    return pdf_buffer.getvalue()
+
+def render_solution_pdf(solution_text: str, title: str = DEFAULT_TITLE) -> bytes:
+    """Create PDF from solution text with proper encoding handling"""
+    try:
+        # Clean the solution text to be PDF-safe
+        clean_solution = clean_text_for_pdf(solution_text)
+        clean_title = clean_text_for_pdf(title)
+
+        safe_print(f"Creating PDF with cleaned text (length: {len(clean_solution)} chars)")
+        pdf_bytes = _layout_pdf(clean_solution, clean_title)
+
+        safe_print(f"PDF created successfully (size: {len(pdf_bytes)} bytes)")
+        return pdf_bytes
+
+    except Exception as e:
+        safe_print(f"Error creating PDF: {e}")
+        # Create a simple error PDF
+        try:
+            pdf_buffer = io.BytesIO()
+            c = canvas.Canvas(pdf_buffer, pagesize=letter)
+            c.setFont("Helvetica", 12)
+            c.drawString(40, 750, "Error generating assignment solution PDF")
+            c.drawString(40, 730, f"Error: {str(e)}")
+            c.drawString(40, 710, "Please try again or contact support.")
+            c.save()
+            pdf_buffer.seek(0)
+            return pdf_buffer.getvalue()
+        except:
+            return b""
+
+
+def split_fragments(text: str) -> List[str]:
+    """Cut solution text into groups of whole questions, each laid out on its own pages"""
+    fragments: List[str] = []
+    current: List[str] = []
+    size = 0
+    for para in (p.strip() for p in text.split("\n\n")):
+        if not para:
+            continue
+        if current and size >= FRAGMENT_MIN_CHARS and _QUESTION_START.match(para) and (
+                size >= FRAGMENT_MAX_CHARS
+                or int(hashlib.sha1(para.encode("utf-8")).hexdigest(), 16) % FRAGMENT_DIVISOR == 0):
+            fragments.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(para)
+        size += len(para)
+    if current:
+        fragments.append("\n\n".join(current))
+    return fragments
+
+
+def assemble_fragments(parts: List[bytes]) -> bytes:
+    """Concatenate fragment PDFs and stamp "Page i of n" on every page"""
+    writer = PdfWriter()
+    for data in parts:
+        writer.append(PdfReader(io.BytesIO(data)))
+    total = len(writer.pages)
+    # All page numbers are drawn in one pass, one overlay page per document page
+    overlay_buffer = io.BytesIO()
+    overlay = canvas.Canvas(overlay_buffer, pagesize=letter, invariant=1)
+    for number in range(1, total + 1):
+        overlay.setFont("Helvetica", 9)
+        overlay.drawCentredString(letter[0] / 2, 30, f"Page {number} of {total}")
+        overlay.showPage()
+    overlay.save()
+    for page, stamp in zip(writer.pages, PdfReader(overlay_buffer).pages):
+        page.merge_page(stamp)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class RenderCache:
+    """Maps a render key to the artifact holding the rendered PDF"""
+
+    def __init__(self, store: ArtifactStore, index_dir: Path, fragments: bool = False):
+        self.store = store
+        self.index_dir = Path(index_dir)
+        self.fragments = fragments
+
+    @classmethod
+    def from_config(cls, config: SolverConfig) -> "RenderCache":
+        return cls(ArtifactStore.from_config(config), config.render_cache_dir, config.render_fragments)
+
+    @staticmethod
+    def render_key(text: str, title: str, layout: str = "") -> str:
+        digest = hashlib.sha256()
+        for part in (RENDERER_VERSION, layout, title, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _index_path(self, key: str) -> Path:
+        return self.index_dir / key[:2] / key
+
+    def lookup(self, key: str) -> Optional[dict]:
+        path = self._index_path(key)
+        if not path.exists():
+            return None
+        artifact = json.loads(path.read_text(encoding="utf-8"))
+        # The artifact may have been cleaned up since it was indexed
+        return artifact if self.store.exists(artifact["ref"]) else None
+
+    def _remember(self, key: str, pdf_bytes: bytes) -> dict:
+        artifact = self.store.put(pdf_bytes, media_type="application/pdf")
+        path = self._index_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(artifact), encoding="utf-8")
+        tmp_path.replace(path)
+        return artifact
+
+    def render_fragments(self, text: str, title: str = DEFAULT_TITLE) -> bytes:
+        """Assemble the document from fragment PDFs, rendering only fragments not seen before"""
+        parts = []
+        rendered = 0
+        fragments = split_fragments(text)
+        for i, fragment in enumerate(fragments):
+            # The title heads the first fragment, so a new title re-renders only that one
+            fragment_title = clean_text_for_pdf(title) if i == 0 else None
+            key = self.render_key(fragment, fragment_title or "", layout="fragment")
+            artifact = self.lookup(key)
+            if artifact is None:
+                pdf_bytes = _layout_pdf(fragment, fragment_title)
+                self._remember(key, pdf_bytes)
+                rendered += 1
+            else:
+                pdf_bytes = self.store.get(artifact["ref"])
+            parts.append(pdf_bytes)
+        safe_print(f"[RENDER] {rendered} of {len(fragments)} fragments rendered, {len(fragments) - rendered} reused")
+        return assemble_fragments(parts)
+
+    def render(self, text: str, title: str = DEFAULT_TITLE) -> Tuple[dict, bool]:
+        """Return (pdf artifact, cache_hit), rendering only on a miss"""
+        text = clean_text_for_pdf(text)
+        key = self.render_key(text, title, layout="fragments" if self.fragments else "")
+        artifact = self.lookup(key)
+        if artifact is not None:
+            safe_print(f"[RENDER] Cache hit for {key[:12]}")
+            return artifact, True
+
+        safe_print(f"[RENDER] Cache miss for {key[:12]}, rendering...")
+        pdf_bytes = None
+        if self.fragments and text.strip():
+            try:
+                pdf_bytes = self.render_fragments(text, title)
+            except Exception as e:
+                safe_print(f"[RENDER] Fragment assembly failed, rendering the whole document: {e}")
+        if pdf_bytes is None:
+            # Not render_solution_pdf: its error page would be cached under this key for good,
+            # so a transient reportlab or font failure is raised and the next request renders again
+            try:
+                pdf_bytes = _layout_pdf(text, clean_text_for_pdf(title))
+            except Exception as e:
+                safe_print(f"[RENDER] Rendering failed, nothing cached: {e}")
+                raise
+        if not pdf_bytes:
+            raise ValueError("PDF generation failed - no bytes returned")
+        return self._remember(key, pdf_bytes), False
+
+
+def main():
+    """Render a solution PDF on demand for Node.js; request JSON is read from stdin"""
+    try:
+        request = json.loads(sys.stdin.read() or "{}")
+        config = SolverConfig.from_env()
+        cache = RenderCache.from_config(config)
+
+        text = request.get("solutionText")
+        if not text and request.get("textRef"):
+            text = cache.store.get_text(request["textRef"])
+        if not text or not text.strip():
+            raise ValueError("No solution text to render")
+
+        artifact, cache_hit = cache.render(text, request.get("title") or DEFAULT_TITLE)
+        result = {"success": True, "cacheHit": cache_hit, "rendererVersion": RENDERER_VERSION}
+        if config.artifacts:
+            result["pdfArtifact"] = artifact
+        else:
+            result["pdfBytes"] = cache.store.get(artifact["ref"]).hex()
+        print(json.dumps(result))
+    except Exception as e:
+        safe_print(f"❌ Error rendering PDF: {e}")
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pre-solves fresh coursework before the first student asks for it.
+
+A scan lists a course's coursework newest first and stops at the course's
+watermark (the latest updateTime seen by the previous scan). Each new item
+with Drive materials becomes a low-priority "presolve" job on the solver
+queue. Workers only pick those up when no user solve is waiting, and at
+most config.presolve_concurrency at a time. The finished solution lands in
+the solution cache (and the PDF in the render cache), so the first click is
+a cache hit. A user solve for the same files while the pre-solve is still
+queued coalesces onto it and promotes it to a normal solve.
+
+    echo '{"accessToken": "..."}' | python presolve.py scan <courseId> [<courseId> ...]
+"""
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from googleapiclient.discovery import build
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
+
+from jobQueue import JobQueue
+from singleFlight import fetch_materials_meta, material_set_key
+from solutionCache import SolutionCache
+from solverConfig import SolverConfig
+from solverUtils import safe_print
+
+PRESOLVE_KIND = "presolve"
+# Below user solves (priority 0), so pre-solving only uses idle workers
+PRESOLVE_PRIORITY = -10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    course_id TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    scanned_at REAL NOT NULL
+);
+"""
+
+
+def _rfc3339(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class PresolveScheduler:
+    def __init__(self, queue: JobQueue, cache: SolutionCache, config: SolverConfig):
+        self.queue = queue
+        self.cache = cache
+        self.config = config
+        self._local = threading.local()
+        config.presolve_state_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: SolverConfig) -> "PresolveScheduler":
+        return cls(JobQueue.from_config(config), SolutionCache.from_config(config), config)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.config.presolve_state_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def watermark(self, course_id: str) -> str:
+        row = self._conn().execute("SELECT watermark FROM watermarks WHERE course_id = ?", (course_id,)).fetchone()
+        if row is not None:
+            return row[0]
+        # First scan of a course: only recent coursework, not the whole term's backlog
+        return _rfc3339(datetime.now(timezone.utc) - timedelta(days=self.config.presolve_lookback_days))
+
+    def _set_watermark(self, course_id: str, watermark: str):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO watermarks (course_id, watermark, scanned_at) VALUES (?, ?, ?)",
+                     (course_id, watermark, time.time()))
+        conn.commit()
+
+    def new_coursework(self, classroom, course_id: str, watermark: str) -> List[dict]:
+        """Published coursework updated after the watermark, newest first"""
+        items: List[dict] = []
+        page_token = None
+        while len(items) < self.config.presolve_max_items:
+            resp = classroom.courses().courseWork().list(
+                courseId=course_id, orderBy="updateTime desc", courseWorkStates=["PUBLISHED"],
+                pageSize=min(50, self.config.presolve_max_items), pageToken=page_token,
+            ).execute()
+            for cw in resp.get("courseWork", []):
+                # RFC 3339 timestamps in UTC compare correctly as strings
+                if cw.get("updateTime", "") <= watermark:
+                    return items
+                items.append(cw)
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+        return items[:self.config.presolve_max_items]
+
+    def scan_course(self, classroom, access_token: str, course_id: str) -> dict:
+        watermark = self.watermark(course_id)
+        items = self.new_coursework(classroom, course_id, watermark)
+        report = {"found": len(items), "queued": 0, "cached": 0, "skipped": 0}
+        for cw in items:
+            materials = cw.get("materials") or []
+            metas = fetch_materials_meta(access_token, materials)
+            key = material_set_key(materials, access_token, require_revisions=True, metas=metas)
+            if key is None:
+                # No Drive files, or revisions unknown: nothing safe to cache
+                report["skipped"] += 1
+                continue
+            if self.cache.contains(key):
+                report["cached"] += 1
+                continue
+            payload = {
+                "accessToken": access_token,
+                "materials": materials,
+                "presolve": True,
+                "courseId": course_id,
+                "courseWorkId": cw.get("id"),
+            }
+            # Background work is never turned away, only started later when the queue is busy
+            self.queue.enqueue(f"presolve-{key[:40]}", payload, kind=PRESOLVE_KIND,
+                               priority=PRESOLVE_PRIORITY, flight_key=key,
+                               cost=self.queue.estimate(materials, metas=metas)["seconds"], shed="defer")
+            report["queued"] += 1
+        if items:
+            self._set_watermark(course_id, max(cw.get("updateTime", "") for cw in items))
+        return report
+
+    def scan(self, access_token: str, course_ids: List[str]) -> dict:
+        creds = Credentials(token=access_token)
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=self.config.http_timeout_seconds))
+        classroom = build("classroom", "v1", http=http, cache_discovery=False)
+        courses = {}
+        for course_id in course_ids:
+            try:
+                courses[course_id] = self.scan_course(classroom, access_token, course_id)
+            except Exception as e:
+                safe_print(f"[PRESOLVE] Scan of course {course_id} failed: {e}")
+                courses[course_id] = {"error": str(e)}
+            safe_print(f"[PRESOLVE] Course {course_id}: {courses[course_id]}")
+        return courses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue pre-solves of new coursework")
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan = sub.add_parser("scan", help="read {\"accessToken\"} from stdin and scan the given courses")
+    scan.add_argument("course_ids", nargs="+")
+    args = parser.parse_args()
+
+    config = SolverConfig.from_env()
+    if not config.solution_cache:
+        print(json.dumps({"success": False, "error": "Pre-solving needs SOLVER_SOLUTION_CACHE=true"}))
+        sys.exit(1)
+    access_token: Optional[str] = json.loads(sys.stdin.read() or "{}").get("accessToken")
+    if not access_token:
+        print(json.dumps({"success": False, "error": "No accessToken on stdin"}))
+        sys.exit(1)
+
+    courses = PresolveScheduler.from_config(config).scan(access_token, args.course_ids)
+    print(json.dumps({"success": True, "courses": courses}))
+
+
+if __name__ == "__main__":
+    main()
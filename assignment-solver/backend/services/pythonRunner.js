@@ -0,0 +1,50 @@
+const { spawn } = require('child_process');
+const path = require('path');
+
+const pythonExecutable = process.env.PYTHON_EXECUTABLE || 'C:\\Python313\\python.exe';
+
+/**
+ * Run one of the Python helper scripts in this folder and parse its JSON output
+ */
+const runPythonJson = (scriptName, args = [], input) => {
+  const scriptPath = path.join(__dirname, scriptName);
+
+  return new Promise((resolve, reject) => {
+    const child = spawn(pythonExecutable, [scriptPath, ...args], {
+      env: {
+        ...process.env,
+        PYTHONIOENCODING: 'utf-8'
+      }
+    });
+
+    let stdout = '';
+    let stderr = '';
+    child.stdout.setEncoding('utf8');
+    child.stderr.setEncoding('utf8');
+    child.stdout.on('data', (data) => { stdout += data; });
+    child.stderr.on('data', (data) => { stderr += data; });
+    child.on('error', reject);
+    child.on('close', (code) => {
+      let parsed = null;
+      try {
+        parsed = JSON.parse(stdout);
+      } catch (error) {
+        return reject(new Error(`Invalid response from ${scriptName} (code ${code}): ${stderr || stdout}`));
+      }
+      if (code !== 0) {
+        return reject(new Error(`${scriptName} exited with code ${code}: ${parsed.error || stderr}`));
+      }
+      resolve(parsed);
+    });
+
+    if (input !== undefined) {
+      child.stdin.write(input);
+    }
+    child.stdin.end();
+  });
+};
+
+module.exports = {
+  pythonExecutable,
+  runPythonJson
+};
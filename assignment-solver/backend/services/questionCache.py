@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Question-level solution cache with exact and near-duplicate matching.
+
+Questions are normalized (numbering, case and whitespace removed) and
+looked up first by the hash of the normalized text, then by MinHash
+signatures bucketed with LSH, so a question reused with light edits still
+finds its earlier answer. Near-duplicates are only reused when they carry
+the same numeric constants and operators: "a ball of 5 kg" and "a ball of
+7 kg" look alike but need different answers.
+
+Operators and symbols stay in the normalized text, so "7 + 2" and "7 - 2"
+never share a key. Keys are scoped (the solver scopes them by course), so
+one course's answers are not served to another, and questions shorter than
+MIN_QUESTION_CHARS once normalized ("(b) Find the value") are neither
+looked up nor stored: their answer depends on context they do not carry.
+"""
+import re
+import time
+import array
+import struct
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    exact_key TEXT NOT NULL UNIQUE,
+    normalized TEXT NOT NULL,
+    numbers TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh (
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, question_id)
+);
+"""
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# Normalized questions shorter than this are never cached
+MIN_QUESTION_CHARS = 30
+
+_LABEL = re.compile(r"^\s*(?:(?:q(?:uestion)?|problem|exercise)\s*)?(?:\d+|[a-z]|[ivx]+)\s*[\).:\-]\s*", re.IGNORECASE)
+_CONSTANT = re.compile(r"\d+(?:\.\d+)?|[^\w\s]")
+# Words and numbers, plus every symbol other than sentence punctuation
+_TOKEN = re.compile(r"[^\W_]+(?:\.\d+)?|[^\w\s.,;:!?'\"]")
+
+
+def _permutations() -> List[Tuple[int, int]]:
+    """Fixed (a, b) pairs for the universal hashes a*x + b mod p"""
+    perms = []
+    for i in range(NUM_PERM):
+        seed = hashlib.sha256(f"minhash-{i}".encode("ascii")).digest()
+        a, b = struct.unpack("<QQ", seed[:16])
+        perms.append((a % (MERSENNE_PRIME - 1) + 1, b % MERSENNE_PRIME))
+    return perms
+
+
+PERMUTATIONS = _permutations()
+
+
+def normalize_question(text: str) -> str:
+    """Drop the question label, case, spacing and sentence punctuation; operators and symbols stay"""
+    text = _LABEL.sub("", text.strip(), count=1)
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def numbers_of(normalized: str) -> str:
+    """The numbers and symbols of a normalized question, which a near match must share"""
+    return " ".join(_CONSTANT.findall(normalized))
+
+
+def minhash(normalized: str) -> array.array:
+    words = normalized.split()
+    if len(words) >= SHINGLE_WORDS:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    else:
+        shingles = {normalized}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+              for s in shingles]
+    signature = array.array("I", [MAX_HASH] * NUM_PERM)
+    for i, (a, b) in enumerate(PERMUTATIONS):
+        signature[i] = min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+    return signature
+
+
+def similarity(sig_a: array.array, sig_b: array.array) -> float:
+    """Estimated Jaccard similarity of the underlying shingle sets"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(signature: array.array, scope: str) -> List[str]:
+    prefix = scope.encode("utf-8") + b"\0"
+    return [hashlib.blake2b(prefix + signature[i * ROWS:(i + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+            for i in range(BANDS)]
+
+
+class QuestionCache:
+    def __init__(self, path: Path, threshold: float = 0.8, scope: str = ""):
+        self.path = Path(path)
+        self.threshold = threshold
+        # Answers are only shared between questions of the same scope
+        self.scope = scope
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _exact_key(self, normalized: str) -> str:
+        return hashlib.sha256(f"{self.scope}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def lookup(self, question: str) -> dict:
+        """Return {"match": "exact"|"near"|None, "similarity": float, "answer": str|None}"""
+        normalized = normalize_question(question)
+        if len(normalized) < MIN_QUESTION_CHARS:
+            return {"match": None, "similarity": 0.0, "answer": None}
+        conn = self._conn()
+        row = conn.execute("SELECT id, answer FROM questions WHERE exact_key = ?",
+                           (self._exact_key(normalized),)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE questions SET hits = hits + 1 WHERE id = ?", (row["id"],))
+            conn.commit()
+            return {"match": "exact", "similarity": 1.0, "answer": row["answer"]}
+
+        signature = minhash(normalized)
+        numbers = numbers_of(normalized)
+        candidates = set()
+        for band, bucket in enumerate(_bands(signature, self.scope)):
+            for hit in conn.execute("SELECT question_id FROM lsh WHERE band = ? AND bucket = ?", (band, bucket)):
+                candidates.add(hit["question_id"])
+
+        best, best_score = None, 0.0
+        for question_id in candidates:
+            row = conn.execute("SELECT id, numbers, signature, answer FROM questions WHERE id = ?",
+                               (question_id,)).fetchone()
+            score = similarity(signature, array.array("I", row["signature"]))
+            if score > best_score:
+                best, best_score = row, score
+
+        if best is not None and best_score >= self.threshold and best["numbers"] == numbers:
+            conn.execute("UPDATE questions SET hits = hits + 1 WHERE id = ?", (best["id"],))
+            conn.commit()
+            return {"match": "near", "similarity": round(best_score, 3), "answer": best["answer"]}
+        return {"match": None, "similarity": round(best_score, 3), "answer": None}
+
+    def store(self, question: str, answer: str):
+        normalized = normalize_question(question)
+        if len(normalized) < MIN_QUESTION_CHARS or not answer.strip():
+            return
+        signature = minhash(normalized)
+        conn = self._conn()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO questions (exact_key, normalized, numbers, signature, answer, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self._exact_key(normalized), normalized, numbers_of(normalized), signature.tobytes(),
+             answer, time.time()),
+        )
+        if cur.rowcount == 1:
+            conn.executemany(
+                "INSERT OR IGNORE INTO lsh (band, bucket, question_id) VALUES (?, ?, ?)",
+                [(band, bucket, cur.lastrowid) for band, bucket in enumerate(_bands(signature, self.scope))],
+            )
+        conn.commit()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Splits assignment text into a tree of questions.
+
+The web solver and the hackathon CLI each flattened text into at most 50
+chunks, compiling a regex per line, so "a)" parts were cut off from their
+question and anything past the cap was silently dropped. segment() reads
+lines from any iterable (an open file, a stream, the lines of a string) and
+matches each against one precompiled pattern. It yields every top-level
+question as soon as the next one starts, with its parts as children and
+the source offsets of every node. Only the question being built is held in
+memory, so one linear pass handles multi-megabyte text. A numbered question
+only collects its lines while streaming; its parts are split out the first
+time they are asked for, so callers that only need each question's text
+pay no more per line than the old flat splitter did.
+
+- "3.", "3)", "Q3:" and "Question 3." start a top-level question.
+- "a)" and "(b)" are parts of it; "(iv)" and "ii)" are parts of a lettered
+  part ("i)" straight after "h)" is still a letter). "- " and "* " bullets
+  go one level below the current labelled line.
+- Text outside any numbered question becomes unlabelled nodes, ending at a
+  blank line or after a line ending in "?".
+- Any other line continues the innermost open node, across blank lines, so
+  a question keeps its data table and its parts keep their stem.
+"""
+import io
+import re
+from typing import Iterable, Iterator, List, Optional
+
+_LABEL = re.compile(
+    r"(?:(?:q(?:uestion)?\s*\.?\s*)?(?P<number>\d+)[\).:]"
+    r"|q(?:uestion)?\s*(?P<qnumber>\d+)"
+    r"|\(?(?P<roman>[ivxlc]{1,6})\)"
+    r"|\(?(?P<letter>[a-z])\)"
+    r"|(?P<bullet>[-*•]))\s+",
+    re.IGNORECASE,
+)
+
+NUMBER, LETTER, ROMAN, BULLET = 1, 2, 3, 4
+_BULLETS = "-*•"
+_NUMBER_KINDS = ("number", "qnumber")
+
+
+class Question:
+    """One node of the tree; start/end are offsets into the source text and cover its parts"""
+
+    __slots__ = ("label", "rank", "start", "end", "_lines", "_starts", "_children")
+
+    def __init__(self, label: Optional[str], rank: int, start: int):
+        # None for unlabelled text; rank orders nesting (NUMBER < LETTER < ROMAN < BULLET)
+        self.label = label
+        self.rank = rank
+        self.start = start
+        self.end = start
+        self._lines: List[str] = []
+        # Start offsets of every line while the parts are not split out yet, then None
+        self._starts: Optional[List[int]] = None
+        self._children: Optional[List["Question"]] = []
+
+    @classmethod
+    def _deferred(cls, label: str, stripped: str, start: int) -> "Question":
+        """A numbered question collecting all its lines; its parts are split out on first use"""
+        node = cls(label, NUMBER, start)
+        node._lines.append(stripped)
+        node._starts = [start]
+        node._children = None
+        return node
+
+    def _split_parts(self):
+        lines, starts = self._lines, self._starts
+        self._lines, self._starts, self._children = [lines[0]], None, []
+        stack = [self]
+        end = starts[0] + len(lines[0])
+        for i in range(1, len(lines)):
+            stripped, start = lines[i], starts[i]
+            match = _LABEL.match(stripped)
+            # Inside a numbered question only another number (never seen here) closes it
+            if match:
+                label, rank = _classify(match, stack)
+                _open(stack, Question(label, rank, start), end)
+            stack[-1]._lines.append(stripped)
+            end = start + len(stripped)
+        for node in stack[1:]:
+            node.end = end
+
+    @property
+    def lines(self) -> List[str]:
+        """This node's own lines, without its parts"""
+        if self._starts is not None:
+            self._split_parts()
+        return self._lines
+
+    @property
+    def children(self) -> List["Question"]:
+        if self._starts is not None:
+            self._split_parts()
+        return self._children
+
+    @property
+    def text(self) -> str:
+        """This node's own lines, without its parts"""
+        return "\n".join(self.lines)
+
+    def full_text(self) -> str:
+        if self._starts is not None:
+            # Parts follow their parent line by line, so the tree's text is every line in order
+            return "\n".join(self._lines)
+        return "\n".join([self.text] + [child.full_text() for child in self.children])
+
+    def walk(self, depth: int = 0) -> Iterator[tuple]:
+        """(depth, node) for this node and every part below it"""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def __repr__(self) -> str:
+        return f"Question({self.label!r}, {self.start}-{self.end}, {len(self.children)} parts)"
+
+
+def _classify(match, stack: List[Question]) -> tuple:
+    """(label, rank) of a labelled line given the nodes currently open"""
+    kind = match.lastgroup
+    label = match.group(kind)
+    if kind == "number" or kind == "qnumber":
+        return label, NUMBER
+    if kind == "bullet":
+        # A bullet sits one level below the innermost labelled line that is not itself a bullet
+        for node in reversed(stack):
+            if node.label is not None and node.label not in _BULLETS:
+                return label, min(node.rank + 1, BULLET)
+        return label, BULLET
+    label = label.lower()
+    if kind == "roman":
+        # Roman numerals only nest under a lettered part; "i)" right after "h)" is a letter
+        for node in reversed(stack):
+            if node.rank == LETTER:
+                letter = node.label
+                if not (len(letter) == 1 and label == chr(ord(letter) + 1)):
+                    return label, ROMAN
+                break
+    return label, LETTER
+
+
+def _open(stack: List[Question], node: Question, end: int) -> Optional[Question]:
+    """
+    Close the open nodes at node's level or deeper, ending them at end, and push
+    node under what is left; returns the top-level node closed when node starts
+    a new one. Unlabelled text never holds parts.
+    """
+    depth = len(stack)
+    while depth and (stack[depth - 1].rank >= node.rank or stack[depth - 1].label is None):
+        depth -= 1
+        stack[depth].end = end
+    closed = stack[0] if stack and not depth else None
+    del stack[depth:]
+    if stack:
+        stack[-1]._children.append(node)
+    stack.append(node)
+    return closed
+
+
+def segment(lines: Iterable[str], offset: int = 0) -> Iterator[Question]:
+    """Top-level questions of a stream of lines (with their line endings), offsets counted from offset"""
+    # Open nodes from the current top-level question down to the innermost part
+    stack: List[Question] = []
+    # A numbered question whose lines are only collected; everything else builds the tree at once
+    deferred: Optional[Question] = None
+    # End of the last non-blank line outside a deferred question
+    end = offset
+    match_label = _LABEL.match
+    for line in lines:
+        line_start = offset
+        offset += len(line)
+        stripped = line.strip()
+        if not stripped:
+            if stack and stack[0].label is None:
+                stack[0].end = end
+                yield stack[0]
+                stack = []
+            continue
+        start = line_start + len(line) - len(line.lstrip())
+        match = match_label(stripped)
+        is_number = match is not None and match.lastgroup in _NUMBER_KINDS
+        if deferred is not None:
+            if not is_number:
+                deferred._lines.append(stripped)
+                deferred._starts.append(start)
+                continue
+            deferred.end = deferred._starts[-1] + len(deferred._lines[-1])
+            yield deferred
+            deferred = None
+        if is_number:
+            # The common case: collect the question's lines and split its parts only when asked
+            for node in stack:
+                node.end = end
+            if stack:
+                yield stack[0]
+                stack = []
+            deferred = Question._deferred(match.group(match.lastgroup), stripped, start)
+            continue
+        if match:
+            label, rank = _classify(match, stack)
+            closed = _open(stack, Question(label, rank, start), end)
+            if closed is not None:
+                yield closed
+        elif not stack:
+            stack.append(Question(None, NUMBER, start))
+        stack[-1]._lines.append(stripped)
+        end = start + len(stripped)
+        if stripped[-1] == "?" and stack[0].label is None:
+            stack[0].end = end
+            yield stack[0]
+            stack = []
+    if deferred is not None:
+        deferred.end = deferred._starts[-1] + len(deferred._lines[-1])
+        yield deferred
+    for node in stack:
+        node.end = end
+    if stack:
+        yield stack[0]
+
+
+def segment_text(text: str, offset: int = 0) -> Iterator[Question]:
+    """Top-level questions of a string, with offsets into it (plus offset)"""
+    return segment(io.StringIO(text), offset)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumable Drive downloads using HTTP range requests.
+
+Bytes are appended to <dest>.part one chunk at a time and flushed to disk
+before the next range is requested, so the size of the .part file is
+always the committed offset. After a transient failure (a dropped socket,
+a 5xx or 429) the download continues from that offset after a jittered
+backoff; a process restart picks up the same .part file. A sidecar
+<dest>.part.json records the file's revision so a partial download of an
+older revision is never completed with newer bytes.
+
+download_to_memory runs the same range requests, retries and 200/416
+handling into an in-memory buffer, for callers that do not keep the file
+and should not pay for a disk round trip.
+
+Only needs googleapiclient's request object (its authorized http and uri),
+so both the backend solver and the hackathon CLI can use it.
+"""
+import io
+import os
+import re
+import json
+import time
+import sys
+import random
+import socket
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+import httplib2
+
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class DownloadError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+def _backoff(attempt: int, base: float, cap: float) -> float:
+    # Full jitter: spreads retries of many workers hitting the same outage
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _load_meta(meta_path: Path) -> dict:
+    try:
+        with open(meta_path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _download_ranges(request, out: BinaryIO, offset: int, chunk_size: int, max_retries: int,
+                     backoff_base: float, backoff_max: float, check: Optional[Callable[[], None]],
+                     durable: bool):
+    """Append the bytes of request from offset to out until the whole file is there"""
+    total = None
+    failures = 0
+    while total is None or offset < total:
+        if check is not None:
+            check()
+        headers = {"Range": f"bytes={offset}-{offset + chunk_size - 1}"}
+        try:
+            resp, content = request.http.request(request.uri, method="GET", headers=headers)
+        except (OSError, socket.timeout, httplib2.HttpLib2Error) as e:
+            status, error = None, e
+        else:
+            status, error = resp.status, None
+
+        if status == 206:
+            match = _CONTENT_RANGE.match(resp.get("content-range", ""))
+            if not match or int(match.group(1)) != offset:
+                raise DownloadError(206, f"unexpected Content-Range {resp.get('content-range')!r}")
+            out.write(content)
+            if durable:
+                out.flush()
+                os.fsync(out.fileno())
+            offset += len(content)
+            total = int(match.group(3)) if match.group(3) != "*" else None
+            if total is None and len(content) < chunk_size:
+                total = offset
+            failures = 0
+            continue
+        if status == 200:
+            # The server ignored the range (Drive exports do): the body is the whole file
+            out.seek(0)
+            out.truncate()
+            out.write(content)
+            offset = total = len(content)
+            continue
+        if status == 416:
+            # Nothing left past the committed offset: either complete, or the file shrank
+            size = resp.get("content-range", "").rpartition("/")[2]
+            if size.isdigit() and int(size) == offset:
+                total = offset
+                continue
+            out.seek(0)
+            out.truncate()
+            offset = 0
+            continue
+        if status is not None and status not in RETRYABLE_STATUS:
+            raise DownloadError(status, content[:200].decode("utf-8", "replace"))
+
+        failures += 1
+        if failures > max_retries:
+            if error is not None:
+                raise error
+            raise DownloadError(status, "retries exhausted")
+        delay = _backoff(failures - 1, backoff_base, backoff_max)
+        # stderr: the solver's stdout carries its JSON result
+        print(f"[DOWNLOAD] {error or f'HTTP {status}'} at byte {offset}, retrying in {delay:.1f}s",
+              file=sys.stderr)
+        time.sleep(delay)
+
+
+def download_to_file(request, dest: Path, revision: Optional[str] = None,
+                     chunk_size: int = CHUNK_SIZE, max_retries: int = MAX_RETRIES,
+                     backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX,
+                     check: Optional[Callable[[], None]] = None) -> Path:
+    """Download a googleapiclient media request (get_media/export_media) into dest, resuming if possible"""
+    dest = Path(dest)
+    part = dest.with_name(dest.name + ".part")
+    meta_path = dest.with_name(dest.name + ".part.json")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    meta = _load_meta(meta_path)
+    if part.exists() and (meta.get("uri") != request.uri or meta.get("revision") != revision):
+        part.unlink()
+    if not part.exists():
+        with open(meta_path, "w") as fh:
+            json.dump({"uri": request.uri, "revision": revision}, fh)
+    offset = part.stat().st_size if part.exists() else 0
+
+    with open(part, "ab") as out:
+        _download_ranges(request, out, offset, chunk_size, max_retries, backoff_base, backoff_max, check,
+                         durable=True)
+        out.flush()
+
+    os.replace(part, dest)
+    if meta_path.exists():
+        meta_path.unlink()
+    return dest
+
+
+def download_to_memory(request, chunk_size: int = CHUNK_SIZE, max_retries: int = MAX_RETRIES,
+                       backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX,
+                       check: Optional[Callable[[], None]] = None) -> bytes:
+    """Download a media request into memory with the same range resume and retries as download_to_file"""
+    buffer = io.BytesIO()
+    _download_ranges(request, buffer, 0, chunk_size, max_retries, backoff_base, backoff_max, check,
+                     durable=False)
+    return buffer.getvalue()
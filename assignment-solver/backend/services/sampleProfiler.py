@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sampling profiler for slow solves.
+
+A background thread looks at the job thread's stack every few milliseconds
+(sys._current_frames, no tracing hooks), so the job runs at close to full
+speed. Samples are only written out when the job took longer than
+SOLVER_PROFILE_THRESHOLD_SECONDS, as either collapsed stacks
+(flamegraph.pl, speedscope, inferno) or a speedscope JSON file named after
+the solution id. Time spent waiting on Drive or Gemini shows up under the
+socket/selector frames, next to pypdf and reportlab work.
+"""
+import re
+import sys
+import json
+import time
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from solverConfig import SolverConfig
+from solverUtils import safe_print
+
+Frame = Tuple[str, str, int]
+MAX_DEPTH = 200
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    """Frames of a stack from the outermost call to the innermost"""
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+class SamplingProfiler(threading.Thread):
+    """Samples one thread's stack until stopped; weights are the seconds between samples"""
+
+    def __init__(self, thread_id: int, interval: float = 0.01):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.weights: Dict[Tuple[Frame, ...], float] = defaultdict(float)
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._halt = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.weights[_stack(frame)] += now - last
+                self.samples += 1
+            last = now
+            del frame
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def collapsed(self) -> str:
+        """One "outer;...;inner <microseconds>" line per distinct stack"""
+        lines = []
+        for stack, seconds in sorted(self.weights.items(), key=lambda item: -item[1]):
+            names = ";".join(f"{name} ({Path(path).name}:{line})".replace(";", ",") for name, path, line in stack)
+            lines.append(f"{names} {max(1, int(seconds * 1e6))}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        frames: Dict[Frame, int] = {}
+        samples = []
+        weights = []
+        for stack, seconds in self.weights.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(round(seconds, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "assignment-solver",
+            "shared": {"frames": [{"name": n, "file": f, "line": l} for n, f, l in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.elapsed, 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class JobProfiler:
+    """Profiles the calling thread for the duration of a job; a no-op unless profile_dir is set"""
+
+    def __init__(self, config: SolverConfig, tag: Optional[str] = None):
+        self.config = config
+        self.tag = re.sub(r"[^A-Za-z0-9_.-]", "_", tag or "job")
+        self.path: Optional[Path] = None
+        self._profiler: Optional[SamplingProfiler] = None
+
+    def __enter__(self) -> "JobProfiler":
+        if self.config.profile_dir is not None:
+            self._profiler = SamplingProfiler(threading.get_ident(), self.config.profile_interval_ms / 1000.0)
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return False
+        profiler.stop()
+        if profiler.elapsed < self.config.profile_threshold_seconds:
+            return False
+        try:
+            self.path = self._write(profiler)
+            safe_print(f"[PROFILE] {profiler.elapsed:.1f}s job, {profiler.samples} samples written to {self.path}")
+        except OSError as e:
+            safe_print(f"[PROFILE] Could not write profile: {e}")
+        return False
+
+    def _write(self, profiler: SamplingProfiler) -> Path:
+        directory = self.config.profile_dir
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.tag}"
+        if self.config.profile_format == "speedscope":
+            path = directory / f"{stem}.speedscope.json"
+            path.write_text(json.dumps(profiler.speedscope(f"solve {self.tag}")), encoding="utf-8")
+        else:
+            path = directory / f"{stem}.collapsed"
+            path.write_text(profiler.collapsed(), encoding="utf-8")
+        return path
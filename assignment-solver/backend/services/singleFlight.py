@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keys for single-flight coalescing of solve requests.
+
+Two requests are the same flight when they reference the same Drive files
+at the same revisions, whichever student clicked solve. The key is only a
+hint: if revision metadata cannot be fetched, the file id alone is used.
+"""
+import json
+import hashlib
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional
+
+from solverUtils import safe_print
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/"
+# Revision fields for the key, plus size and type for the scheduler's cost estimate
+FILE_FIELDS = "id,version,md5Checksum,modifiedTime,size,mimeType"
+
+
+def material_file_ids(materials: List[dict]) -> List[str]:
+    """Drive file ids referenced by a list of Classroom materials"""
+    ids = []
+    for material in materials or []:
+        drive_file = (material.get("driveFile") or {}).get("driveFile") or {}
+        if drive_file.get("id"):
+            ids.append(drive_file["id"])
+    return ids
+
+
+def fetch_file_meta(access_token: str, file_id: str, timeout: float = 5.0) -> Optional[dict]:
+    """Drive metadata (FILE_FIELDS) of one file, or None if it cannot be fetched"""
+    url = DRIVE_FILES_URL + urllib.parse.quote(file_id) + "?" + urllib.parse.urlencode(
+        {"fields": FILE_FIELDS, "supportsAllDrives": "true"}
+    )
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {access_token}"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except Exception as e:
+        safe_print(f"[FLIGHT] Could not fetch metadata for {file_id}: {e}")
+        return None
+
+
+def fetch_materials_meta(access_token: str, materials: List[dict]) -> Dict[str, Optional[dict]]:
+    """Metadata of every Drive file in a material set, fetched once for both the key and the cost estimate"""
+    return {file_id: fetch_file_meta(access_token, file_id) for file_id in sorted(set(material_file_ids(materials)))}
+
+
+def file_revision(meta: Optional[dict]) -> Optional[str]:
+    """A string that changes whenever the Drive file's content changes"""
+    if not meta:
+        return None
+    # Native Google files have no md5Checksum but bump version on every edit
+    return meta.get("md5Checksum") or meta.get("version") or meta.get("modifiedTime")
+
+
+def fetch_file_revision(access_token: str, file_id: str, timeout: float = 5.0) -> Optional[str]:
+    return file_revision(fetch_file_meta(access_token, file_id, timeout))
+
+
+def material_set_key(materials: List[dict], access_token: Optional[str] = None,
+                     require_revisions: bool = False,
+                     metas: Optional[Dict[str, Optional[dict]]] = None) -> Optional[str]:
+    """
+    Order-independent key for a material set; None when there are no Drive files.
+    With require_revisions (for caches, where a stale key means a wrong answer)
+    it is also None when any file's revision could not be fetched. metas, from
+    fetch_materials_meta, saves fetching the metadata again.
+    """
+    file_ids = sorted(set(material_file_ids(materials)))
+    if not file_ids:
+        return None
+    if require_revisions and not access_token:
+        return None
+    revisions: Dict[str, str] = {}
+    if access_token:
+        for file_id in file_ids:
+            if metas is not None and file_id in metas:
+                revisions[file_id] = file_revision(metas[file_id]) or ""
+            else:
+                revisions[file_id] = fetch_file_revision(access_token, file_id) or ""
+            if require_revisions and not revisions[file_id]:
+                return None
+    digest = hashlib.sha256()
+    for file_id in file_ids:
+        digest.update(f"{file_id}@{revisions.get(file_id, '')}\n".encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Solution text cache keyed by the exact revisions of an assignment's files.
+
+Keys come from singleFlight.material_set_key(require_revisions=True), so an
+edited handout gets a new key and is solved again. Pre-solved coursework
+(see presolve.py) lands here, which makes the first real click a lookup.
+"""
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+from solverConfig import SolverConfig
+
+# Bump when prompts change enough that old solutions should not be served
+CACHE_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    key TEXT PRIMARY KEY,
+    solution_text TEXT NOT NULL,
+    source TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_hit_at REAL
+);
+"""
+
+
+class SolutionCache:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: SolverConfig) -> "SolutionCache":
+        return cls(config.solution_cache_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(material_key: str) -> str:
+        return f"v{CACHE_VERSION}:{material_key}"
+
+    def get(self, material_key: str) -> Optional[str]:
+        conn = self._conn()
+        row = conn.execute("SELECT solution_text FROM solutions WHERE key = ?",
+                           (self._key(material_key),)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE solutions SET hits = hits + 1, last_hit_at = ? WHERE key = ?",
+                     (time.time(), self._key(material_key)))
+        conn.commit()
+        return row["solution_text"]
+
+    def contains(self, material_key: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM solutions WHERE key = ?",
+                                    (self._key(material_key),)).fetchone() is not None
+
+    def put(self, material_key: str, solution_text: str, source: str = "solve"):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO solutions (key, solution_text, source, hits, created_at) "
+            "VALUES (?, ?, ?, 0, ?)",
+            (self._key(material_key), solution_text, source, time.time()),
+        )
+        conn.commit()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Environment-driven settings shared by the solver CLI and its workers."""
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_DIR = BACKEND_DIR / "data"
+
+
+def _env_str(name: str, default: Optional[str]) -> Optional[str]:
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, ""))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, ""))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class SolverConfig:
+    """Tunables for the solver; every field can be set through a SOLVER_* env var"""
+
+    def __init__(self,
+                 data_dir: Optional[Path] = None,
+                 workers: int = 2,
+                 lease_seconds: float = 120.0,
+                 heartbeat_seconds: float = 20.0,
+                 poll_seconds: float = 1.0,
+                 max_attempts: int = 4,
+                 backoff_base: float = 5.0,
+                 backoff_max: float = 300.0,
+                 artifacts: bool = False,
+                 text_compression: str = "zlib",
+                 render_mode: str = "eager",
+                 prompt_budget_chars: int = 200000,
+                 question_cache: bool = False,
+                 question_similarity: float = 0.8,
+                 strip_boilerplate: bool = True,
+                 trace_memory: bool = False,
+                 worker_max_jobs: int = 100,
+                 worker_max_rss_mb: int = 1024,
+                 job_deadline_seconds: float = 600.0,
+                 http_timeout_seconds: float = 60.0,
+                 hedge_llm: bool = False,
+                 hedge_percentile: float = 95.0,
+                 hedge_after_seconds: float = 45.0,
+                 solution_cache: bool = False,
+                 presolve_concurrency: int = 1,
+                 presolve_max_items: int = 20,
+                 presolve_lookback_days: float = 7.0,
+                 pdf_backend: str = "auto",
+                 profile_dir: Optional[Path] = None,
+                 profile_threshold_seconds: float = 60.0,
+                 profile_interval_ms: float = 10.0,
+                 profile_format: str = "collapsed",
+                 max_queue_depth: int = 100,
+                 max_queue_wait_seconds: float = 300.0,
+                 batch_size: int = 1,
+                 batch_window_ms: float = 300.0,
+                 batch_max_cost_seconds: float = 15.0,
+                 batch_max_chars: int = 6000,
+                 render_fragments: bool = False,
+                 csv_sample_rows: int = 20,
+                 dedupe: bool = True,
+                 dedupe_max_distance: int = 3,
+                 usage_ledger: bool = True):
+        # Relative paths are taken from the backend folder, matching the Node.js side
+        self.data_dir = BACKEND_DIR / data_dir if data_dir else DEFAULT_DATA_DIR
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.artifacts = artifacts
+        self.text_compression = text_compression
+        self.render_mode = render_mode
+        # Extraction stops once this many characters are collected for the prompt (0 = no limit)
+        self.prompt_budget_chars = prompt_budget_chars
+        self.question_cache = question_cache
+        self.question_similarity = question_similarity
+        self.strip_boilerplate = strip_boilerplate
+        self.trace_memory = trace_memory
+        # A worker process is replaced after this many jobs or above this RSS (0 = never)
+        self.worker_max_jobs = worker_max_jobs
+        self.worker_max_rss_mb = worker_max_rss_mb
+        # Whole-job time budget split across stages (0 = no deadline)
+        self.job_deadline_seconds = job_deadline_seconds
+        self.http_timeout_seconds = http_timeout_seconds
+        # A duplicate LLM request starts once a whole-assignment call is slower than this latency
+        # percentile of earlier ones; hedge_after_seconds is used until enough latencies have been
+        # recorded, and for batched and question-cache calls
+        self.hedge_llm = hedge_llm
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after_seconds = hedge_after_seconds
+        self.solution_cache = solution_cache
+        # Pre-solve jobs leased at once across all workers, and coursework considered per scan
+        self.presolve_concurrency = max(0, presolve_concurrency)
+        self.presolve_max_items = presolve_max_items
+        self.presolve_lookback_days = presolve_lookback_days
+        # pypdfium2 | pypdf | pdfminer, or auto for the fastest benchmarked (see pdfBackends.py)
+        self.pdf_backend = pdf_backend
+        # Jobs are sampled when profile_dir is set; profiles of jobs slower than the threshold are kept
+        self.profile_dir = BACKEND_DIR / profile_dir if profile_dir else None
+        self.profile_threshold_seconds = profile_threshold_seconds
+        self.profile_interval_ms = max(1.0, profile_interval_ms)
+        self.profile_format = profile_format
+        # New solves are turned away (with a retry-after hint) past either limit (0 = no limit)
+        self.max_queue_depth = max_queue_depth
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        # Up to batch_size small jobs (estimated at most batch_max_cost_seconds, with at most
+        # batch_max_chars of text) arriving within batch_window_ms share one LLM request (1 = off)
+        self.batch_size = max(1, batch_size)
+        self.batch_window_ms = max(0.0, batch_window_ms)
+        self.batch_max_cost_seconds = batch_max_cost_seconds
+        self.batch_max_chars = batch_max_chars
+        # Render solutions as cached per-question fragments merged into one PDF (see pdfRenderer.py)
+        self.render_fragments = render_fragments
+        # Spreadsheets reach the prompt as column statistics plus this many sampled rows
+        self.csv_sample_rows = max(0, csv_sample_rows)
+        # Paragraphs and attachments repeated across one job's files are dropped before prompting;
+        # SimHash fingerprints within this many of 64 bits count as the same text
+        self.dedupe = dedupe
+        self.dedupe_max_distance = max(0, dedupe_max_distance)
+        # Tokens and time of every LLM call are appended to data/usage.sqlite (see usageLedger.py)
+        self.usage_ledger = usage_ledger
+
+    @classmethod
+    def from_env(cls) -> "SolverConfig":
+        return cls(
+            data_dir=_env_str("SOLVER_DATA_DIR", None),
+            workers=_env_int("SOLVER_WORKERS", 2),
+            lease_seconds=_env_float("SOLVER_LEASE_SECONDS", 120.0),
+            heartbeat_seconds=_env_float("SOLVER_HEARTBEAT_SECONDS", 20.0),
+            poll_seconds=_env_float("SOLVER_POLL_SECONDS", 1.0),
+            max_attempts=_env_int("SOLVER_MAX_ATTEMPTS", 4),
+            backoff_base=_env_float("SOLVER_BACKOFF_BASE", 5.0),
+            backoff_max=_env_float("SOLVER_BACKOFF_MAX", 300.0),
+            artifacts=_env_bool("SOLVER_ARTIFACTS", False),
+            text_compression=_env_str("SOLVER_TEXT_COMPRESSION", "zlib"),
+            render_mode=_env_str("SOLVER_RENDER_MODE", "eager"),
+            prompt_budget_chars=_env_int("SOLVER_PROMPT_BUDGET_CHARS", 200000),
+            question_cache=_env_bool("SOLVER_QUESTION_CACHE", False),
+            question_similarity=_env_float("SOLVER_QUESTION_SIMILARITY", 0.8),
+            strip_boilerplate=_env_bool("SOLVER_STRIP_BOILERPLATE", True),
+            trace_memory=_env_bool("SOLVER_TRACE_MEMORY", False),
+            worker_max_jobs=_env_int("SOLVER_WORKER_MAX_JOBS", 100),
+            worker_max_rss_mb=_env_int("SOLVER_WORKER_MAX_RSS_MB", 1024),
+            job_deadline_seconds=_env_float("SOLVER_JOB_DEADLINE_SECONDS", 600.0),
+            http_timeout_seconds=_env_float("SOLVER_HTTP_TIMEOUT_SECONDS", 60.0),
+            hedge_llm=_env_bool("SOLVER_HEDGE_LLM", False),
+            hedge_percentile=_env_float("SOLVER_HEDGE_PERCENTILE", 95.0),
+            hedge_after_seconds=_env_float("SOLVER_HEDGE_AFTER_SECONDS", 45.0),
+            solution_cache=_env_bool("SOLVER_SOLUTION_CACHE", False),
+            presolve_concurrency=_env_int("SOLVER_PRESOLVE_CONCURRENCY", 1),
+            presolve_max_items=_env_int("SOLVER_PRESOLVE_MAX_ITEMS", 20),
+            presolve_lookback_days=_env_float("SOLVER_PRESOLVE_LOOKBACK_DAYS", 7.0),
+            pdf_backend=_env_str("SOLVER_PDF_BACKEND", "auto"),
+            profile_dir=_env_str("SOLVER_PROFILE_DIR", None),
+            profile_threshold_seconds=_env_float("SOLVER_PROFILE_THRESHOLD_SECONDS", 60.0),
+            profile_interval_ms=_env_float("SOLVER_PROFILE_INTERVAL_MS", 10.0),
+            profile_format=_env_str("SOLVER_PROFILE_FORMAT", "collapsed"),
+            max_queue_depth=_env_int("SOLVER_MAX_QUEUE_DEPTH", 100),
+            max_queue_wait_seconds=_env_float("SOLVER_MAX_QUEUE_WAIT_SECONDS", 300.0),
+            batch_size=_env_int("SOLVER_BATCH_SIZE", 1),
+            batch_window_ms=_env_float("SOLVER_BATCH_WINDOW_MS", 300.0),
+            batch_max_cost_seconds=_env_float("SOLVER_BATCH_MAX_COST_SECONDS", 15.0),
+            batch_max_chars=_env_int("SOLVER_BATCH_MAX_CHARS", 6000),
+            render_fragments=_env_bool("SOLVER_RENDER_FRAGMENTS", False),
+            csv_sample_rows=_env_int("SOLVER_CSV_SAMPLE_ROWS", 20),
+            dedupe=_env_bool("SOLVER_DEDUPE", True),
+            dedupe_max_distance=_env_int("SOLVER_DEDUPE_MAX_DISTANCE", 3),
+            usage_ledger=_env_bool("SOLVER_USAGE_LEDGER", True),
+        )
+
+    @property
+    def queue_path(self) -> Path:
+        return self.data_dir / "jobs.sqlite"
+
+    @property
+    def artifacts_dir(self) -> Path:
+        return self.data_dir / "artifacts"
+
+    @property
+    def question_cache_path(self) -> Path:
+        return self.data_dir / "questions.sqlite"
+
+    @property
+    def solution_cache_path(self) -> Path:
+        return self.data_dir / "solutions.sqlite"
+
+    @property
+    def usage_ledger_path(self) -> Path:
+        return self.data_dir / "usage.sqlite"
+
+    @property
+    def presolve_state_path(self) -> Path:
+        return self.data_dir / "presolve.sqlite"
+
+    @property
+    def lease_limits(self) -> Dict[str, int]:
+        """Caps on concurrently leased jobs per kind"""
+        return {"presolve": self.presolve_concurrency}
+
+    @property
+    def downloads_dir(self) -> Path:
+        return self.data_dir / "downloads"
+
+    @property
+    def latency_history_path(self) -> Path:
+        return self.data_dir / "llm-latency.json"
+
+    @property
+    def pdf_benchmark_path(self) -> Path:
+        return self.data_dir / "pdf-backends.json"
+
+    @property
+    def render_cache_dir(self) -> Path:
+        return self.data_dir / "render-cache"
@@ -0,0 +1,127 @@
+const { runPythonJson } = require('./pythonRunner');
+
+const pollIntervalMs = parseInt(process.env.SOLVER_QUEUE_POLL_MS) || 3000;
+const presolveIntervalMs = parseInt(process.env.SOLVER_PRESOLVE_INTERVAL_MS) || 10 * 60 * 1000;
+
+// jobId -> callback invoked once the job is done or dead-lettered
+const watchedJobs = new Map();
+let pollTimer = null;
+// courseId -> time of the last pre-solve scan started from this server
+const lastPresolveScan = new Map();
+
+/**
+ * Whether solve requests go through the durable Python job queue
+ */
+const isQueueEnabled = () => process.env.SOLVER_QUEUE === 'true';
+
+/**
+ * Run the jobQueue.py CLI and parse its JSON output
+ */
+const runQueueCommand = (args, input) => runPythonJson('jobQueue.py', args, input);
+
+/**
+ * Raised when the queue sheds a new solve; retryAfter is in seconds
+ */
+class QueueOverloadedError extends Error {
+  constructor(message, retryAfter) {
+    super(message);
+    this.name = 'QueueOverloadedError';
+    this.retryAfter = retryAfter;
+  }
+}
+
+/**
+ * Queue a solve job; the solution id doubles as the job id.
+ * usage ({ courseId, courseWorkId }) names what the LLM usage is accounted to.
+ * Throws QueueOverloadedError when the backlog is too deep to take it.
+ */
+const enqueueSolveJob = async (solutionId, accessToken, materials, userId, usage = {}) => {
+  const payload = JSON.stringify({
+    solutionId: String(solutionId),
+    accessToken,
+    materials: materials || [],
+    userId: userId ? String(userId) : undefined,
+    courseId: usage.courseId,
+    courseWorkId: usage.courseWorkId
+  });
+  // --coalesce lets duplicate solves of the same materials share one in-flight job
+  const args = ['enqueue', String(solutionId), '--coalesce'];
+  if (userId) {
+    // Workers are shared fairly between users
+    args.push('--owner', String(userId));
+  }
+  const response = await runQueueCommand(args, payload);
+  if (response.overloaded) {
+    throw new QueueOverloadedError(response.error, response.retryAfter);
+  }
+  return response.job;
+};
+
+const pollWatchedJobs = async () => {
+  if (watchedJobs.size === 0) {
+    clearInterval(pollTimer);
+    pollTimer = null;
+    return;
+  }
+
+  try {
+    const response = await runQueueCommand(['status', ...watchedJobs.keys()]);
+    for (const [jobId, job] of Object.entries(response.jobs || {})) {
+      const onSettled = watchedJobs.get(jobId);
+      if (!onSettled) {
+        continue;
+      }
+      if (!job || job.status === 'done' || job.status === 'dead') {
+        watchedJobs.delete(jobId);
+        onSettled(job);
+      }
+    }
+  } catch (error) {
+    console.error('🧵 Error polling solver queue:', error.message);
+  }
+};
+
+/**
+ * Call onSettled(job) once the job finishes; job is null if it vanished from the queue
+ */
+const watchJob = (jobId, onSettled) => {
+  watchedJobs.set(String(jobId), onSettled);
+  if (!pollTimer) {
+    pollTimer = setInterval(pollWatchedJobs, pollIntervalMs);
+  }
+};
+
+/**
+ * Whether new coursework is solved ahead of the first click
+ */
+const isPresolveEnabled = () => isQueueEnabled() && process.env.SOLVER_PRESOLVE === 'true';
+
+/**
+ * Queue background solves of new coursework in the given courses.
+ * Fire-and-forget: each course is scanned at most once per SOLVER_PRESOLVE_INTERVAL_MS.
+ */
+const schedulePresolve = (accessToken, courseIds) => {
+  if (!isPresolveEnabled() || !accessToken) {
+    return;
+  }
+  const now = Date.now();
+  const due = [...new Set(courseIds || [])].filter(
+    (courseId) => courseId && now - (lastPresolveScan.get(courseId) || 0) >= presolveIntervalMs
+  );
+  if (due.length === 0) {
+    return;
+  }
+  due.forEach((courseId) => lastPresolveScan.set(courseId, now));
+
+  runPythonJson('presolve.py', ['scan', ...due], JSON.stringify({ accessToken }))
+    .then((response) => console.log('🧵 Pre-solve scan:', JSON.stringify(response.courses)))
+    .catch((error) => console.error('🧵 Pre-solve scan failed:', error.message));
+};
+
+module.exports = {
+  QueueOverloadedError,
+  isQueueEnabled,
+  enqueueSolveJob,
+  watchJob,
+  schedulePresolve
+};
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Small helpers shared by the solver modules."""
+import sys
+
+
+def safe_print(message):
+    """Print function that handles encoding issues on Windows and outputs to stderr for debugging"""
+    try:
+        print(message, file=sys.stderr)
+    except UnicodeEncodeError:
+        # If there's a Unicode error, print a safe ASCII version
+        safe_message = message.encode('ascii', 'replace').decode('ascii')
+        print(safe_message, file=sys.stderr)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool of solver worker processes consuming the durable job queue.
+
+Each worker leases one job at a time and keeps the lease alive with a
+heartbeat thread while the handler runs. A worker that crashes simply
+stops heartbeating: its job returns to the queue once the lease expires,
+and the supervisor starts a replacement process.
+
+Workers also retire themselves between jobs once they have run
+worker_max_jobs jobs or their RSS is above worker_max_rss_mb, logging the
+top allocation sites first; the supervisor starts a fresh process in their
+place, so memory held by parsers and LLM clients cannot build up forever.
+
+With SOLVER_BATCH_SIZE above 1 and a batch handler, a worker that leases a
+small job keeps leasing small jobs of the same kind for up to
+SOLVER_BATCH_WINDOW_MS and hands them to the batch handler together, which
+can answer them with one LLM request. Each job is still heartbeated and
+settled on its own.
+"""
+import os
+import sys
+import time
+import signal
+import threading
+import traceback
+import tracemalloc
+import multiprocessing
+from typing import Callable, Dict, List, Optional
+
+from jobQueue import JobQueue, PermanentJobError
+from memoryMonitor import MB, current_rss, top_allocations
+from solverConfig import SolverConfig
+from solverUtils import safe_print
+
+JobHandler = Callable[[dict], dict]
+# Takes the payloads of a batch and returns, in the same order, a result or the exception of each job
+BatchHandler = Callable[[List[dict]], List[object]]
+
+# Exit code of a worker that retired itself; the supervisor replaces it quietly
+RECYCLE_EXIT_CODE = 75
+# How often a worker gathering a batch looks for more small jobs
+BATCH_POLL_SECONDS = 0.05
+
+
+class _Heartbeat(threading.Thread):
+    """Renews a job lease in the background until stopped or the lease is lost"""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str, interval: float):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = threading.Event()
+        self._halt = threading.Event()
+
+    def run(self):
+        try:
+            while not self._halt.wait(self.interval):
+                try:
+                    if not self.queue.heartbeat(self.job_id, self.worker_id):
+                        self.lost.set()
+                        return
+                except Exception as e:
+                    safe_print(f"[WORKER] Heartbeat failed for job {self.job_id}: {e}")
+        finally:
+            # The queue hands out one connection per thread; release this thread's
+            self.queue.close()
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def _is_small(job: dict, config: SolverConfig) -> bool:
+    return 0 < (job.get("cost") or 0) <= config.batch_max_cost_seconds
+
+
+def gather_batch(queue: JobQueue, worker_id: str, first: dict, config: SolverConfig) -> List[dict]:
+    """The first job plus small jobs of its kind leased within the batch window"""
+    jobs = [first]
+    if config.batch_size <= 1 or not _is_small(first, config):
+        return jobs
+    until = time.monotonic() + config.batch_window_ms / 1000.0
+    while len(jobs) < config.batch_size:
+        job = queue.lease(worker_id, kinds=[first["kind"]], limits=config.lease_limits,
+                          max_cost=config.batch_max_cost_seconds)
+        if job is not None:
+            jobs.append(job)
+            continue
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(BATCH_POLL_SECONDS, remaining))
+    return jobs
+
+
+def _settle(queue: JobQueue, worker_id: str, job: dict, heartbeat: _Heartbeat, outcome):
+    """Ack a job with its result, or fail it with the exception it raised"""
+    heartbeat.stop()
+    job_id = job["id"]
+    if isinstance(outcome, PermanentJobError):
+        queue.fail(job_id, worker_id, str(outcome), retry=False)
+        safe_print(f"[WORKER {worker_id}] Job {job_id} dead-lettered: {outcome}")
+    elif isinstance(outcome, BaseException):
+        status = queue.fail(job_id, worker_id, f"{type(outcome).__name__}: {outcome}")
+        safe_print(f"[WORKER {worker_id}] Job {job_id} failed ({status}): {outcome}")
+        traceback.print_exception(type(outcome), outcome, outcome.__traceback__, file=sys.stderr)
+    elif heartbeat.lost.is_set():
+        safe_print(f"[WORKER {worker_id}] Lease on job {job_id} was lost, discarding result")
+    elif queue.ack(job_id, worker_id, outcome):
+        safe_print(f"[WORKER {worker_id}] Job {job_id} completed")
+
+
+def run_one_job(queue: JobQueue, worker_id: str, handler: JobHandler, config: SolverConfig,
+                kinds=None, batch_handler: Optional[BatchHandler] = None) -> int:
+    """Lease, run and settle the next job, or a batch of small ones; returns how many jobs ran"""
+    job = queue.lease(worker_id, kinds=kinds, limits=config.lease_limits)
+    if job is None:
+        return 0
+    jobs = gather_batch(queue, worker_id, job, config) if batch_handler is not None else [job]
+
+    heartbeats = []
+    for job in jobs:
+        safe_print(f"[WORKER {worker_id}] Running job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+        heartbeat = _Heartbeat(queue, job["id"], worker_id, config.heartbeat_seconds)
+        heartbeat.start()
+        heartbeats.append(heartbeat)
+    if len(jobs) > 1:
+        safe_print(f"[WORKER {worker_id}] Batched {len(jobs)} small jobs")
+    try:
+        if len(jobs) == 1:
+            outcomes = [handler(jobs[0]["payload"])]
+        else:
+            outcomes = batch_handler([job["payload"] for job in jobs])
+            if len(outcomes) != len(jobs):
+                raise RuntimeError(f"Batch handler returned {len(outcomes)} outcomes for {len(jobs)} jobs")
+    except Exception as e:
+        outcomes = [e] * len(jobs)
+    for job, heartbeat, outcome in zip(jobs, heartbeats, outcomes):
+        _settle(queue, worker_id, job, heartbeat, outcome)
+    return len(jobs)
+
+
+def recycle_reason(jobs_done: int, config: SolverConfig) -> Optional[str]:
+    """Why this worker should be replaced now, or None"""
+    if config.worker_max_jobs > 0 and jobs_done >= config.worker_max_jobs:
+        return f"ran {jobs_done} jobs"
+    if config.worker_max_rss_mb > 0:
+        rss = current_rss()
+        if rss is not None and rss > config.worker_max_rss_mb * MB:
+            return f"RSS {rss / MB:.0f} MB above {config.worker_max_rss_mb} MB"
+    return None
+
+
+def worker_main(worker_id: str, handler: JobHandler, config: SolverConfig, stop_event,
+                batch_handler: Optional[BatchHandler] = None):
+    """Entry point of a worker process"""
+    # The supervisor owns shutdown; workers finish the job in hand and then exit
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if config.trace_memory:
+        tracemalloc.start()
+    queue = JobQueue.from_config(config)
+    safe_print(f"[WORKER {worker_id}] Started (pid {os.getpid()})")
+    jobs_done = 0
+    reason = None
+    while not stop_event.is_set():
+        ran = run_one_job(queue, worker_id, handler, config, batch_handler=batch_handler)
+        if not ran:
+            stop_event.wait(config.poll_seconds)
+            continue
+        jobs_done += ran
+        # Checked only between jobs, so the job in hand is always finished first
+        reason = recycle_reason(jobs_done, config)
+        if reason:
+            break
+    queue.close()
+    if reason:
+        safe_print(f"[WORKER {worker_id}] Recycling: {reason}. Top allocations:")
+        for line in top_allocations():
+            safe_print(f"[WORKER {worker_id}]   {line}")
+        sys.exit(RECYCLE_EXIT_CODE)
+    safe_print(f"[WORKER {worker_id}] Stopped")
+
+
+class WorkerPool:
+    """Keeps config.workers solver processes running until stopped"""
+
+    def __init__(self, handler: JobHandler, config: Optional[SolverConfig] = None,
+                 batch_handler: Optional[BatchHandler] = None):
+        self.handler = handler
+        self.batch_handler = batch_handler
+        self.config = config or SolverConfig.from_env()
+        self.stop_event = multiprocessing.Event()
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self._spawned = 0
+
+    def _spawn(self, slot: int):
+        self._spawned += 1
+        worker_id = f"{os.getpid()}-{slot}-{self._spawned}"
+        process = multiprocessing.Process(
+            target=worker_main,
+            args=(worker_id, self.handler, self.config, self.stop_event, self.batch_handler),
+            name=f"solver-worker-{slot}",
+        )
+        process.start()
+        self.processes[slot] = process
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+    def run(self):
+        # Create the database (and WAL file) once before the workers race for it
+        JobQueue.from_config(self.config).close()
+        signal.signal(signal.SIGTERM, self.stop)
+        safe_print(f"[POOL] Starting {self.config.workers} workers on {self.config.queue_path}")
+        for slot in range(self.config.workers):
+            self._spawn(slot)
+        try:
+            while not self.stop_event.is_set():
+                for slot, process in list(self.processes.items()):
+                    if not process.is_alive():
+                        if process.exitcode == RECYCLE_EXIT_CODE:
+                            safe_print(f"[POOL] Worker {process.name} recycled, starting a fresh one")
+                        else:
+                            safe_print(f"[POOL] Worker {process.name} exited with code {process.exitcode}, restarting")
+                        self._spawn(slot)
+                time.sleep(self.config.poll_seconds)
+        except KeyboardInterrupt:
+            self.stop()
+        safe_print("[POOL] Draining workers...")
+        for process in self.processes.values():
+            process.join()
+        safe_print("[POOL] All workers stopped")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Append-only ledger of LLM calls: tokens and time by course, user and model.
+
+Every request sent to the LLM adds a row, with the token counts from the
+response's usage metadata. That covers whole assignments, question batches
+and batched small jobs, the hedged duplicate of a slow call, and a call
+made again after a failure. A call that served several batched jobs adds
+one row per job, with tokens and time split evenly between them. Rows are
+never updated, so the ledger doubles as an audit trail, and the reports are
+plain GROUP BY queries.
+
+    python usageLedger.py report [--by course,user,model,day] [--since 2026-10-01] [--until 2026-10-31] [--json]
+    python usageLedger.py top [--limit 20]    # the most expensive assignments
+
+--ledger reads another ledger file, such as the hackathon CLI's data/usage.sqlite.
+"""
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from solverConfig import SolverConfig
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at REAL NOT NULL,
+    day TEXT NOT NULL,
+    course_id TEXT,
+    course_work_id TEXT,
+    user_id TEXT,
+    solution_id TEXT,
+    source TEXT NOT NULL,
+    purpose TEXT NOT NULL,
+    model TEXT,
+    attempt TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    seconds REAL NOT NULL,
+    share REAL NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS llm_calls_day ON llm_calls (day);
+"""
+
+# Report dimensions and the columns behind them
+GROUPS = {
+    "course": "course_id",
+    "assignment": "course_work_id",
+    "user": "user_id",
+    "solution": "solution_id",
+    "model": "model",
+    "day": "day",
+    "source": "source",
+    "purpose": "purpose",
+    "outcome": "outcome",
+}
+
+
+def usage_of(message, model: Optional[str] = None) -> dict:
+    """Token counts and model name from a chat model's reply; counts are None when not reported"""
+    meta = getattr(message, "usage_metadata", None) or {}
+    response = getattr(message, "response_metadata", None) or {}
+    if meta:
+        tokens = (meta.get("input_tokens"), meta.get("output_tokens"))
+    else:
+        # Older langchain-google-genai only passes Gemini's own field names through
+        raw = response.get("usage_metadata") or {}
+        tokens = (raw.get("prompt_token_count"), raw.get("candidates_token_count"))
+    model = response.get("model_name") or model
+    if model and model.startswith("models/"):
+        model = model[len("models/"):]
+    return {"inputTokens": tokens[0], "outputTokens": tokens[1], "model": model}
+
+
+class MeteredRunnable:
+    """
+    Wraps a runnable so every ainvoke reports (attempt, outcome, reply, seconds).
+    deadlines.invoke_with_deadline may call it twice when it hedges; the second
+    call is the "hedge" attempt, and whichever loses is reported as cancelled.
+    """
+
+    def __init__(self, runnable, report: Callable[[str, str, object, float], None]):
+        self.runnable = runnable
+        self.report = report
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        attempt = "primary" if self.calls == 0 else "hedge"
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            reply = await self.runnable.ainvoke(inputs)
+        except asyncio.CancelledError:
+            self.report(attempt, "cancelled", None, time.monotonic() - started)
+            raise
+        except Exception:
+            self.report(attempt, "error", None, time.monotonic() - started)
+            raise
+        self.report(attempt, "ok", reply, time.monotonic() - started)
+        return reply
+
+
+def _split(value: Optional[int], parts: int) -> List[Optional[int]]:
+    """value split into parts integers that add up to it; the first part takes the remainder"""
+    if value is None:
+        return [None] * parts
+    share, remainder = divmod(int(value), parts)
+    return [share + remainder] + [share] * (parts - 1)
+
+
+class UsageLedger:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: SolverConfig) -> "UsageLedger":
+        return cls(config.usage_ledger_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, call: dict, contexts: Iterable[dict], at: Optional[float] = None):
+        """
+        Add one LLM call: call has purpose, attempt, outcome, seconds and the
+        usage_of() fields; contexts are the jobs it served (courseId,
+        courseWorkId, userId, solutionId, source).
+        """
+        contexts = list(contexts) or [{}]
+        at = time.time() if at is None else at
+        day = time.strftime("%Y-%m-%d", time.gmtime(at))
+        count = len(contexts)
+        inputs = _split(call.get("inputTokens"), count)
+        outputs = _split(call.get("outputTokens"), count)
+        rows = [
+            (at, day, context.get("courseId"), context.get("courseWorkId"), context.get("userId"),
+             context.get("solutionId"), context.get("source") or "solve", call["purpose"], call.get("model"),
+             call.get("attempt", "primary"), call["outcome"], inputs[i], outputs[i],
+             round(call["seconds"] / count, 3), round(1 / count, 4))
+            for i, context in enumerate(contexts)
+        ]
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO llm_calls (at, day, course_id, course_work_id, user_id, solution_id, source, purpose, "
+            "model, attempt, outcome, input_tokens, output_tokens, seconds, share) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+
+    def report(self, by: Iterable[str] = ("course",), since: Optional[str] = None,
+               until: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Totals grouped by the given GROUPS keys, most tokens first; since/until are inclusive YYYY-MM-DD days"""
+        by = list(by)
+        unknown = [key for key in by if key not in GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown report grouping {unknown}; choose from {sorted(GROUPS)}")
+        columns = "".join(f"{GROUPS[key]} AS {key}, " for key in by)
+        where, params = [], []
+        if since:
+            where.append("day >= ?")
+            params.append(since)
+        if until:
+            where.append("day <= ?")
+            params.append(until)
+        sql = (
+            # A batched call is spread over several rows; their shares add up to one call
+            f"SELECT {columns}ROUND(SUM(share), 2) AS calls, ROUND(SUM((outcome != 'ok') * share), 2) AS failed, "
+            "COALESCE(SUM(input_tokens), 0) AS input_tokens, COALESCE(SUM(output_tokens), 0) AS output_tokens, "
+            "ROUND(SUM((input_tokens IS NULL AND outcome = 'ok') * share), 2) AS unmetered, ROUND(SUM(seconds), 3) AS seconds "
+            "FROM llm_calls"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if by:
+            sql += " GROUP BY " + ", ".join(GROUPS[key] for key in by)
+        sql += " ORDER BY COALESCE(SUM(input_tokens), 0) + COALESCE(SUM(output_tokens), 0) DESC, SUM(seconds) DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+
+def _print_table(rows: List[dict]):
+    if not rows:
+        print("No LLM calls recorded.")
+        return
+    headers = list(rows[0])
+    cells = [["-" if row[h] is None else str(row[h]) for h in headers] for row in rows]
+    widths = [max(len(h), *(len(line[i]) for line in cells)) for i, h in enumerate(headers)]
+    for line in [headers] + cells:
+        print("  ".join(cell.ljust(w) for cell, w in zip(line, widths)).rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report LLM token and time usage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="totals grouped by course, user, model, day, ...")
+    report.add_argument("--by", default="course",
+                        help=f"comma-separated groupings from: {', '.join(GROUPS)} (default: course)")
+    top = sub.add_parser("top", help="the most expensive assignments")
+    top.add_argument("--limit", type=int, default=20)
+    for command in (report, top):
+        command.add_argument("--since", help="first day to include, YYYY-MM-DD (UTC)")
+        command.add_argument("--until", help="last day to include, YYYY-MM-DD (UTC)")
+        command.add_argument("--json", action="store_true", help="print JSON instead of a table")
+        command.add_argument("--ledger", default=None, help="ledger file (default: SOLVER_DATA_DIR/usage.sqlite)")
+    args = parser.parse_args()
+
+    ledger = UsageLedger(args.ledger) if args.ledger else UsageLedger.from_config(SolverConfig.from_env())
+    if args.command == "report":
+        by = [key.strip() for key in args.by.split(",") if key.strip()]
+        try:
+            rows = ledger.report(by, since=args.since, until=args.until)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        rows = ledger.report(("course", "assignment"), since=args.since, until=args.until, limit=args.limit)
+
+    if args.json:
+        print(json.dumps({"success": True, "rows": rows}))
+    else:
+        _print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from artifactStore import ArtifactStore
+
+def test_artifact_store():
+    """Test dedupe, compression and range reads of stored artifacts"""
+    print("Testing artifact store...")
+
+    text = "1. Solution\n" + "F = m * a = 98 N\n" * 5000
+    pdf = b"%PDF-1.4\n" + os.urandom(200000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtifactStore(tmp)
+
+        first = store.put_text(text)
+        again = store.put_text(text, compression=None)
+        assert first["ref"] == again["ref"] and again["deduplicated"]
+        assert first["encoding"] == "zlib" and first["storedSize"] < first["size"] / 10
+        assert store.get_text(first["ref"]) == text
+        assert store.read_range(first["ref"], 12, 29) == text.encode()[12:29]
+
+        ref = store.put(pdf, media_type="application/pdf")
+        assert ref["encoding"] == "identity" and ref["size"] == len(pdf)
+        digest = ref["ref"].split(":")[1]
+        assert os.path.exists(os.path.join(tmp, digest[:2], digest[2:4], digest))
+        assert store.read_range(ref["ref"], 100000, 100010) == pdf[100000:100010]
+        assert b"".join(store.iter_range(ref["ref"], chunk_size=4096)) == pdf
+
+    print("✅ Artifact store works")
+
+if __name__ == "__main__":
+    test_artifact_store()
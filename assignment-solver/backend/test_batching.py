@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from assignmentSolver import AssignmentSolver, split_batch_reply
+from jobQueue import JobQueue, DONE, PENDING
+from solverConfig import SolverConfig
+from solverWorkers import run_one_job
+
+def test_batched_reply_is_split_and_validated():
+    """Test that a batched reply is split per assignment and bad sections are dropped"""
+    print("Testing batched reply splitting...")
+    reply = ("### ASSIGNMENT 1\n1. x = 4 because 2 + 2 = 4\n\n"
+             "### ASSIGNMENT 2\nok\n\n"
+             "### ASSIGNMENT 3\n1. The derivative of x^2 is 2x\n\n"
+             "### ASSIGNMENT 3\n1. Something else entirely\n")
+    # 2 is too short to be a solution, 3 appears twice, 4 is missing
+    assert list(split_batch_reply(reply, 4)) == [1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        solver = AssignmentSolver("dummy_key", config=SolverConfig(data_dir=tmp))
+        sent = {}
+        def fake_invoke(chain, inputs, **kwargs):
+            sent.update(inputs)
+            return SimpleNamespace(content="### ASSIGNMENT 1\nSolution to the first one.\n"
+                                           "### ASSIGNMENT 2\nSolution to the second one.\n")
+        solver._invoke_llm = fake_invoke
+        solutions = solver.solve_assignments_batch(["1. What is 2 + 2?", "1. Differentiate x^2"])
+    assert sent["count"] == 2 and "<<<ASSIGNMENT 2>>>\n1. Differentiate x^2" in sent["assignments"]
+    assert solutions == {1: "Solution to the first one.", 2: "Solution to the second one."}
+    print("✅ Batched reply splitting works")
+
+def test_worker_batches_small_jobs():
+    """Test that a worker leases small jobs together and settles each one on its own"""
+    print("Testing worker batching...")
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SolverConfig(data_dir=tmp, batch_size=4, batch_window_ms=50, batch_max_cost_seconds=15)
+        queue = JobQueue(config.queue_path)
+        for job_id, cost in (("quiz-1", 5), ("quiz-2", 6), ("quiz-3", 7), ("lab", 60)):
+            queue.enqueue(job_id, {"name": job_id}, cost=cost)
+
+        batches = []
+        def batch_handler(payloads):
+            batches.append([p["name"] for p in payloads])
+            return [{"answer": 1}, ValueError("section missing and solo retry failed"), {"answer": 3}]
+        def handler(payload):
+            return {"answer": payload["name"]}
+
+        assert run_one_job(queue, "worker-a", handler, config, batch_handler=batch_handler) == 3
+        assert batches == [["quiz-1", "quiz-2", "quiz-3"]]
+        assert queue.get("quiz-1")["status"] == DONE and queue.get("quiz-3")["result"] == {"answer": 3}
+        assert queue.get("quiz-2")["status"] == PENDING and "ValueError" in queue.get("quiz-2")["last_error"]
+
+        # Large jobs are never batched
+        assert run_one_job(queue, "worker-a", handler, config, batch_handler=batch_handler) == 1
+        assert queue.get("lab")["result"] == {"answer": "lab"} and len(batches) == 1
+        queue.close()
+    print("✅ Worker batching works")
+
+if __name__ == "__main__":
+    test_batched_reply_is_split_and_validated()
+    test_worker_batches_small_jobs()
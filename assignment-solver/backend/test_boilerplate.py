@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from boilerplate import BoilerplateFilter
+
+def test_boilerplate_filter():
+    """Test that repeated headers are kept once, page numbers go and numbered content stays"""
+    print("Testing boilerplate stripping...")
+
+    pages = [
+        f"CS101 Data Structures - Fall 2024\nDept. of Computer Science\n\n"
+        f"Question {i}: Explain concept {i} in detail.\nShow your working.\n\n\n\n- {i} -\n"
+        for i in range(1, 7)
+    ]
+    stripped = BoilerplateFilter(pages)
+    cleaned = list(stripped)
+
+    assert len(cleaned) == len(pages)
+    assert cleaned[0] == ("CS101 Data Structures - Fall 2024\nDept. of Computer Science\n\n"
+                          "Question 1: Explain concept 1 in detail.\nShow your working.")
+    assert cleaned[2] == "Question 3: Explain concept 3 in detail."
+    assert stripped.lines_removed == 1 + 4 * (len(pages) - 1)
+    assert stripped.chars_removed > sum(len(p) for p in pages) / 2
+
+    # A lone page has nothing to compare against: only its page number goes
+    single = list(BoilerplateFilter(["Course Header\nSolve for x.\nPage 1 of 1"]))
+    assert single == ["Course Header\nSolve for x."]
+
+    print("✅ Boilerplate stripping works")
+
+def test_numeric_content_is_kept():
+    """Test that numbers ending a page are kept unless they count up with the pages"""
+    print("Testing numeric edge lines...")
+
+    # A year, a lone answer and a list marker at the page edge are content, not page numbers
+    single = list(BoilerplateFilter(["Founded in\n2020", "What is 6 x 7?\n42", "Steps:\n3)"]))
+    assert single == ["Founded in\n2020", "What is 6 x 7?\n42", "Steps:\n3)"]
+    assert list(BoilerplateFilter(["Course Header\nSolve for x.\n42"])) == ["Course Header\nSolve for x.\n42"]
+
+    # Bare numbers that count up at the bottom are page numbers; an answer equal to another page's number is not
+    pages = [f"Question {i}: compute the sum.\n{i + 1}" for i in range(1, 5)] + ["Answer:\n2"]
+    cleaned = list(BoilerplateFilter(pages))
+    assert cleaned[:4] == [f"Question {i}: compute the sum." for i in range(1, 5)]
+    assert cleaned[4] == "Answer:\n2"
+
+    print("✅ Numeric edge lines work")
+
+if __name__ == "__main__":
+    test_boilerplate_filter()
+    test_numeric_content_is_kept()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+import courseIndex
+from courseIndex import CourseIndex, split_passages
+
+THERMO = """The first law of thermodynamics states that energy is conserved.
+
+Heat added to a system equals the change in internal energy plus the work done by the system."""
+
+GRAPHS = """A graph is a set of vertices joined by edges.
+
+Breadth first search visits vertices in order of their distance from the source."""
+
+SORTING = """Merge sort splits the array in half, sorts both halves and merges them.
+
+Quick sort partitions the array around a pivot."""
+
+def test_search_and_incremental_updates():
+    """Test ranking, skipping unchanged revisions and replacing edited documents"""
+    print("Testing course index search...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = CourseIndex.for_course(tmp, "course/42")
+        assert index.add_documents([("f1", "r1", "Thermo notes", THERMO), ("f2", "r1", "Graph notes", GRAPHS)]) > 0
+        index.add_documents([("f3", "r1", "Sorting notes", SORTING)])
+
+        hits = index.search("What does the first law of thermodynamics say about energy?", k=2)
+        assert hits and hits[0]["doc"] == "f1" and "conserved" in hits[0]["text"]
+        assert index.search("breadth first search over a graph", k=1)[0]["doc"] == "f2"
+        assert index.search("pivot partition", k=1)[0]["title"] == "Sorting notes"
+        assert index.search("completely unrelated zebra") == []
+
+        # Same revision: nothing re-indexed
+        assert index.has("f1", "r1") and index.add_documents([("f1", "r1", "Thermo notes", THERMO)]) == 0
+
+        # New revision replaces the old passages
+        index.add_documents([("f2", "r2", "Graph notes", "Dijkstra finds shortest paths with a priority queue.")])
+        assert all(hit["doc"] != "f2" for hit in index.search("breadth first search vertices"))
+        assert index.search("dijkstra shortest paths", k=1)[0]["doc"] == "f2"
+
+        # Reopening reads the persisted segments
+        reopened = CourseIndex.for_course(tmp, "course/42")
+        assert reopened.has("f2", "r2") and not reopened.has("f2", "r1")
+        assert reopened.search("dijkstra", k=1)[0]["doc"] == "f2"
+    print("✅ Course index search works")
+
+def test_compaction_keeps_results():
+    """Test that merging segments and dropping tombstones does not change search results"""
+    print("Testing course index compaction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = CourseIndex.for_course(tmp, "c1")
+        for i in range(courseIndex.MAX_SEGMENTS):
+            index.add_documents([(f"doc{i}", "r1", f"Week {i}", f"Lecture {i} covers topic{i} in depth.\n\n{SORTING}")])
+        before = index.search("topic3 lecture", k=3)
+        assert before[0]["doc"] == "doc3"
+        index.compact()
+        assert index.stats()["segments"] == 1
+        after = index.search("topic3 lecture", k=3)
+        # Other lectures tie on "lecture", so only the scores are compared past the top hit
+        assert after[0] == before[0] and [h["score"] for h in after] == [h["score"] for h in before]
+        assert len(os.listdir(index.directory)) == 8  # one segment's six files, manifest and vocabulary
+
+        long_text = " ".join(f"Sentence number {i} about recursion." for i in range(200))
+        passages = split_passages(long_text)
+        assert len(passages) > 1 and all(len(p) <= courseIndex.PASSAGE_CHARS * 2 for p in passages)
+    print("✅ Course index compaction works")
+
+if __name__ == "__main__":
+    test_search_and_incremental_updates()
+    test_compaction_keeps_results()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import time
+import asyncio
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from assignmentSolver import AssignmentSolver
+from deadlines import DeadlineExceeded, JobDeadline, invoke_with_deadline
+from solverConfig import SolverConfig
+
+class FakeLLM:
+    """Async runnable answering after a scripted delay per call"""
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.cancelled = 0
+
+    async def ainvoke(self, inputs):
+        delay = self.delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+            return f"answered after {delay}s"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+def test_hedged_call_wins_and_cancels_loser():
+    """Test that a slow call is hedged and the losing request is cancelled"""
+    print("Testing hedged LLM calls...")
+    llm = FakeLLM([5.0, 0.1])
+    started = time.monotonic()
+    result, hedged, winner = invoke_with_deadline(llm, {}, JobDeadline(30), hedge_after=0.2)
+    assert result == "answered after 0.1s" and hedged and winner == "hedge"
+    assert llm.cancelled == 1 and time.monotonic() - started < 1.0
+    print("✅ Hedged calls work")
+
+def test_stage_deadline_cancels_call():
+    """Test that a call outliving its stage budget is cancelled"""
+    print("Testing stage deadlines...")
+    llm = FakeLLM([5.0])
+    deadline = JobDeadline(10, shares={"solve": 0.03})
+    try:
+        with deadline.stage("solve"):
+            invoke_with_deadline(llm, {}, deadline)
+        assert False, "deadline should have been exceeded"
+    except DeadlineExceeded:
+        pass
+    assert llm.cancelled == 1 and deadline.cancel.cancelled
+    assert deadline.report()["stages"]["solve"]["seconds"] < 1.0
+    print("✅ Stage deadlines work")
+
+def test_latency_learned_from_single_calls():
+    """Test that only hedged whole-assignment calls feed the latency history"""
+    print("Testing latency history sampling...")
+    with tempfile.TemporaryDirectory() as tmp:
+        solver = AssignmentSolver("dummy_key", config=SolverConfig(data_dir=tmp, hedge_llm=False))
+        solver._invoke_llm(FakeLLM([0]), {})
+        assert solver.latency.load() == []
+
+        solver.config.hedge_llm = True
+        solver._invoke_llm(FakeLLM([0]), {}, purpose="batch", contexts=[{}, {}])
+        solver._invoke_llm(FakeLLM([0]), {}, purpose="questions")
+        assert solver.latency.load() == []
+        solver._invoke_llm(FakeLLM([0]), {})
+        assert len(solver.latency.load()) == 1
+    print("✅ Latency history sampling works")
+
+if __name__ == "__main__":
+    test_hedged_call_wins_and_cancels_loser()
+    test_stage_deadline_cancels_call()
+    test_latency_learned_from_single_calls()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import tempfile
+import textwrap
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from assignmentSolver import AssignmentSolver
+from duplicateText import DuplicateFilter, hamming, simhash
+from extractors import PageStream
+from solverConfig import SolverConfig
+
+PARAGRAPHS = [
+    f"Problem {n}. A ball of mass {n} kg is dropped from a height of {10 * n} metres onto a "
+    f"concrete floor. Ignoring air resistance, find its speed just before impact and the "
+    f"time it takes to fall, showing every step of your working."
+    for n in range(1, 9)
+]
+
+def handout_docx():
+    return ["\n\n".join(PARAGRAPHS)]
+
+def handout_pdf():
+    # Same text with PDF line breaks, split over two pages
+    wrapped = [textwrap.fill(p, 70) for p in PARAGRAPHS]
+    return ["\n\n".join(wrapped[:4]), "\n\n".join(wrapped[4:])]
+
+def test_simhash_near_duplicates():
+    """Test that re-wrapped or lightly edited text stays within a few bits"""
+    print("Testing SimHash fingerprints...")
+    text = " ".join(PARAGRAPHS)
+    assert simhash(text) == simhash(textwrap.fill(text.upper(), 50))
+    assert hamming(simhash(text), simhash(text.replace("concrete", "wooden", 1))) <= 3
+    assert hamming(simhash(PARAGRAPHS[0]), simhash("An essay on the causes of the First World War.")) > 10
+    print("✅ SimHash fingerprints work")
+
+def test_duplicate_paragraphs_and_files():
+    """Test that repeated paragraphs and copied attachments are dropped, short lines kept"""
+    print("Testing duplicate filter...")
+    duplicates = DuplicateFilter()
+    first = [duplicates.clean(page) for page in handout_docx()]
+    assert first == handout_docx() and duplicates.end_file("Handout.docx") is None
+
+    extra = "Answer:\n\n" + PARAGRAPHS[2] + "\n\nBonus: derive the same result using conservation of energy for each ball above."
+    page = duplicates.clean(extra)
+    assert page.startswith("Answer:\n\nBonus:") and duplicates.paragraphs_removed == 1
+    assert duplicates.end_file("Extra.pdf") is None
+
+    for page in handout_pdf():
+        duplicates.clean(page)
+    assert duplicates.end_file("Handout.pdf") == "Handout.docx"
+    print("✅ Duplicate filter works")
+
+def test_changed_constants_are_kept():
+    """Test that attachments differing only in a constant keep both versions"""
+    print("Testing changed constants...")
+    duplicates = DuplicateFilter()
+    duplicates.clean(handout_docx()[0])
+    assert duplicates.end_file("Set A.docx") is None
+
+    # The same handout with one mass changed: that problem must reach the solver again
+    changed = PARAGRAPHS[2].replace("mass 3 kg", "mass 12 kg")
+    assert changed != PARAGRAPHS[2]
+    page = duplicates.clean("\n\n".join(PARAGRAPHS[:2] + [changed] + PARAGRAPHS[3:]))
+    assert page == changed and duplicates.paragraphs_removed == 7
+    assert duplicates.end_file("Set B.docx") is None and duplicates.files_removed == 0
+
+    # An operator counts as much as a number
+    minus = PARAGRAPHS[4].replace("kg is", "kg, with x - 2 kg added,")
+    plus = minus.replace("x - 2", "x + 2")
+    assert duplicates.clean(minus) == minus
+    duplicates.end_file("Set C.docx")
+    assert duplicates.clean(plus) == plus and duplicates.clean(minus) == ""
+    print("✅ Changed constants are kept")
+
+def test_solver_reports_duplicates():
+    """Test that a copied attachment costs no budget and is reported"""
+    print("Testing duplicate removal in extraction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        solver = AssignmentSolver("dummy_key", config=SolverConfig(data_dir=tmp))
+        files = {"a": handout_docx(), "b": handout_pdf()}
+        solver._open_drive_file = lambda token, file_id: PageStream(files[file_id], total=len(files[file_id]))
+        materials = [{"driveFile": {"driveFile": {"id": file_id, "title": f"Handout {file_id}"}}} for file_id in files]
+        document = solver.extract_document("token", materials)
+
+    assert document.file_text(0) == "\n\n".join(PARAGRAPHS)
+    assert document.file_text(1) == '(Same content as "Handout a"; omitted.)'
+    assert solver.metrics["extraction"]["usedChars"] == len(document.file_text(0))
+    assert solver.metrics["extraction"]["files"][1]["duplicateOf"] == "Handout a"
+    report = solver.metrics["duplicates"]
+    assert report["filesRemoved"] == 1 and report["charsRemoved"] >= sum(len(p) for p in PARAGRAPHS)
+    print("✅ Duplicate removal in extraction works")
+
+if __name__ == "__main__":
+    test_simhash_near_duplicates()
+    test_duplicate_paragraphs_and_files()
+    test_changed_constants_are_kept()
+    test_solver_reports_duplicates()
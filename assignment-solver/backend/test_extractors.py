@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import io
+import re
+import zipfile
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from reportlab.pdfgen import canvas
+
+import pdfBackends
+from assignmentSolver import AssignmentSolver
+from extractors import ExtractionBudget, PageStream, extract_docx, find_extractor
+from pdfBackends import PypdfBackend, record_benchmark
+from solverConfig import SolverConfig
+
+DOCX_XML = ('<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            '<w:p><w:r><w:t>Question 1: define a </w:t></w:r><w:r><w:t>stack.</w:t></w:r></w:p>'
+            '<w:p><w:r><w:t>Question 2: define a queue.</w:t></w:r></w:p></w:body></w:document>')
+
+def make_pdf(pages):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for text in pages:
+        pdf.drawString(72, 720, text)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+class NamedPypdf(PypdfBackend):
+    """pypdf under another name, to see which backend the solver picked"""
+    def __init__(self, name):
+        self.name = name
+
+def make_docx():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", DOCX_XML)
+    return buffer.getvalue()
+
+class BlobHttp:
+    """Serves byte ranges of blob"""
+    def __init__(self, blob):
+        self.blob = blob
+
+    def request(self, uri, method="GET", headers=None):
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", headers["Range"]).groups())
+        chunk = self.blob[start:end + 1]
+        resp = type("Resp", (dict,), {})({"content-range": f"bytes {start}-{start + len(chunk) - 1}/{len(self.blob)}"})
+        resp.status = 206
+        return resp, chunk
+
+class FakeRequest:
+    def __init__(self, blob, uri):
+        self.http = BlobHttp(blob)
+        self.uri = uri
+
+def call(result):
+    return type("Call", (), {"execute": lambda self: result})()
+
+class FakeDrive:
+    """Drive files by id as (mimeType, bytes), recording whether each was downloaded or exported"""
+    def __init__(self, files):
+        self.files_by_id = files
+        self.requests = []
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields):
+        return call({"id": fileId, "mimeType": self.files_by_id[fileId][0], "md5Checksum": "v1"})
+
+    def get_media(self, fileId):
+        self.requests.append((fileId, "download"))
+        return FakeRequest(self.files_by_id[fileId][1], f"https://drive/{fileId}?alt=media")
+
+    def export_media(self, fileId, mimeType):
+        self.requests.append((fileId, f"export {mimeType}"))
+        return FakeRequest(self.files_by_id[fileId][1], f"https://drive/{fileId}/export")
+
+def test_dispatch_by_mime_type():
+    """Test that each mime type reaches its extractor and native Google files are exported"""
+    print("Testing extractor dispatch...")
+    names = {mime: find_extractor(mime).name for mime in (
+        "application/pdf", "text/plain", "text/x-python", "text/csv",
+        "application/vnd.google-apps.document", "application/vnd.google-apps.spreadsheet",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document")}
+    assert names == {"application/pdf": "pdf", "text/plain": "text", "text/x-python": "text", "text/csv": "csv",
+                     "application/vnd.google-apps.document": "google-docs",
+                     "application/vnd.google-apps.spreadsheet": "google-sheets",
+                     "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx"}
+    assert find_extractor("image/png") is None
+    assert find_extractor("application/vnd.google-apps.spreadsheet").export_mime == "text/csv"
+    assert find_extractor("application/pdf").export_mime is None
+    assert extract_docx(make_docx(), SolverConfig()).text() == "Question 1: define a stack.\nQuestion 2: define a queue."
+
+    with tempfile.TemporaryDirectory() as tmp:
+        solver = AssignmentSolver("dummy_key", config=SolverConfig(data_dir=tmp))
+        drive = FakeDrive({
+            "doc": ("application/vnd.google-apps.document", b"\xef\xbb\xbfQuestion 1: define a tree."),
+            "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", make_docx()),
+            "photo": ("image/png", b"\x89PNG"),
+        })
+        solver._build_drive = lambda token: drive
+        assert solver._open_drive_file("token", "doc").text() == "Question 1: define a tree."
+        assert solver._open_drive_file("token", "docx").text().startswith("Question 1: define a stack.")
+        # Unsupported files are skipped before anything is downloaded
+        assert solver._open_drive_file("token", "photo") is None
+        assert drive.requests == [("doc", "export text/plain"), ("docx", "download")]
+        assert solver.cacheable
+    print("✅ Extractor dispatch works")
+
+def test_budget_stops_extraction():
+    """Test that pages past the prompt budget are never parsed and later files never opened"""
+    print("Testing extraction budget...")
+    budget = ExtractionBudget(10)
+    assert budget.take("abcdef") == "abcdef" and budget.take("ghijkl") == "ghij" and budget.exhausted
+    budget.refund(6)
+    assert not budget.exhausted and budget.take("x" * 20) == "x" * 6
+    unlimited = ExtractionBudget(0)
+    assert unlimited.take("y" * 1000) == "y" * 1000 and not unlimited.exhausted
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SolverConfig(data_dir=tmp, prompt_budget_chars=250, dedupe=False, strip_boilerplate=False)
+        solver = AssignmentSolver("dummy_key", config=config)
+        parsed, opened = [], []
+
+        def open_file(token, file_id):
+            opened.append(file_id)
+            def pages():
+                for n in range(1, 6):
+                    parsed.append((file_id, n))
+                    yield f"{file_id} page {n}: " + "x" * 90
+            return PageStream(pages(), total=5, paged=True)
+
+        solver._open_drive_file = open_file
+        materials = [{"driveFile": {"driveFile": {"id": file_id, "title": f"{file_id}.pdf"}}} for file_id in ("a", "b")]
+        solver.extract_document("token", materials)
+        assert opened == ["a"] and parsed == [("a", 1), ("a", 2), ("a", 3)]
+        extraction = solver.metrics["extraction"]
+        assert extraction["usedChars"] == 250 and extraction["filesSkipped"] == ["b.pdf"]
+        assert (extraction["files"][0]["pagesRead"], extraction["files"][0]["pagesSkipped"]) == (3, 2)
+    print("✅ Extraction budget works")
+
+def test_solver_config_reaches_extractors():
+    """Test that the solver's own config, not the environment, picks the PDF backend"""
+    print("Testing extractor config...")
+    pdfBackends.BACKENDS.update({"first": NamedPypdf("first"), "second": NamedPypdf("second")})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            drive = FakeDrive({"pdf": ("application/pdf", make_pdf(["Question 1: define a heap"]))})
+            def opened_with(config):
+                solver = AssignmentSolver("dummy_key", config=config)
+                solver._build_drive = lambda token: drive
+                pages = solver._open_drive_file("token", "pdf")
+                assert [p.strip() for p in pages] == ["Question 1: define a heap"]
+                return pages.info["backend"]
+
+            assert opened_with(SolverConfig(data_dir=tmp, pdf_backend="second")) == "second"
+            # auto reads the benchmark kept in the configured data dir
+            record_benchmark(SolverConfig(data_dir=tmp).pdf_benchmark_path, {"first": 0.001, "pypdf": 0.5})
+            assert opened_with(SolverConfig(data_dir=tmp, pdf_backend="auto")) == "first"
+    finally:
+        del pdfBackends.BACKENDS["first"], pdfBackends.BACKENDS["second"]
+    print("✅ Extractor config works")
+
+if __name__ == "__main__":
+    test_dispatch_by_mime_type()
+    test_budget_stops_extraction()
+    test_solver_config_reaches_extractors()
@@ -3,6 +3,7 @@
 import sys
 import os
 import json
+import tempfile
 sys.path.append(os.path.dirname(__file__))
 
 def test_full_assignment_solving():
@@ -34,10 +35,13 @@ Problem Statement: Write a Java program that calculates the resultant force from
     
     try:
         from services.assignmentSolver import AssignmentSolver
+        from services.solverConfig import SolverConfig
         
         # Test with dummy API key (won't actually call LLM)
         print("📝 Creating solver instance...")
-        solver = AssignmentSolver("dummy_key_for_testing")
+        # Keep the solver's ledger and caches out of backend/data
+        data_dir = tempfile.TemporaryDirectory()
+        solver = AssignmentSolver("dummy_key_for_testing", config=SolverConfig(data_dir=data_dir.name))
         
         # Test text cleaning
         print("🧹 Testing text cleaning...")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import re
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "GDG Internal Hackathon"))
+
+import main
+
+BLOB = os.urandom(20000)
+
+class FlakyHttp:
+    """Serves byte ranges of blob, resetting the connection on the requests listed in fail_on"""
+    def __init__(self, fail_on=(), blob=BLOB):
+        self.fail_on = set(fail_on)
+        self.blob = blob
+        self.requests = 0
+
+    def request(self, uri, method="GET", headers=None):
+        self.requests += 1
+        if self.requests in self.fail_on:
+            raise ConnectionResetError("connection reset by peer")
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", headers["Range"]).groups())
+        chunk = self.blob[start:end + 1]
+        resp = type("Resp", (dict,), {})({"content-range": f"bytes {start}-{start + len(chunk) - 1}/{len(self.blob)}"})
+        resp.status = 206
+        return resp, chunk
+
+class FakeRequest:
+    def __init__(self, http, file_id="abc"):
+        self.http = http
+        self.uri = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+
+def call(result):
+    return type("Call", (), {"execute": lambda self: result})()
+
+class FakeDrive:
+    """files().get(...).execute() and files().get_media(...) for one attachment"""
+    def __init__(self, http, name="Handout.pdf", mime="application/pdf", revision="v1"):
+        self.http = http
+        self.meta = {"name": name, "mimeType": mime, "md5Checksum": revision}
+        self.lookups = 0
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields):
+        self.lookups += 1
+        return call(dict(self.meta, id=fileId))
+
+    def get_media(self, fileId):
+        return FakeRequest(self.http, fileId)
+
+def with_downloads_dir(test):
+    def run():
+        saved = main.DOWNLOADS_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            main.DOWNLOADS_DIR = Path(tmp)
+            try:
+                test(Path(tmp))
+            finally:
+                main.DOWNLOADS_DIR = saved
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+@with_downloads_dir
+def test_fetch_in_memory_retries(downloads):
+    """Test that the default (not kept) download retries and leaves nothing behind"""
+    print("Testing CLI in-memory downloads...")
+    http = FlakyHttp(fail_on={1})
+    assert main._fetch(FakeRequest(http), None, "v1") == BLOB
+    assert http.requests == 2 and list(downloads.iterdir()) == []
+    print("✅ CLI in-memory downloads work")
+
+@with_downloads_dir
+def test_kept_downloads_are_reused(downloads):
+    """Test that --keep_downloads saves by id and revision and skips unchanged files"""
+    print("Testing CLI download cache...")
+    http = FlakyHttp()
+    materials = [{"driveFile": {"driveFile": {"id": "abc", "title": "Handout.pdf"}}}]
+    files = main.download_materials_files(FakeDrive(http), materials, keep_downloads=True)
+    assert files[0].data == BLOB and files[0].suffix == ".pdf" and files[0].revision == "v1"
+    assert files[0].path == main._download_cache_path("abc", "v1", ".pdf") and files[0].path.exists()
+    fetched = http.requests
+
+    again = main.download_materials_files(FakeDrive(http), materials, keep_downloads=True)
+    assert again[0].data == BLOB and http.requests == fetched
+
+    skipped = main.download_materials_files(FakeDrive(http), materials, skip=lambda fid, rev: rev == "v1")
+    assert skipped == []
+    print("✅ CLI download cache works")
+
+class FakeClassroom:
+    """courses().courseWorkMaterials().list(...) returning one material"""
+    def __init__(self, update_time):
+        self.material = {"id": "m1", "updateTime": update_time,
+                         "materials": [{"driveFile": {"driveFile": {"id": "notes", "title": "Notes.txt"}}}]}
+
+    def courses(self):
+        return self
+
+    def courseWorkMaterials(self):
+        return self
+
+    def list(self, **kwargs):
+        return call({"courseWorkMaterial": [self.material]})
+
+@with_downloads_dir
+def test_notes_index_skips_unchanged_materials(downloads):
+    """Test that unchanged materials cost no Drive calls until the daily or forced re-check"""
+    print("Testing notes index freshness...")
+    notes = b"Newton's second law: force equals mass times acceleration, F = m * a."
+    drive = FakeDrive(FlakyHttp(blob=notes), name="Notes.txt", mime="text/plain")
+    classroom = FakeClassroom("2026-10-01T10:00:00Z")
+    index = main.CourseIndex(downloads / "index")
+
+    main.index_course_materials(classroom, drive, index, "c1", max_items=5)
+    assert drive.lookups == 1 and index.search("force mass acceleration")[0]["doc"] == "notes"
+    main.index_course_materials(classroom, drive, index, "c1", max_items=5)
+    assert drive.lookups == 1
+
+    classroom.material["updateTime"] = "2026-10-02T09:00:00Z"
+    main.index_course_materials(classroom, drive, index, "c1", max_items=5)
+    assert drive.lookups == 2 and drive.http.requests == 1
+    main.index_course_materials(classroom, drive, index, "c1", max_items=5, recheck=True)
+    assert drive.lookups == 3 and drive.http.requests == 1
+    print("✅ Notes index freshness works")
+
+def test_notes_summaries_reuse_unchanged_chunks():
+    """Test that editing notes re-summarizes only the chunks around the edit"""
+    print("Testing incremental notes summaries...")
+    calls = []
+    def fake_llm(prompt, llm, inputs, purpose):
+        calls.append(purpose)
+        return f"summary {len(calls)}"
+
+    paragraphs = [f"Topic {n}: " + " ".join(f"fact-{n}-{k}" for k in range(40)) for n in range(60)]
+    def notes(paras):
+        return main.MaterialFile("Notes.txt", "\n\n".join(paras).encode("utf-8"))
+
+    saved = main.NOTES_CACHE_DIR, main.invoke_llm
+    with tempfile.TemporaryDirectory() as tmp:
+        main.NOTES_CACHE_DIR, main.invoke_llm = Path(tmp), fake_llm
+        try:
+            chunks = len(main.chunk_note_units(paragraphs))
+            assert chunks > 3
+            first = main.summarize_notes_incremental(None, notes(paragraphs))
+            assert calls.count("notes-chunk") == chunks and calls[-1] == "notes-merge"
+
+            # Unchanged notes are served from the cache without any LLM call
+            calls.clear()
+            assert main.summarize_notes_incremental(None, notes(paragraphs)) == first and calls == []
+
+            # A paragraph inserted in the middle only touches the chunks around it
+            edited = paragraphs[:30] + ["Topic 30b: a new slide about friction and drag."] + paragraphs[30:]
+            main.summarize_notes_incremental(None, notes(edited))
+            assert 1 <= calls.count("notes-chunk") <= 2 and calls.count("notes-merge") == 1
+
+            # Short notes are one chunk, summarized whole and cached too
+            calls.clear()
+            short = notes(paragraphs[:2])
+            assert main.summarize_notes_incremental(None, short) == main.summarize_notes_incremental(None, short)
+            assert calls == ["notes"]
+        finally:
+            main.NOTES_CACHE_DIR, main.invoke_llm = saved
+    print("✅ Incremental notes summaries work")
+
+if __name__ == "__main__":
+    test_fetch_in_memory_retries()
+    test_kept_downloads_are_reused()
+    test_notes_index_skips_unchanged_materials()
+    test_notes_summaries_reuse_unchanged_chunks()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from jobQueue import JobQueue, QueueFull, DONE, DEAD, PENDING, LEASED, WAITING
+from singleFlight import material_set_key
+
+def test_job_queue_lifecycle():
+    """Test enqueue, lease, heartbeat, retry, dead-lettering and lease expiry"""
+    print("Testing job queue lifecycle...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), lease_seconds=0.2,
+                         max_attempts=2, backoff_base=0.01, backoff_max=0.01)
+
+        # Enqueue is idempotent while the job is in flight
+        queue.enqueue("job-1", {"materials": []})
+        queue.enqueue("job-1", {"materials": ["ignored"]})
+        assert queue.stats()[PENDING] == 1
+
+        job = queue.lease("worker-a")
+        assert job["id"] == "job-1" and job["status"] == LEASED and job["attempts"] == 1
+        assert queue.lease("worker-b") is None
+        assert queue.heartbeat("job-1", "worker-a")
+        assert not queue.heartbeat("job-1", "worker-b")
+
+        # A failure goes back to pending with backoff, then dead-letters on the last attempt
+        assert queue.fail("job-1", "worker-a", "boom") == PENDING
+        time.sleep(0.02)
+        job = queue.lease("worker-b")
+        assert job["attempts"] == 2
+        assert queue.fail("job-1", "worker-b", "boom again") == DEAD
+        assert [j["id"] for j in queue.dead_letters()] == ["job-1"]
+
+        # Revived jobs start over and can be acked
+        assert queue.revive("job-1")
+        job = queue.lease("worker-a")
+        assert queue.ack("job-1", "worker-a", {"success": True})
+        assert queue.get("job-1")["status"] == DONE
+        assert queue.get("job-1")["result"] == {"success": True}
+
+        # A worker that stops heartbeating loses its job to another worker
+        queue.enqueue("job-2", {})
+        queue.lease("crashed-worker")
+        time.sleep(0.25)
+        job = None
+        deadline = time.time() + 1
+        while job is None and time.time() < deadline:
+            job = queue.lease("worker-b")
+            time.sleep(0.01)
+        assert job and job["id"] == "job-2" and job["attempts"] == 2
+        assert not queue.ack("job-2", "crashed-worker", {"success": True})
+        assert queue.ack("job-2", "worker-b", {"success": True})
+
+    print("✅ Job queue lifecycle works")
+
+def test_single_flight_coalescing():
+    """Test that duplicate solves wait on one leader and share its result"""
+    print("Testing single-flight coalescing...")
+
+    def material(file_id):
+        return {"driveFile": {"driveFile": {"id": file_id, "title": file_id}}}
+
+    key = material_set_key([material("b"), material("a")])
+    assert key == material_set_key([material("a"), material("b"), material("a")])
+    assert key != material_set_key([material("a")])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), max_attempts=1)
+        queue.enqueue("leader", {}, flight_key=key)
+        queue.enqueue("follower-1", {}, flight_key=key)
+        queue.enqueue("follower-2", {}, flight_key=key)
+        assert queue.stats()[WAITING] == 2
+
+        # Only the leader is ever leased
+        job = queue.lease("worker-a")
+        assert job["id"] == "leader"
+        assert queue.lease("worker-b") is None
+
+        # If the leader dies, the oldest follower takes over the flight
+        queue.fail("leader", "worker-a", "boom")
+        job = queue.lease("worker-a")
+        assert job["id"] == "follower-1"
+        assert queue.get("follower-2")["leader_id"] == "follower-1"
+
+        assert queue.ack("follower-1", "worker-a", {"success": True, "solutionText": "42"})
+        assert queue.get("follower-2")["status"] == DONE
+        assert queue.get("follower-2")["result"]["solutionText"] == "42"
+
+    print("✅ Single-flight coalescing works")
+
+def test_background_jobs_yield_to_users():
+    """Test kind limits and that a user solve promotes the pre-solve it joins"""
+    print("Testing background job priority...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"))
+        queue.enqueue("presolve-a", {}, kind="presolve", priority=-10, flight_key="key-a")
+        queue.enqueue("presolve-b", {}, kind="presolve", priority=-10, flight_key="key-b")
+
+        # At most one pre-solve runs at a time
+        limits = {"presolve": 1}
+        assert queue.lease("worker-a", limits=limits)["id"] == "presolve-a"
+        assert queue.lease("worker-b", limits=limits) is None
+
+        # A user asking for presolve-b's files lifts it to a normal solve that runs next
+        user = queue.enqueue("solution-1", {}, flight_key="key-b")
+        assert user["status"] == WAITING
+        promoted = queue.get("presolve-b")
+        assert promoted["kind"] == "solve" and promoted["priority"] == 0
+        assert queue.lease("worker-b", limits=limits)["id"] == "presolve-b"
+        queue.close()
+
+    print("✅ Background jobs yield to user solves")
+
+def test_size_aware_scheduling_and_shedding():
+    """Test shortest-expected-first with aging, per-user fair share and load shedding"""
+    print("Testing size-aware scheduling...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), workers=2, max_depth=5, max_wait=100)
+        queue.enqueue("lab", {}, cost=60, owner="alice")
+        queue.enqueue("quiz-1", {}, cost=5, owner="alice")
+        queue.enqueue("quiz-2", {}, cost=5, owner="bob")
+
+        # Short jobs first; alice already has one running, so bob's quiz goes next
+        assert queue.lease("worker-a")["id"] == "quiz-1"
+        assert queue.lease("worker-b")["id"] == "quiz-2"
+
+        # The large job ages: after waiting, it beats a fresh short job
+        conn = queue._conn()
+        conn.execute("UPDATE jobs SET created_at = created_at - 1200 WHERE id = 'lab'")
+        queue.enqueue("quiz-3", {}, cost=5, owner="carol")
+        assert queue.lease("worker-c")["id"] == "lab"
+
+        # A backlog of about 40s per worker is fine; 5 jobs deep is not
+        queue.enqueue("quiz-4", {}, cost=5, owner="dave")
+        try:
+            queue.enqueue("quiz-5", {}, cost=5, owner="erin")
+            assert False, "queue should be full"
+        except QueueFull as e:
+            assert e.retry_after >= 5
+        assert queue.get("quiz-5") is None
+
+        # Background work is deferred rather than rejected
+        job = queue.enqueue("presolve-x", {}, kind="presolve", priority=-10, cost=5, shed="defer")
+        assert job["status"] == PENDING and job["run_at"] > time.time()
+
+        # Finished jobs calibrate later estimates and remember page counts
+        queue.ack("quiz-1", "worker-a", {"metrics": {"extraction": {"files": [
+            {"id": "file-1", "pagesRead": 12, "pagesSkipped": 3}]}}})
+        assert queue.known_pages(["file-1", "file-2"]) == {"file-1": 15}
+        queue.close()
+
+    print("✅ Size-aware scheduling works")
+
+def test_fair_share_and_shedding_by_wait():
+    """Test that running jobs weigh on their owner's next pick and a long predicted wait sheds"""
+    print("Testing fair share and wait-based shedding...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), workers=4)
+        for n in range(3):
+            queue.enqueue(f"alice-{n}", {}, cost=5, owner="alice")
+        queue.enqueue("bob-lab", {}, cost=12, owner="bob")
+
+        # Alice's first two quizzes go first; with two running, her 5s quiz counts as 15s
+        assert queue.lease("worker-a")["id"] == "alice-0"
+        assert queue.lease("worker-b")["id"] == "alice-1"
+        assert queue.lease("worker-c")["id"] == "bob-lab"
+        assert queue.lease("worker-d")["id"] == "alice-2"
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.sqlite"), workers=1, max_depth=0, max_wait=100)
+        queue.enqueue("lab-1", {}, cost=60)
+        queue.enqueue("lab-2", {}, cost=60)
+
+        # 120s of work ahead of a new solve is past the 100s limit, whatever the depth
+        try:
+            queue.enqueue("quiz", {}, cost=5)
+            assert False, "predicted wait should shed the job"
+        except QueueFull as e:
+            assert "predicted wait" in str(e) and e.retry_after == 20
+        # Pending jobs of a lower priority are not ahead of an urgent one
+        assert queue.enqueue("urgent", {}, priority=5, cost=5)["status"] == PENDING
+        queue.close()
+
+        # Without limits nothing is shed
+        unlimited = JobQueue(os.path.join(tmp, "jobs.sqlite"), workers=1, max_depth=0, max_wait=0)
+        assert unlimited.enqueue("quiz", {}, cost=5)["status"] == PENDING
+        unlimited.close()
+
+    print("✅ Fair share and wait-based shedding work")
+
+if __name__ == "__main__":
+    test_job_queue_lifecycle()
+    test_single_flight_coalescing()
+    test_background_jobs_yield_to_users()
+    test_size_aware_scheduling_and_shedding()
+    test_fair_share_and_shedding_by_wait()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import time
+import tempfile
+import threading
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from jobQueue import JobQueue, PENDING
+from memoryMonitor import MB, MemoryMonitor, current_rss, top_allocations
+from solverConfig import SolverConfig
+from solverWorkers import RECYCLE_EXIT_CODE, recycle_reason, worker_main
+
+def test_stage_peaks():
+    """Test that a short allocation spike inside a stage shows up as its peak"""
+    print("Testing stage memory peaks...")
+    monitor = MemoryMonitor()
+    tracemalloc.start()
+    try:
+        with monitor.stage("extract"):
+            spike = b"x" * (64 * MB)
+            time.sleep(0.2)
+            del spike
+        top = top_allocations(5)
+    finally:
+        tracemalloc.stop()
+    stage = monitor.stages["extract"]
+    if current_rss() is not None:
+        assert stage["rssPeakMB"] >= stage["rssStartMB"] + 48
+        assert monitor.report()["rssPeakMB"] == stage["rssPeakMB"]
+    assert stage["tracedPeakMB"] >= 64 and stage["seconds"] >= 0.2
+    assert top and all(" blocks at " in line for line in top)
+
+    disabled = MemoryMonitor(enabled=False)
+    with disabled.stage("extract"):
+        pass
+    assert disabled.report() == {"stages": {}, "rssPeakMB": None}
+    print("✅ Stage memory peaks work")
+
+def test_recycle_decisions():
+    """Test that workers retire on job count or RSS and never when both limits are off"""
+    print("Testing worker recycling...")
+    config = SolverConfig(worker_max_jobs=3, worker_max_rss_mb=0)
+    assert recycle_reason(2, config) is None and recycle_reason(3, config) == "ran 3 jobs"
+    if current_rss() is not None:
+        assert recycle_reason(1, SolverConfig(worker_max_jobs=0, worker_max_rss_mb=1)).startswith("RSS ")
+        assert recycle_reason(1, SolverConfig(worker_max_jobs=0, worker_max_rss_mb=1024 * 1024)) is None
+    assert recycle_reason(10 ** 6, SolverConfig(worker_max_jobs=0, worker_max_rss_mb=0)) is None
+
+    # A worker finishes the job in hand, then exits with the recycle code and leaves the rest queued
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SolverConfig(data_dir=tmp, worker_max_jobs=2, worker_max_rss_mb=0, poll_seconds=0.01)
+        queue = JobQueue.from_config(config)
+        for n in range(3):
+            queue.enqueue(f"job-{n}", {"n": n})
+        handled = []
+        try:
+            worker_main("worker-a", lambda payload: handled.append(payload["n"]) or {}, config, threading.Event())
+            assert False, "worker should have recycled"
+        except SystemExit as e:
+            assert e.code == RECYCLE_EXIT_CODE
+        assert handled == [0, 1] and queue.get("job-2")["status"] == PENDING
+        queue.close()
+    print("✅ Worker recycling works")
+
+if __name__ == "__main__":
+    test_stage_peaks()
+    test_recycle_decisions()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from parsedDocument import DocumentBuilder, ParsedDocument
+
+def test_files_and_pages():
+    """Test that the text matches the old concatenation and pages slice back out"""
+    print("Testing parsed document offsets...")
+    files = [("Worksheet", ["\n  1. Solve x + 2 = 5\n", "2) What is 3 * 4?\nShow working\nin full."]),
+             ("Blank", ["   ", ""]),
+             ("Reading", ["Chapter one text.", "", "Chapter two text."])]
+    builder = DocumentBuilder()
+    expected = ""
+    for title, pages in files:
+        builder.add_file(title, pages)
+        content = "\n".join(pages).strip()
+        if content:
+            expected += f"\n\n=== {title} ===\n{content}"
+    document = builder.build()
+
+    assert document.text == expected and str(document) == expected
+    assert document.file_count == 2 and document.file_titles == ("Worksheet", "Reading")
+    assert document.file_text(1) == "Chapter one text.\n\nChapter two text."
+    assert [document.page(i) for i in range(document.page_count)] == \
+        ["1. Solve x + 2 = 5", "2) What is 3 * 4?\nShow working\nin full.", "Chapter one text.", "", "Chapter two text."]
+    assert document.file_of(document.page_starts[2]) == 1
+    assert document.report() == {"chars": len(expected), "files": 2, "pages": 5}
+    print("✅ Parsed document offsets work")
+
+def test_questions_per_file():
+    """Test that questions are segmented per file, once, with offsets into the document"""
+    print("Testing document questions...")
+    builder = DocumentBuilder()
+    builder.add_file("Worksheet", ["1. Solve x + 2 = 5\na) for x\nb) check it", "2. What is 3 * 4?"])
+    builder.add_file("Extra", ["3. Name a prime number"])
+    document = builder.build()
+
+    assert document.questions() == ["1. Solve x + 2 = 5\na) for x\nb) check it", "2. What is 3 * 4?",
+                                    "3. Name a prime number"]
+    spans = document.question_spans()
+    assert [document.text[spans[i]:spans[i + 1]] for i in range(0, len(spans), 2)][1:] == \
+        ["2. What is 3 * 4?", "3. Name a prime number"]
+    # The tree is built once and reused
+    assert document.question_tree() is document.question_tree()
+    assert ParsedDocument.from_text("").questions() == []
+    print("✅ Document questions work")
+
+if __name__ == "__main__":
+    test_files_and_pages()
+    test_questions_per_file()
@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
+import tempfile
 sys.path.append(os.path.dirname(__file__))
 
 from services.assignmentSolver import AssignmentSolver
+from services.solverConfig import SolverConfig
 
 def test_pdf_generation():
     """Test PDF generation with sample text"""
@@ -45,7 +47,9 @@ This program demonstrates Newton's second law of motion. The force equals mass t
     
     try:
         # Create solver instance (dummy API key for testing)
-        solver = AssignmentSolver("dummy_key")
+        # Keep the solver's ledger and caches out of backend/data
+        data_dir = tempfile.TemporaryDirectory()
+        solver = AssignmentSolver("dummy_key", config=SolverConfig(data_dir=data_dir.name))
         
         # Generate PDF
         pdf_bytes = solver.create_solution_pdf(sample_text, "Test Assignment Solution")
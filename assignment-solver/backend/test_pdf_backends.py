@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import io
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from reportlab.pdfgen import canvas
+
+import pdfBackends
+from extractors import PageStream
+from pdfBackends import (PREFERENCE, PdfBackend, PdfDocument, PdfExtraction, available_backends, backend_order,
+                         benchmark, record_benchmark)
+
+def make_pdf(pages):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for text in pages:
+        pdf.drawString(72, 720, text)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+class BrokenBackend(PdfBackend):
+    """Opens fine, then fails on the second page"""
+    name = "broken"
+    module = "pypdf"
+
+    def open(self, data):
+        inner = pdfBackends.BACKENDS["pypdf"].open(data)
+
+        class Doc(PdfDocument):
+            def page_text(self, index):
+                if index == 1:
+                    raise ValueError("bad content stream")
+                return inner.page_text(index)
+        return Doc(self.name, inner.page_count)
+
+class BlankBackend(PdfBackend):
+    """Reads every page as empty, like a scanned document"""
+    name = "blank"
+    module = "pypdf"
+
+    def open(self, data):
+        class Doc(PdfDocument):
+            def page_text(self, index):
+                return ""
+        return Doc(self.name, 3)
+
+def test_fallback_between_backends():
+    """Test that a failing or empty backend hands the document to the next one without repeating pages"""
+    print("Testing PDF backend fallback...")
+    data = make_pdf(["Question 1: define a tree", "Question 2: define a graph", "Question 3: define a heap"])
+    pdfBackends.BACKENDS.update({"broken": BrokenBackend(), "blank": BlankBackend()})
+    try:
+        extraction = PdfExtraction(data, ["broken", "pypdf"])
+        pages = list(extraction)
+        assert [p.strip() for p in pages] == ["Question 1: define a tree", "Question 2: define a graph",
+                                              "Question 3: define a heap"]
+        assert extraction.report["backend"] == "pypdf"
+        assert extraction.report["fallbacks"][0]["reason"].startswith("page 2")
+
+        extraction = PdfExtraction(data, ["blank", "pypdf"])
+        assert len(list(extraction)) == 3 and extraction.report["fallbacks"][0]["reason"] == "no text"
+        assert extraction.report["seconds"] > 0
+
+        # Nothing left to try: the empty pages come through once
+        assert list(PdfExtraction(data, ["blank"])) == ["", "", ""]
+    finally:
+        del pdfBackends.BACKENDS["broken"], pdfBackends.BACKENDS["blank"]
+    print("✅ PDF backend fallback works")
+
+def test_benchmark_selects_fastest():
+    """Test that auto selection prefers the recorded benchmark winner"""
+    print("Testing PDF backend benchmark...")
+    timings = benchmark([make_pdf(["Some text"] * 4)])
+    assert timings["pypdf"] is not None
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "pdf-backends.json"
+        record_benchmark(path, {"pypdf": 0.001, "pdfminer": 0.5, "missing": None})
+        assert backend_order("auto", path)[0] == "pypdf"
+        assert backend_order("not-installed", path)[0] == "pypdf"
+    print("✅ PDF backend benchmark works")
+
+class ShortBackend(PdfBackend):
+    """Reads one page fewer than the file has, like a parser that gives up on a broken trailer"""
+    name = "short"
+    module = "pypdf"
+
+    def open(self, data):
+        inner = pdfBackends.BACKENDS["pypdf"].open(data)
+
+        class Doc(PdfDocument):
+            def page_text(self, index):
+                if index >= self.page_count:
+                    raise IndexError("page out of range")
+                return inner.page_text(index)
+        return Doc(self.name, inner.page_count - 1)
+
+def test_fallback_with_fewer_pages():
+    """Test that a fallback backend reporting fewer pages sets the page count instead of overrunning it"""
+    print("Testing PDF page count mismatch...")
+    data = make_pdf(["Question 1: define a tree", "Question 2: define a graph", "Question 3: define a heap"])
+    pdfBackends.BACKENDS.update({"broken": BrokenBackend(), "blank": BlankBackend(), "short": ShortBackend()})
+    try:
+        extraction = PdfExtraction(data, ["broken", "short"])
+        assert extraction.total == 3
+        pages = PageStream(extraction, total=extraction.total, paged=True)
+        assert [p.strip() for p in pages] == ["Question 1: define a tree", "Question 2: define a graph"]
+        assert extraction.total == 2 and pages.total == 2
+        assert extraction.report["pageCountMismatch"] == {"backend": "short", "pages": 2, "previous": 3}
+
+        # Nothing read by the first backend: the fallback's pages are all there is
+        extraction = PdfExtraction(data, ["blank", "short"])
+        assert len(list(extraction)) == 2 and extraction.report["backend"] == "short"
+    finally:
+        for name in ("broken", "blank", "short"):
+            del pdfBackends.BACKENDS[name]
+    print("✅ PDF page count mismatch works")
+
+class MissingBackend(PdfBackend):
+    """A backend whose library is not installed"""
+    name = "missing"
+    module = "no_such_pdf_module"
+
+def test_backend_order():
+    """Test that the configured or benchmarked backend goes first and the rest follow in preference order"""
+    print("Testing PDF backend order...")
+    pdfBackends.BACKENDS.update({"broken": BrokenBackend(), "missing": MissingBackend()})
+    try:
+        installed = available_backends()
+        assert "missing" not in installed
+        default = [name for name in PREFERENCE if name in installed] + ["broken"]
+        assert backend_order("auto") == default
+        assert backend_order("broken") == ["broken"] + default[:-1]
+        # A backend that is not installed is ignored, whether configured or benchmarked
+        assert backend_order("missing") == default
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "pdf-backends.json"
+            record_benchmark(path, {"broken": 0.001, "pypdf": 0.5})
+            assert backend_order("auto", path) == ["broken"] + default[:-1]
+            # An explicit choice beats the benchmark
+            assert backend_order("pypdf", path)[:2] == ["pypdf", "broken"]
+            record_benchmark(path, {"missing": 0.001, "pypdf": 0.5})
+            assert backend_order("auto", path) == default
+
+        # The document falls back along that order
+        data = make_pdf(["Question 1: define a tree", "Question 2: define a graph"])
+        extraction = PdfExtraction(data, backend_order("broken"))
+        assert len(list(extraction)) == 2 and extraction.report["backend"] == default[0]
+    finally:
+        del pdfBackends.BACKENDS["broken"], pdfBackends.BACKENDS["missing"]
+    print("✅ PDF backend order works")
+
+if __name__ == "__main__":
+    test_fallback_between_backends()
+    test_benchmark_selects_fastest()
+    test_backend_order()
+    test_fallback_with_fewer_pages()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import json
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from sampleProfiler import JobProfiler
+from solverConfig import SolverConfig
+
+def parse_pages():
+    deadline = time.perf_counter() + 0.3
+    while time.perf_counter() < deadline:
+        sum(i * i for i in range(1000))
+
+def test_slow_jobs_keep_profile():
+    """Test that only jobs over the threshold leave a profile, tagged with the solution id"""
+    print("Testing sampling profiler...")
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SolverConfig(profile_dir=tmp, profile_threshold_seconds=0.2, profile_interval_ms=2)
+        with JobProfiler(config, "fast/job") as fast:
+            pass
+        assert fast.path is None and os.listdir(tmp) == []
+
+        with JobProfiler(config, "65f0c0ffee") as slow:
+            parse_pages()
+        assert slow.path.name.endswith("-65f0c0ffee.collapsed")
+        lines = slow.path.read_text().splitlines()
+        assert any("parse_pages (test_profiler.py" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+        config.profile_format = "speedscope"
+        with JobProfiler(config, "65f0c0ffee") as slow:
+            parse_pages()
+        profile = json.loads(slow.path.read_text())
+        names = {frame["name"] for frame in profile["shared"]["frames"]}
+        assert "parse_pages" in names and profile["profiles"][0]["endValue"] >= 0.3
+    print("✅ Sampling profiler works")
+
+if __name__ == "__main__":
+    test_slow_jobs_keep_profile()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from questionCache import QuestionCache, normalize_question
+
+def test_question_cache():
+    """Test exact, near-duplicate and changed-constant lookups"""
+    print("Testing question cache...")
+
+    question = "1. A ball of mass 5 kg is dropped from a height of 20 m. Find its velocity just before it hits the ground."
+    answer = "v = sqrt(2 * g * h) = sqrt(2 * 9.8 * 20) = 19.8 m/s"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = QuestionCache(os.path.join(tmp, "questions.sqlite"))
+        assert cache.lookup(question)["match"] is None
+        cache.store(question, answer)
+
+        exact = cache.lookup("Q3)  a ball of MASS 5 kg is dropped from a height of 20 m. find its velocity just before it hits the ground")
+        assert exact["match"] == "exact" and exact["answer"] == answer
+
+        near = cache.lookup("2. A ball of mass 5 kg is dropped from a height of 20 m. Find its velocity just before it hits the ground below.")
+        assert near["match"] == "near" and near["answer"] == answer
+
+        changed = cache.lookup("1. A ball of mass 5 kg is dropped from a height of 45 m. Find its velocity just before it hits the ground.")
+        assert changed["match"] is None
+
+    print("✅ Question cache works")
+
+def test_question_cache_collisions():
+    """Test that operators, scopes and short context-dependent questions never share answers"""
+    print("Testing question cache collisions...")
+    assert normalize_question("Compute 7 + 2 and explain each step") != normalize_question("Compute 7 - 2 and explain each step")
+    assert normalize_question("Expand x^2 for x = 3") != normalize_question("Expand x*2 for x = 3")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "questions.sqlite")
+        cache = QuestionCache(path, scope="course-1")
+        cache.store("1. Compute 7 + 2 and explain each step of your working.", "9")
+        assert cache.lookup("1. Compute 7 - 2 and explain each step of your working.")["match"] is None
+        assert cache.lookup("1. Compute 7 * 2 and explain each step of your working.")["match"] is None
+        cache.store("2. Expand x^2 + 4 for x = 3 and simplify the result.", "13")
+        assert cache.lookup("2. Expand x*2 + 4 for x = 3 and simplify the result.")["match"] is None
+        assert cache.lookup("Q1) compute 7 + 2 and explain each step of your working")["answer"] == "9"
+
+        # Another course never sees these answers, exact or near
+        other = QuestionCache(path, scope="course-2")
+        assert other.lookup("1. Compute 7 + 2 and explain each step of your working.")["match"] is None
+        assert other.lookup("1. Compute 7 + 2 and explain every step of your working.")["match"] is None
+
+        # Too short to stand on its own
+        cache.store("(b) Find the value", "42")
+        assert cache.lookup("(b) Find the value")["match"] is None
+    print("✅ Question cache collisions are avoided")
+
+if __name__ == "__main__":
+    test_question_cache()
+    test_question_cache_collisions()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import io
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from questionSegmenter import segment, segment_text
+
+WORKSHEET = """Answer all questions.
+Time: 2 hours
+
+1. A ball is dropped from 20 m.
+Use g = 9.8
+
+a) Find its speed.
+b) Find the time taken.
+   i) to the nearest second
+   ii) exactly
+c) Explain your assumptions.
+- no air resistance
+- no spin
+2) Differentiate x^2.
+Question 3. Why is the sky blue?
+"""
+
+def outline(questions):
+    return [(depth, node.label, node.text) for question in questions for depth, node in question.walk()]
+
+def test_question_tree():
+    """Test that parts nest under their question and offsets point back into the source"""
+    print("Testing question tree...")
+    questions = list(segment_text(WORKSHEET))
+    assert outline(questions) == [
+        (0, None, "Answer all questions.\nTime: 2 hours"),
+        (0, "1", "1. A ball is dropped from 20 m.\nUse g = 9.8"),
+        (1, "a", "a) Find its speed."),
+        (1, "b", "b) Find the time taken."),
+        (2, "i", "i) to the nearest second"),
+        (2, "ii", "ii) exactly"),
+        (1, "c", "c) Explain your assumptions."),
+        (2, "-", "- no air resistance"),
+        (2, "-", "- no spin"),
+        (0, "2", "2) Differentiate x^2."),
+        (0, "3", "Question 3. Why is the sky blue?"),
+    ]
+    for question in questions:
+        for _, node in question.walk():
+            assert WORKSHEET[node.start:node.end].startswith(node.lines[0])
+            assert WORKSHEET[node.start:node.end].endswith(node.full_text().splitlines()[-1])
+    assert questions[1].full_text().endswith("c) Explain your assumptions.\n- no air resistance\n- no spin")
+    print("✅ Question tree works")
+
+def test_streaming_without_cap():
+    """Test that a stream is segmented lazily and long lists are not truncated"""
+    print("Testing streaming segmentation...")
+    text = "".join(f"{n}. Question {n}\nh) part h\ni) part i\n(ii) sub-part\n" for n in range(1, 301))
+    questions = segment(io.StringIO(text))
+    first = next(questions)
+    assert [child.label for child in first.children] == ["h", "i"] and first.children[1].children[0].label == "ii"
+    assert 1 + sum(1 for _ in questions) == 300
+    # Unlabelled text splits at blank lines and after questions
+    assert [q.text for q in segment_text("Intro line\n\nWhat is x?\nWhy?\nContext\n")] == \
+        ["Intro line", "What is x?", "Why?", "Context"]
+    print("✅ Streaming segmentation works")
+
+def test_parts_split_on_demand():
+    """Test that a question's text is the same before and after its parts are split out"""
+    print("Testing on-demand parts...")
+    texts = [question.full_text() for question in segment_text(WORKSHEET)]
+    split = list(segment_text(WORKSHEET))
+    assert [question.full_text() for question in split if list(question.walk())] == texts
+    assert [(q.start, q.end) for q in split] == [(q.start, q.end) for q in segment_text(WORKSHEET)]
+    print("✅ On-demand parts work")
+
+if __name__ == "__main__":
+    test_question_tree()
+    test_streaming_without_cap()
+    test_parts_split_on_demand()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import io
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from pypdf import PdfReader
+
+import pdfRenderer
+from artifactStore import ArtifactStore
+from pdfRenderer import RenderCache, split_fragments
+
+def solution(edited=None):
+    parts = []
+    for n in range(1, 16):
+        answer = f"Answer {n}: " + ("edited working. " if n == edited else "step by step working. ") * 30
+        parts.append(f"{n}. Question number {n}?\n\n{answer.strip()}")
+    return "\n\n".join(parts)
+
+def test_fragment_render_reuses_unchanged_questions():
+    """Test that editing one answer re-renders one fragment and page numbers cover the merged document"""
+    print("Testing fragment rendering...")
+    fragments = split_fragments(solution())
+    assert len(fragments) > 2 and all(f[0].isdigit() for f in fragments)
+    assert "\n\n".join(fragments) == solution()
+
+    layouts = []
+    original = pdfRenderer._layout_pdf
+    def counting_layout(text, title):
+        layouts.append(text)
+        return original(text, title)
+    pdfRenderer._layout_pdf = counting_layout
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = RenderCache(ArtifactStore(os.path.join(tmp, "artifacts")), os.path.join(tmp, "index"), fragments=True)
+            artifact, hit = cache.render(solution(), "Quiz 3")
+            assert not hit and len(layouts) == len(fragments)
+
+            reader = PdfReader(io.BytesIO(cache.store.get(artifact["ref"])))
+            pages = [page.extract_text() for page in reader.pages]
+            total = len(pages)
+            assert "Quiz 3" in pages[0] and f"Page {total} of {total}" in pages[-1]
+            text = "\n".join(pages)
+            assert text.index("Question number 1?") < text.index("Question number 15?")
+
+            layouts.clear()
+            cache.render(solution(edited=9), "Quiz 3")
+            assert len(layouts) == 1 and "Question number 9?" in layouts[0]
+            assert cache.render(solution(edited=9), "Quiz 3")[1]
+    finally:
+        pdfRenderer._layout_pdf = original
+    print("✅ Fragment rendering works")
+
+def test_failed_render_is_not_cached():
+    """Test that a failed render raises instead of caching an error page under the solution's key"""
+    print("Testing failed renders...")
+    original = pdfRenderer._layout_pdf
+    def broken_layout(text, title):
+        raise OSError("font file could not be read")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = RenderCache(ArtifactStore(os.path.join(tmp, "artifacts")), os.path.join(tmp, "index"))
+        pdfRenderer._layout_pdf = broken_layout
+        try:
+            cache.render(solution(), "Quiz 3")
+            assert False, "a failed render must not return an artifact"
+        except OSError:
+            pass
+        finally:
+            pdfRenderer._layout_pdf = original
+        assert not os.path.exists(os.path.join(tmp, "index")) or not any(os.scandir(os.path.join(tmp, "index")))
+
+        artifact, hit = cache.render(solution(), "Quiz 3")
+        assert not hit and "Question number 15?" in "\n".join(
+            page.extract_text() for page in PdfReader(io.BytesIO(cache.store.get(artifact["ref"]))).pages)
+    print("✅ Failed renders are not cached")
+
+if __name__ == "__main__":
+    test_fragment_render_reuses_unchanged_questions()
+    test_failed_render_is_not_cached()
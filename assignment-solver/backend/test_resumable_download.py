@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import re
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from assignmentSolver import AssignmentSolver
+from resumableDownload import download_to_file, download_to_memory
+from solverConfig import SolverConfig
+
+class FlakyHttp:
+    """Serves byte ranges of a blob, failing the requests listed in fail_on"""
+    def __init__(self, blob, fail_on):
+        self.blob = blob
+        self.fail_on = set(fail_on)
+        self.requests = []
+
+    def request(self, uri, method="GET", headers=None):
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", headers["Range"]).groups())
+        self.requests.append(start)
+        if len(self.requests) in self.fail_on:
+            raise ConnectionResetError("connection reset by peer")
+        chunk = self.blob[start:end + 1]
+        resp = type("Resp", (dict,), {})({"content-range": f"bytes {start}-{start + len(chunk) - 1}/{len(self.blob)}"})
+        resp.status = 206
+        return resp, chunk
+
+class FakeRequest:
+    def __init__(self, http):
+        self.http = http
+        self.uri = "https://www.googleapis.com/drive/v3/files/abc?alt=media"
+
+def test_resumes_after_failures():
+    """Test that a download resumes from the committed offset within and across runs"""
+    print("Testing resumable downloads...")
+    blob = os.urandom(10000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = os.path.join(tmp, "handout.pdf")
+
+        # A transient error mid-file is retried from the same offset
+        http = FlakyHttp(blob, fail_on={3})
+        download_to_file(FakeRequest(http), dest, revision="v1", chunk_size=4096, backoff_base=0)
+        assert open(dest, "rb").read() == blob
+        assert http.requests == [0, 4096, 8192, 8192]
+
+        # A run that gives up keeps its .part file; the next run continues from it
+        os.unlink(dest)
+        http = FlakyHttp(blob, fail_on={2, 3})
+        try:
+            download_to_file(FakeRequest(http), dest, revision="v1", chunk_size=4096, max_retries=1, backoff_base=0)
+            assert False, "download should have given up"
+        except ConnectionResetError:
+            pass
+        assert os.path.getsize(dest + ".part") == 4096
+        http = FlakyHttp(blob, fail_on=set())
+        download_to_file(FakeRequest(http), dest, revision="v1", chunk_size=4096)
+        assert open(dest, "rb").read() == blob and http.requests == [4096, 8192]
+        assert not os.path.exists(dest + ".part")
+
+    print("✅ Resumable downloads work")
+
+def test_download_paths_are_per_job():
+    """Test that concurrent jobs never share a .part file while a retried job resumes its own"""
+    print("Testing per-job download paths...")
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SolverConfig(data_dir=tmp)
+        def solver(solution_id=None):
+            return AssignmentSolver("dummy_key", usage_context={"solutionId": solution_id}, config=config)
+        first, second = solver("sol-1"), solver("sol-2")
+        assert first._download_path("abc") != second._download_path("abc")
+        assert first._download_path("abc") == solver("sol-1")._download_path("abc")
+        assert first._download_path("abc").parent == config.downloads_dir
+        # Without a job id each download gets a fresh path
+        anonymous = solver()
+        assert anonymous._download_path("abc") != anonymous._download_path("abc")
+        assert "/" not in solver("../etc/x")._download_path("abc").name
+    print("✅ Per-job download paths work")
+
+class WholeBodyHttp:
+    """Ignores the Range header and answers 200 with the whole file, like Drive exports"""
+    def __init__(self, blob):
+        self.blob = blob
+
+    def request(self, uri, method="GET", headers=None):
+        resp = type("Resp", (dict,), {})()
+        resp.status = 200
+        return resp, self.blob
+
+def test_download_to_memory():
+    """Test that in-memory downloads retry and resume like file downloads and touch no disk"""
+    print("Testing in-memory downloads...")
+    blob = os.urandom(10000)
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            http = FlakyHttp(blob, fail_on={2})
+            assert download_to_memory(FakeRequest(http), chunk_size=4096, backoff_base=0) == blob
+            assert http.requests == [0, 4096, 4096, 8192]
+            assert download_to_memory(FakeRequest(WholeBodyHttp(blob)), chunk_size=4096) == blob
+            try:
+                download_to_memory(FakeRequest(FlakyHttp(blob, fail_on={1, 2})), max_retries=1, backoff_base=0)
+                assert False, "download should have given up"
+            except ConnectionResetError:
+                pass
+            assert os.listdir(tmp) == []
+        finally:
+            os.chdir(cwd)
+    print("✅ In-memory downloads work")
+
+if __name__ == "__main__":
+    test_resumes_after_failures()
+    test_download_paths_are_per_job()
+    test_download_to_memory()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import os
+import asyncio
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.path.join(os.path.dirname(__file__), "services"))
+
+from assignmentSolver import AssignmentSolver
+from deadlines import JobDeadline, invoke_with_deadline
+from solverConfig import SolverConfig
+from usageLedger import MeteredRunnable, UsageLedger, usage_of
+
+def reply(text, input_tokens, output_tokens):
+    return SimpleNamespace(content=text, response_metadata={"model_name": "models/gemini-test"},
+                           usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens})
+
+class FakeChain:
+    """Answers after the given delays in turn, like a slow first request and a fast hedge"""
+    def __init__(self, *delays):
+        self.delays = list(delays)
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.delays.pop(0))
+        return reply("1. x = 4", 120, 30)
+
+def test_ledger_splits_and_reports():
+    """Test that batched calls are split between jobs and reports group and filter"""
+    print("Testing usage ledger reports...")
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = UsageLedger(os.path.join(tmp, "usage.sqlite"))
+        call = {"purpose": "batch", "model": "gemini-test", "outcome": "ok", "inputTokens": 100,
+                "outputTokens": 31, "seconds": 3.0}
+        jobs = [{"courseId": "c1", "userId": "u1"}, {"courseId": "c1", "userId": "u2"}, {"courseId": "c2", "userId": "u1"}]
+        ledger.record(call, jobs, at=1790000000)
+        ledger.record(dict(call, purpose="assignment", outcome="error", inputTokens=None, outputTokens=None),
+                      [{"courseId": "c2", "userId": "u1"}], at=1790000000 + 86400)
+
+        by_course = {row["course"]: row for row in ledger.report(["course"])}
+        assert by_course["c1"]["input_tokens"] + by_course["c2"]["input_tokens"] == 100
+        assert by_course["c1"]["output_tokens"] + by_course["c2"]["output_tokens"] == 31
+        assert by_course["c1"]["calls"] == 0.67 and by_course["c2"]["failed"] == 1
+        totals = ledger.report([])
+        assert totals[0]["calls"] == 2 and totals[0]["seconds"] == 6.0
+        days = ledger.report(["day", "user"], since="2026-09-22")
+        assert [(row["day"], row["user"]) for row in days] == [("2026-09-22", "u1")]
+        try:
+            ledger.report(["course; DROP TABLE llm_calls"])
+            assert False, "unknown groupings must be rejected"
+        except ValueError:
+            pass
+    print("✅ Usage ledger reports work")
+
+def test_hedged_calls_are_metered():
+    """Test that both the cancelled primary and the winning hedge are reported"""
+    print("Testing metered LLM calls...")
+    reports = []
+    metered = MeteredRunnable(FakeChain(5.0, 0.01), lambda *args: reports.append(args))
+    result, hedged, winner = invoke_with_deadline(metered, {}, JobDeadline(30), hedge_after=0.05)
+    assert hedged and winner == "hedge" and result.content == "1. x = 4"
+    assert sorted((attempt, outcome) for attempt, outcome, _, _ in reports) == [("hedge", "ok"), ("primary", "cancelled")]
+    assert usage_of(result) == {"inputTokens": 120, "outputTokens": 30, "model": "gemini-test"}
+    # Gemini's own field names, as older integrations report them
+    legacy = SimpleNamespace(response_metadata={"usage_metadata": {"prompt_token_count": 7, "candidates_token_count": 2}})
+    assert usage_of(legacy, "models/gemini-2.0-flash-exp")["inputTokens"] == 7
+    print("✅ Metered LLM calls work")
+
+def test_solver_records_usage():
+    """Test that the solver's LLM calls land in the ledger under the job's context"""
+    print("Testing solver usage accounting...")
+    with tempfile.TemporaryDirectory() as tmp:
+        solver = AssignmentSolver("dummy_key", usage_context={"courseId": "c9", "courseWorkId": "cw1", "userId": "u7"},
+                                  config=SolverConfig(data_dir=tmp, hedge_llm=False))
+        assert solver._invoke_llm(FakeChain(0), {}, purpose="questions").content == "1. x = 4"
+        rows = solver.ledger.report(["course", "assignment", "user", "purpose", "model"])
+        assert rows == [{"course": "c9", "assignment": "cw1", "user": "u7", "purpose": "questions",
+                         "model": "gemini-test", "calls": 1.0, "failed": 0.0, "input_tokens": 120,
+                         "output_tokens": 30, "unmetered": 0.0, "seconds": rows[0]["seconds"]}]
+        assert solver.metrics["llm"]["inputTokens"] == 120 and solver.metrics["llm"]["calls"] == 1
+    print("✅ Solver usage accounting works")
+
+if __name__ == "__main__":
+    test_ledger_splits_and_reports()
+    test_hedged_calls_are_metered()
+    test_solver_records_usage()